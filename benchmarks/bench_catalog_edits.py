@@ -0,0 +1,52 @@
+"""
+Latency of incremental catalog edits vs reloading the library from disk
+
+    python -m benchmarks.bench_catalog_edits --sizes 10000 100000
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from src.music_agent.tools.library import MusicLibrary
+from benchmarks.synthetic import make_songs
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--store", default="models", choices=["models", "table"])
+    args = parser.parse_args()
+
+    print(f"{'tracks':>10}{'reload s':>10}{'add s':>10}{'update s':>10}{'remove s':>10}{'refit s':>10}")
+    for n in args.sizes:
+        songs = make_songs(n + args.batch)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "songs.json"
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump([s.model_dump() for s in songs[:n]], f)
+
+            lib = MusicLibrary(path, song_store=args.store)
+            reload_s = timed(lib.load)
+
+            extra = songs[n:]
+            add_s = timed(lambda: lib.add_songs(extra))
+            changed = extra[0].model_copy(update={"name": "Retitled Track"})
+            update_s = timed(lambda: lib.update_song(changed))
+            remove_s = timed(lambda: lib.remove_songs([s.id for s in extra[:args.batch // 2]]))
+            lib.wait_for_refit()
+            refit_s = timed(lib.refit)
+
+            print(f"{n:>10}{reload_s:>10.2f}{add_s:>10.3f}{update_s:>10.3f}{remove_s:>10.3f}{refit_s:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
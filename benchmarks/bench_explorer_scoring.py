@@ -0,0 +1,77 @@
+"""
+Microbenchmark: per-song explorer scoring loop vs the batched NumPy engine
+
+    python -m benchmarks.bench_explorer_scoring --sizes 10000 100000 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.music_agent.agents.explorer import (
+    calculate_novelty,
+    score_song_exploration,
+    batch_novelty,
+    batch_exploration,
+)
+from src.music_agent.agents.memory import load_user_memory
+from src.music_agent.state import SessionContext
+from src.music_agent.tools.features import CatalogFeatures
+from benchmarks.synthetic import make_songs
+
+
+def per_song(songs, user_memory, ctx):
+    known_artists = set(user_memory.get("preferred_artists", []))
+    excluded_ids = set(user_memory.get("disliked_songs", []))
+    scores = []
+    for song in songs:
+        if song.id in excluded_ids or song.artist in known_artists:
+            continue
+        novelty = calculate_novelty(song, user_memory)
+        if novelty > 0.5:
+            scores.append(score_song_exploration(song, novelty, user_memory, ctx))
+    return scores
+
+
+def batched(features, user_memory, ctx):
+    novelty = batch_novelty(features, user_memory)
+    exploration = batch_exploration(features, novelty, user_memory, ctx)
+    eligible = (novelty > 0.5) & ~features.id_in(user_memory.get("disliked_songs", []))
+    eligible &= ~features.artist_in(user_memory.get("preferred_artists", []))
+    return exploration[eligible]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--scalar-limit", type=int, default=1_000_000,
+                        help="skip the per-song loop above this catalog size")
+    args = parser.parse_args()
+
+    user_memory = load_user_memory("default_user")
+    ctx = SessionContext(activity="gym", mood="energetic")
+
+    print(f"{'tracks':>10}{'features s':>12}{'per-song s':>12}{'batched s':>12}{'speedup':>10}{'identical':>11}")
+    for n in args.sizes:
+        songs = make_songs(n)
+
+        start = time.perf_counter()
+        features = CatalogFeatures(songs)
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fast = batched(features, user_memory, ctx)
+        batched_s = time.perf_counter() - start
+
+        if n <= args.scalar_limit:
+            start = time.perf_counter()
+            slow = per_song(songs, user_memory, ctx)
+            scalar_s = time.perf_counter() - start
+            identical = np.array_equal(np.array(slow, dtype=np.float64), fast)
+            print(f"{n:>10}{build_s:>12.3f}{scalar_s:>12.3f}{batched_s:>12.3f}{scalar_s / batched_s:>9.1f}x{str(identical):>11}")
+        else:
+            print(f"{n:>10}{build_s:>12.3f}{'-':>12}{batched_s:>12.3f}{'-':>10}{'-':>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Orchestrator latency with and without the heuristic fast path
+
+The Mistral call is replaced by a stand-in that sleeps for --llm-ms and
+returns the heuristic parse, so this runs offline and only measures routing.
+The intent cache is kept in memory and cleared between modes.
+
+    python -m benchmarks.bench_fast_path --llm-ms 400
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("MUSIC_INTENT_CACHE_DB", "off")
+
+from src.music_agent.agents import orchestrator
+from src.music_agent.tools.intent_cache import get_intent_cache
+
+QUERIES = [
+    "chill study music",
+    "gym workout rock",
+    "happy pop for a party",
+    "sad indie songs for a rainy night",
+    "upbeat electronic dance",
+    "calm jazz for reading",
+    "energetic hip-hop for running",
+    "calm classical reading",
+    "focus work music",
+    "chill lofi beats for studying",
+    "recommend me some songs",
+    "songs like Taylor Swift",
+    "rock but no metal",
+    "40-minute gym playlist, mostly Hindi rap, surprise me with 3 new artists",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-ms", type=float, default=400.0)
+    args = parser.parse_args()
+
+    def stand_in(query: str) -> dict:
+        time.sleep(args.llm_ms / 1000.0)
+        return orchestrator.parse_query_heuristically(query)
+
+    orchestrator._parse_with_llm = stand_in
+    threshold = orchestrator.FAST_PATH_CONFIDENCE
+
+    print(f"{'mode':>10}{'mean ms':>10}{'fast path':>11}  per-path mean ms")
+    for label, confidence in (("llm only", 2.0), ("fast path", threshold)):
+        orchestrator.FAST_PATH_CONFIDENCE = confidence
+        orchestrator.route_stats.reset()
+        get_intent_cache().clear()
+        start = time.perf_counter()
+        for query in QUERIES:
+            orchestrator.orchestrator_agent({"query": query, "logs": []})
+        mean_ms = 1000 * (time.perf_counter() - start) / len(QUERIES)
+        paths = orchestrator.route_stats.snapshot()
+        share = paths.get("fast_path", {}).get("count", 0) / len(QUERIES)
+        per_path = ", ".join(f"{p}={s['mean_ms']:.2f} (n={s['count']})" for p, s in sorted(paths.items()))
+        print(f"{label:>10}{mean_ms:>10.1f}{share:>10.0%}  {per_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Client setup cost per LLM call: a new ChatMistralAI per call (the old
+_get_llm) vs the pooled clients of the gateway's Mistral provider. No
+requests are sent; each new client also means a new TLS handshake on its
+first real call, which this does not count.
+
+    python -m benchmarks.bench_llm_clients --calls 200
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from langchain_mistralai import ChatMistralAI
+
+from src.music_agent.tools.llm_gateway import MistralProvider, default_model
+
+
+# (temperature, max_tokens) of the orchestrator, planner, explainer and refiner calls
+AGENT_SETTINGS = [(0.2, None), (0.2, None), (0.7, None), (0.7, 500)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+    os.environ.setdefault("MISTRAL_API_KEY", "bench-" + "0" * 26)
+
+    start = time.perf_counter()
+    for i in range(args.calls):
+        temperature, max_tokens = AGENT_SETTINGS[i % len(AGENT_SETTINGS)]
+        kwargs = {"max_tokens": max_tokens} if max_tokens else {}
+        ChatMistralAI(model=default_model(), temperature=temperature, **kwargs)
+    per_call_ms = (time.perf_counter() - start) / args.calls * 1000
+
+    provider = MistralProvider()
+    start = time.perf_counter()
+    for i in range(args.calls):
+        temperature, max_tokens = AGENT_SETTINGS[i % len(AGENT_SETTINGS)]
+        provider.client(temperature, max_tokens=max_tokens)
+    pooled_ms = (time.perf_counter() - start) / args.calls * 1000
+
+    async def async_calls():
+        for i in range(args.calls):
+            temperature, max_tokens = AGENT_SETTINGS[i % len(AGENT_SETTINGS)]
+            provider.async_client(temperature, max_tokens=max_tokens)
+
+    start = time.perf_counter()
+    asyncio.run(async_calls())
+    async_ms = (time.perf_counter() - start) / args.calls * 1000
+
+    stats = provider.stats()
+    print(f"{'path':<18}{'ms/call':>10}{'clients':>10}")
+    print(f"{'new per call':<18}{per_call_ms:>10.3f}{args.calls:>10}")
+    print(f"{'gateway':<18}{pooled_ms:>10.3f}{stats['clients']:>10}")
+    print(f"{'gateway async':<18}{async_ms:>10.3f}{stats['async_clients']:>10}")
+
+
+if __name__ == "__main__":
+    main()
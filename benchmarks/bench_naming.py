@@ -0,0 +1,73 @@
+"""
+Latency of naming a playlist after the graph (explainer, then a separate
+namer_agent call, as the UI used to do) vs the namer as a sibling node of
+the explainer inside the graph
+
+LLM calls go to the fake provider: --latency-ms before the first word and
+--token-ms per further word. The intent cache is off.
+
+    python -m benchmarks.bench_naming --latency-ms 400 --token-ms 30
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("MUSIC_INTENT_CACHE_DB", "off")
+os.environ.setdefault("MUSIC_INTENT_CACHE_SIZE", "0")
+
+from src.music_agent.agents.refiner import namer_agent
+from src.music_agent.graph import build_multi_agent_graph
+from src.music_agent.tools.library import load_default_library
+from src.music_agent.tools.llm_gateway import FakeProvider, set_llm_provider
+
+QUERIES = [
+    "chill study music",
+    "songs like Taylor Swift",
+    "happy pop for a party",
+    "rock but no metal",
+    "focus work music",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency-ms", type=float, default=400.0)
+    parser.add_argument("--token-ms", type=float, default=30.0)
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    lib = load_default_library()
+    after_graph, _ = build_multi_agent_graph(lib, name_playlist=False)
+    sibling, _ = build_multi_agent_graph(lib, name_playlist=True)
+    set_llm_provider(FakeProvider(latency_ms=args.latency_ms, token_ms=args.token_ms))
+    queries = QUERIES * args.repeat
+
+    def named_after(query):
+        state = after_graph.invoke({"query": query})
+        return namer_agent(state)[0]
+
+    def named_inside(query):
+        return sibling.invoke({"query": query})["playlist_title"]
+
+    def named_inside_async(query):
+        return asyncio.run(sibling.ainvoke({"query": query}))["playlist_title"]
+
+    print(f"{'mode':>22}{'mean ms':>10}{'max ms':>9}{'titles':>8}")
+    titles = None
+    for label, run in (("namer after graph", named_after),
+                       ("sibling node", named_inside),
+                       ("sibling node (async)", named_inside_async)):
+        latencies, names = [], []
+        for query in queries:
+            start = time.perf_counter()
+            names.append(run(query))
+            latencies.append(1000 * (time.perf_counter() - start))
+        titles = titles or names
+        print(f"{label:>22}{statistics.mean(latencies):>10.0f}{max(latencies):>9.0f}"
+              f"{'same' if names == titles else 'differ':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare sequential vs fanned-out Taste DJ / Chaos DJ execution
+
+Each recommender branch is padded with a fixed delay standing in for heavier,
+GIL-releasing scoring work (NumPy kernels, feature store lookups). Runs offline:
+without MISTRAL_API_KEY the orchestrator and explainer use their fallbacks.
+
+    python -m benchmarks.bench_parallel_recommenders --delay-ms 50 --runs 20
+"""
+import argparse
+import statistics
+import time
+
+from src.music_agent import graph
+from src.music_agent.agents import taste_recommender, explorer
+from src.music_agent.tools.library import get_default_library
+
+
+def _slowed(fn, delay_s: float):
+    def wrapper(state):
+        time.sleep(delay_s)
+        return fn(state)
+    return wrapper
+
+
+def _initial_state(lib, query: str) -> dict:
+    return {
+        "user_id": "default_user",
+        "query": query,
+        "library_id": lib.handle,
+        "candidate_tracks": [],
+        "final_playlist": [],
+        "explanations": [],
+        "logs": [],
+        "error": None,
+        "requires_human_review": False,
+        "feedback": None,
+    }
+
+
+def _time_graph(app, lib, query: str, runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        app.invoke(_initial_state(lib, query))
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delay-ms", type=float, default=50.0)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--query", default="chill study music")
+    args = parser.parse_args()
+
+    delay_s = args.delay_ms / 1000.0
+    taste_recommender.taste_recommender_branch = _slowed(taste_recommender.taste_recommender_branch, delay_s)
+    explorer.explorer_branch = _slowed(explorer.explorer_branch, delay_s)
+    graph.taste_recommender_branch = taste_recommender.taste_recommender_branch
+    graph.explorer_branch = explorer.explorer_branch
+
+    lib = get_default_library()
+    sequential_app, _ = graph.build_multi_agent_graph(lib, parallel_recommenders=False)
+    parallel_app, _ = graph.build_multi_agent_graph(lib, parallel_recommenders=True)
+
+    seq_result = sequential_app.invoke(_initial_state(lib, args.query))
+    par_result = parallel_app.invoke(_initial_state(lib, args.query))
+    same = [s.id for s in seq_result["final_playlist"]] == [s.id for s in par_result["final_playlist"]]
+
+    seq = _time_graph(sequential_app, lib, args.query, args.runs)
+    par = _time_graph(parallel_app, lib, args.query, args.runs)
+
+    print(f"Per-branch delay: {args.delay_ms:.0f}ms | runs: {args.runs} | identical playlist: {same}")
+    print(f"{'mode':<12}{'median ms':>12}{'p95 ms':>12}")
+    for name, timings in [("sequential", seq), ("parallel", par)]:
+        p95 = sorted(timings)[int(0.95 * (len(timings) - 1))]
+        print(f"{name:<12}{statistics.median(timings) * 1000:>12.1f}{p95 * 1000:>12.1f}")
+    print(f"Speedup: {statistics.median(seq) / statistics.median(par):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
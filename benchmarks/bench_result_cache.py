@@ -0,0 +1,63 @@
+"""
+invoke_workflow latency over a repeating query mix, with and without the result cache
+
+Queries are drawn from a Zipf-like distribution over a few phrasings, so
+popular requests repeat the way they do in the UI. Runs offline: without
+MISTRAL_API_KEY the LLM agents use their fallbacks, which understates the
+saving of a hit.
+
+    python -m benchmarks.bench_result_cache --requests 500
+"""
+import argparse
+import random
+import statistics
+import time
+
+from src.music_agent.graph import invoke_workflow
+from src.music_agent.tools.result_cache import get_result_cache
+
+PHRASES = [
+    "chill study music",
+    "gym workout rock",
+    "happy pop for a party",
+    "sad indie songs for a rainy night",
+    "upbeat electronic dance",
+    "calm jazz for reading",
+    "focus work music",
+    "energetic hip-hop for running",
+]
+
+
+def variants(phrase: str) -> list[str]:
+    return [phrase, phrase.capitalize(), f"  {phrase}  ", f"{phrase}!", phrase.upper()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--users", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    weights = [1 / (i + 1) for i in range(len(PHRASES))]
+    mix = [
+        (rng.choice(variants(rng.choices(PHRASES, weights)[0])), f"bench-{rng.randrange(args.users)}")
+        for _ in range(args.requests)
+    ]
+    invoke_workflow("warm up", use_cache=False)
+
+    print(f"{'mode':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'hit rate':>10}")
+    for use_cache in (False, True):
+        timings = []
+        for query, user_id in mix:
+            start = time.perf_counter()
+            invoke_workflow(query, user_id, use_cache=use_cache)
+            timings.append(1000 * (time.perf_counter() - start))
+        timings.sort()
+        hit_rate = get_result_cache().stats()["hit_rate"] if use_cache else 0.0
+        print(f"{'cached' if use_cache else 'uncached':>10}{statistics.mean(timings):>10.2f}"
+              f"{timings[len(timings) // 2]:>10.2f}{timings[int(len(timings) * 0.95)]:>10.2f}{hit_rate:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
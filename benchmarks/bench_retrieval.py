@@ -0,0 +1,131 @@
+"""
+Recommender latency with and without the bounded candidate pool
+
+"quality" is the share of pooled picks that score at least as well as the
+weakest full-catalog pick of the same recommender. Exact id overlap is not
+meaningful here: the Chaos DJ's top scores are usually tied across
+thousands of tracks.
+
+    python -m benchmarks.bench_retrieval --sizes 10000 100000 --pool 2000 --vector-index ivf
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from src.music_agent.state import UserPreferences, SessionContext
+from src.music_agent.agents.orchestrator import parse_query_heuristically
+from src.music_agent.agents.taste_recommender import taste_recommender_branch
+from src.music_agent.agents.explorer import explorer_branch
+from src.music_agent.tools.features import get_catalog_features
+from src.music_agent.tools.library import MusicLibrary
+from src.music_agent.tools.retrieval import retrieve_candidates
+from benchmarks.synthetic import make_songs
+
+QUERIES = [
+    "chill study music",
+    "gym workout rock",
+    "happy pop for a party",
+    "sad indie songs for a rainy night",
+    "upbeat electronic dance",
+    "calm jazz for reading",
+]
+
+
+def profile(lib: MusicLibrary, rng: random.Random, liked: int = 10) -> dict:
+    songs = [lib.songs[rng.randrange(len(lib.songs))] for _ in range(liked)]
+    return {
+        "liked_songs": [s.id for s in songs],
+        "disliked_songs": [],
+        "preferred_genres": list(dict.fromkeys(g for s in songs for g in s.genres)),
+        "preferred_moods": list(dict.fromkeys(s.mood for s in songs if s.mood)),
+        "preferred_artists": list(dict.fromkeys(s.artist for s in songs)),
+    }
+
+
+def make_state(lib: MusicLibrary, query: str, memory: dict) -> dict:
+    parsed = parse_query_heuristically(query)
+    prefs = UserPreferences(**parsed["preferences"])
+    # what the memory agent fills in before the recommenders run
+    prefs.genres = prefs.genres or memory["preferred_genres"][:5]
+    prefs.moods = prefs.moods or memory["preferred_moods"][:3]
+    prefs.artists = prefs.artists or memory["preferred_artists"][:5]
+    return {
+        "user_id": "bench",
+        "query": query,
+        "preferences": prefs,
+        "session_context": SessionContext(**parsed["session_context"]),
+        "library_id": lib.handle,
+        "catalog_version": lib.catalog_version,
+        "candidate_pool": None,
+        "user_memory": memory,
+        "candidate_tracks": [],
+        "logs": [],
+    }
+
+
+def recommend(state: dict) -> list:
+    return [branch(state)["candidate_tracks"] for branch in (taste_recommender_branch, explorer_branch)]
+
+
+def as_good(full: list, pooled: list) -> tuple[int, int]:
+    good = total = 0
+    for full_picks, pooled_picks in zip(full, pooled):
+        if full_picks:
+            weakest = min(c.score for c in full_picks)
+            good += sum(c.score >= weakest for c in pooled_picks)
+            total += len(full_picks)
+    return good, total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--pool", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--vector-index", default="exact", choices=["exact", "ivf"])
+    args = parser.parse_args()
+
+    print(f"{'tracks':>10}{'index':>7}{'pool':>7}{'full ms':>10}{'retrieve ms':>13}{'rerank ms':>11}{'speedup':>9}{'quality':>9}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "songs.json"
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump([s.model_dump() for s in make_songs(n)], f)
+            lib = MusicLibrary(path, vector_index=args.vector_index)
+            lib.load()
+            # features are built once per catalog, outside the per-request cost
+            get_catalog_features(lib.songs).subset([0])
+
+            rng = random.Random(0)
+            states = [make_state(lib, q, profile(lib, rng)) for _ in range(args.users) for q in QUERIES]
+            full_s = retrieve_s = rerank_s = 0.0
+            found = total = 0
+            for state in states:
+                start = time.perf_counter()
+                full = recommend(state)
+                full_s += time.perf_counter() - start
+
+                start = time.perf_counter()
+                pool = retrieve_candidates(
+                    lib, state["preferences"], state["session_context"], state["user_memory"], args.pool, min_tracks=0
+                )
+                retrieve_s += time.perf_counter() - start
+                start = time.perf_counter()
+                pooled = recommend({**state, "candidate_pool": pool})
+                rerank_s += time.perf_counter() - start
+
+                good, picks = as_good(full, pooled)
+                found += good
+                total += picks
+
+            runs = len(states)
+            pooled_s = retrieve_s + rerank_s
+            print(f"{n:>10}{args.vector_index:>7}{args.pool:>7}{1000 * full_s / runs:>10.1f}{1000 * retrieve_s / runs:>13.1f}"
+                  f"{1000 * rerank_s / runs:>11.1f}{full_s / pooled_s:>8.1f}x{found / max(1, total):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
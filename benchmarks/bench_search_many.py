@@ -0,0 +1,54 @@
+"""
+Throughput of per-query search()/similarity() loops vs search_many()/similarity_many()
+
+    python -m benchmarks.bench_search_many --sizes 10000 100000 --queries 1000
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from src.music_agent.tools.library import MusicLibrary
+from benchmarks.synthetic import make_songs
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'tracks':>10}{'api':>12}{'loop s':>10}{'batch s':>10}{'speedup':>10}{'identical':>11}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "songs.json"
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump([s.model_dump() for s in make_songs(n)], f)
+            lib = MusicLibrary(path)
+            lib.load()
+
+            rng = random.Random(0)
+            words = sorted(lib._tfidf.vocabulary_)
+            queries = [" ".join(rng.sample(words, rng.randint(1, 3))) for _ in range(args.queries)]
+            seed_sets = [[lib.songs[rng.randrange(n)] for _ in range(3)] for _ in range(args.queries)]
+
+            looped, loop_s = timed(lambda: [[s.id for s in lib.search(q, args.k)] for q in queries])
+            (batched, _), batch_s = timed(lambda: lib.search_many(queries, args.k))
+            print(f"{n:>10}{'search':>12}{loop_s:>10.2f}{batch_s:>10.2f}{loop_s / batch_s:>9.1f}x{str(looped == batched):>11}")
+
+            looped, loop_s = timed(lambda: [[s.id for s in lib.similarity(seeds, args.k)] for seeds in seed_sets])
+            (batched, _), batch_s = timed(lambda: lib.similarity_many(seed_sets, args.k))
+            print(f"{n:>10}{'similarity':>12}{loop_s:>10.2f}{batch_s:>10.2f}{loop_s / batch_s:>9.1f}x{str(looped == batched):>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Memory per track and load time: a list of Song models vs the columnar SongTable
+
+Each store is measured in a fresh subprocess so RSS numbers do not bleed
+into each other.
+
+    python -m benchmarks.bench_song_store --sizes 100000 1000000
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import make_songs
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def write_catalog(path: Path, n: int):
+    songs = make_songs(n)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([s.model_dump() for s in songs], f)
+
+
+def measure(path: str, store: str):
+    from src.music_agent.state import Song
+    from src.music_agent.tools.song_table import SongTable
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    gc.collect()
+    before = rss_bytes()
+
+    start = time.perf_counter()
+    if store == "table":
+        songs = SongTable.from_records(data)
+    else:
+        songs = [Song(**d) for d in data]
+    load_s = time.perf_counter() - start
+
+    del data
+    gc.collect()
+    # the raw JSON tree was resident in the baseline, so freeing it offsets the store's growth
+    after = rss_bytes()
+    store_bytes = songs.nbytes() if store == "table" else None
+    json.dump({"load_s": load_s, "rss_delta": after - before, "store_bytes": store_bytes}, sys.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--measure", nargs=2, metavar=("PATH", "STORE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    print(f"{'tracks':>10}{'store':>8}{'load s':>10}{'RSS MB':>10}{'B/track':>10}{'arrays B/track':>16}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "songs.json"
+            write_catalog(path, n)
+
+            # the JSON tree itself, so the retained size can be reported net of it
+            baseline = json.loads(subprocess.run(
+                [sys.executable, "-c",
+                 "import gc, json, sys\n"
+                 "from benchmarks.bench_song_store import rss_bytes\n"
+                 f"data = json.load(open({str(path)!r}))\n"
+                 "gc.collect(); before = rss_bytes(); del data; gc.collect()\n"
+                 "json.dump({'json_bytes': before - rss_bytes()}, sys.stdout)"],
+                capture_output=True, text=True, check=True,
+            ).stdout)["json_bytes"]
+
+            for store in ("models", "table"):
+                result = json.loads(subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_song_store", "--measure", str(path), store],
+                    capture_output=True, text=True, check=True,
+                ).stdout)
+                retained = result["rss_delta"] + baseline
+                arrays = f"{result['store_bytes'] / n:.0f}" if result["store_bytes"] else "-"
+                print(f"{n:>10}{store:>8}{result['load_s']:>10.2f}{retained / 1e6:>10.1f}{retained / n:>10.0f}{arrays:>16}")
+
+
+if __name__ == "__main__":
+    main()
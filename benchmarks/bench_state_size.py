@@ -0,0 +1,90 @@
+"""
+Checkpoint size and per-request latency of the graph with a MemorySaver
+
+State refers to the library by handle; "songs by value" is what one copy of
+the catalog costs through the same serializer, which every checkpoint used
+to carry when state held lib.songs. "state KB" is one request's 12
+checkpoints; with candidate_tracks and logs no longer appended onto
+themselves by every node it is about 65 KB at any catalog size (it was
+about 290 KB before that fix).
+
+    python -m benchmarks.bench_state_size --sizes 500 10000 50000
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from src.music_agent.graph import build_multi_agent_graph
+from src.music_agent.tools.library import MusicLibrary
+from benchmarks.synthetic import make_songs
+
+
+def initial_state(lib: MusicLibrary, query: str) -> dict:
+    return {
+        "user_id": "bench",
+        "query": query,
+        "library_id": lib.handle,
+        "catalog_version": None,
+        "candidate_pool": None,
+        "candidate_tracks": [],
+        "final_playlist": [],
+        "explanations": [],
+        "playlist_title": None,
+        "playlist_description": None,
+        "logs": [],
+        "error": None,
+        "requires_human_review": False,
+        "feedback": None,
+        "trace_id": None,
+    }
+
+
+def thread_bytes(saver: MemorySaver, thread_id: str) -> tuple[int, int]:
+    checkpoints = saver.storage[thread_id][""]
+    blobs = sum(len(blob) for key, (_, blob) in saver.blobs.items() if key[0] == thread_id)
+    return blobs + sum(len(checkpoint[1]) for checkpoint, *_ in checkpoints.values()), len(checkpoints)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 10_000, 50_000])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--query", default="chill study music")
+    args = parser.parse_args()
+
+    print(f"{'tracks':>10}{'plain ms':>10}{'saved ms':>10}{'checkpoints':>13}{'state KB':>10}{'songs by value MB':>19}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "songs.json"
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump([s.model_dump() for s in make_songs(n)], f)
+            lib = MusicLibrary(path)
+            lib.load()
+
+            plain, _ = build_multi_agent_graph(lib)
+            saver = MemorySaver()
+            saved, _ = build_multi_agent_graph(lib, checkpointer=saver)
+
+            plain_s, saved_s = [], []
+            for i in range(args.runs):
+                start = time.perf_counter()
+                plain.invoke(initial_state(lib, args.query))
+                plain_s.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                saved.invoke(initial_state(lib, args.query), {"configurable": {"thread_id": f"run-{i}"}})
+                saved_s.append(time.perf_counter() - start)
+
+            size, checkpoints = thread_bytes(saver, f"run-{args.runs - 1}")
+            _, by_value = saver.serde.dumps_typed(list(lib.songs))
+            print(f"{n:>10}{1000 * statistics.median(plain_s):>10.1f}{1000 * statistics.median(saved_s):>10.1f}"
+                  f"{checkpoints:>13}{size / 1e3:>10.0f}{len(by_value) / 1e6:>19.1f}")
+
+
+if __name__ == "__main__":
+    main()
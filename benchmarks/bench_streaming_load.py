@@ -0,0 +1,97 @@
+"""
+Peak RSS and wall time of catalog loading: json.load + Song list vs the streaming loader
+
+Each loader runs in a fresh subprocess and reports VmHWM (ru_maxrss would
+carry over the parent's high-water mark across fork/exec). "json.load"
+and "stream" only ingest and validate songs; the library modes also build
+the indexes and fit TF-IDF.
+
+    python -m benchmarks.bench_streaming_load --sizes 100000 1000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import make_songs
+
+
+def peak_rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def write_catalogs(directory: Path, n: int) -> dict:
+    songs = make_songs(n)
+    array_path, lines_path = directory / "songs.json", directory / "songs.jsonl"
+    with open(array_path, "w", encoding="utf-8") as fa, open(lines_path, "w", encoding="utf-8") as fl:
+        fa.write("[")
+        for i, s in enumerate(songs):
+            record = s.model_dump_json()
+            fa.write(("," if i else "") + record)
+            fl.write(record + "\n")
+        fa.write("]")
+    return {"json": array_path, "jsonl": lines_path}
+
+
+def run(mode: str, path: str):
+    from src.music_agent.state import Song
+    from src.music_agent.tools.library import MusicLibrary
+    from src.music_agent.tools.catalog_stream import iter_song_chunks
+
+    start = time.perf_counter()
+    if mode == "json.load":
+        # the pre-streaming MusicLibrary.load ingestion
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        songs = [Song(**d) for d in data]
+        del data
+        count = len(songs)
+    elif mode == "stream":
+        count = sum(len(chunk) for chunk in iter_song_chunks(path))
+    else:
+        lib = MusicLibrary(Path(path), song_store=mode.split("+")[1])
+        reports = []
+        count = lib.load(progress=lambda p: reports.append(p.records))
+    elapsed = time.perf_counter() - start
+    peak_mb = peak_rss_mb()
+    json.dump({"count": count, "elapsed": elapsed, "peak_mb": peak_mb}, sys.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--modes", nargs="+",
+                        default=["json.load", "stream", "library+models", "library+table"])
+    parser.add_argument("--run", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run(*args.run)
+        return
+
+    print(f"{'tracks':>10}{'format':>8}{'mode':>16}{'seconds':>10}{'peak MB':>10}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = write_catalogs(Path(tmp), n)
+            for fmt, path in paths.items():
+                for mode in args.modes:
+                    if mode == "json.load" and fmt == "jsonl":
+                        continue
+                    result = json.loads(subprocess.run(
+                        [sys.executable, "-m", "benchmarks.bench_streaming_load", "--run", mode, str(path)],
+                        capture_output=True, text=True, check=True,
+                        env={**os.environ, "TFIDF_ARTIFACTS": "0"},
+                    ).stdout)
+                    print(f"{n:>10}{fmt:>8}{mode:>16}{result['elapsed']:>10.2f}{result['peak_mb']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
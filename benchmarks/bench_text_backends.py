@@ -0,0 +1,70 @@
+"""
+Text feature backends compared: fit time, memory, query latency, agreement with
+word TF-IDF, and how often a misspelt artist name still finds that artist
+
+    python -m benchmarks.bench_text_backends --sizes 10000 100000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from src.music_agent.tools.library import MusicLibrary
+from src.music_agent.tools.tfidf_store import TEXT_BACKENDS, make_vectorizer, vectorizer_nbytes
+from src.music_agent.tools.vector_index import ExactIndex
+from benchmarks.synthetic import make_songs
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    letters = [i for i, c in enumerate(name) if c.isalpha()]
+    i = rng.choice(letters)
+    return name[:i] + name[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    text_of = MusicLibrary(None)._song_text
+    print(f"{'tracks':>10}{'backend':>9}{'fit s':>8}{'vocab MB':>10}{'matrix MB':>11}"
+          f"{'ms/query':>10}{'overlap':>9}{'typo hit':>10}")
+    for n in args.sizes:
+        songs = make_songs(n)
+        corpus = [text_of(s) for s in songs]
+        rng = random.Random(1)
+        seeds = [rng.randrange(n) for _ in range(args.queries)]
+        queries = [corpus[i] for i in seeds]
+        artists = [a for a in sorted({s.artist for s in songs}) if len(a) > 4 and not a.startswith("Artist ")]
+        typos = [(a, misspell(a, rng)) for a in rng.sample(artists, min(len(artists), args.queries))]
+
+        reference = None
+        for backend in TEXT_BACKENDS:
+            start = time.perf_counter()
+            vectorizer = make_vectorizer(backend)
+            matrix = vectorizer.fit_transform(corpus)
+            index = ExactIndex().build(matrix)
+            fit_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            results = [set(index.query(vectorizer.transform([q]), args.k)[0].tolist()) for q in queries]
+            ms = (time.perf_counter() - start) / len(queries) * 1000
+            if reference is None:
+                reference = results
+            overlap = np.mean([len(a & b) / args.k for a, b in zip(results, reference)])
+
+            hits = 0
+            for artist, typo in typos:
+                top, _ = index.query(vectorizer.transform([typo]), args.k)
+                hits += any(songs[i].artist == artist for i in top)
+
+            matrix_mb = (matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes) / 1e6
+            print(f"{n:>10}{backend:>9}{fit_s:>8.2f}{vectorizer_nbytes(vectorizer) / 1e6:>10.1f}{matrix_mb:>11.1f}"
+                  f"{ms:>10.2f}{overlap:>9.2f}{hits / len(typos):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
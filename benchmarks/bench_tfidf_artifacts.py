@@ -0,0 +1,60 @@
+"""
+Cold start: refitting TF-IDF vs loading the memory-mapped artifact
+
+    python -m benchmarks.bench_tfidf_artifacts --sizes 10000 100000 1000000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from src.music_agent.tools.library import MusicLibrary
+from src.music_agent.tools.tfidf_store import (
+    make_vectorizer,
+    corpus_hash,
+    artifact_dir,
+    save_artifacts,
+    load_artifacts,
+)
+from benchmarks.synthetic import make_songs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    text_of = MusicLibrary(None)._song_text
+    print(f"{'tracks':>10}{'hash s':>10}{'refit s':>10}{'save s':>10}{'mmap s':>10}{'speedup':>10}{'identical':>11}")
+    for n in args.sizes:
+        corpus = [text_of(s) for s in make_songs(n)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            data_path = Path(tmp) / "songs.json"
+
+            start = time.perf_counter()
+            directory = artifact_dir(data_path, corpus_hash(corpus))
+            hash_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            vectorizer = make_vectorizer()
+            matrix = vectorizer.fit_transform(corpus)
+            refit_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            save_artifacts(directory, vectorizer, matrix)
+            save_s = time.perf_counter() - start
+
+            # a warm start still hashes the corpus to find its artifact
+            start = time.perf_counter()
+            loaded_vectorizer, loaded = load_artifacts(artifact_dir(data_path, corpus_hash(corpus)))
+            load_s = time.perf_counter() - start
+
+            identical = (loaded != matrix).nnz == 0 and loaded_vectorizer.vocabulary_ == vectorizer.vocabulary_
+            print(f"{n:>10}{hash_s:>10.2f}{refit_s:>10.2f}{save_s:>10.2f}{load_s:>10.2f}"
+                  f"{refit_s / load_s:>9.1f}x{str(identical):>11}")
+            del loaded, loaded_vectorizer
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Time to first useful content in the Generate flow: blocking invoke_workflow
+(nothing to show until it returns) vs stream_workflow (playlist shown when
+the critic finishes, explanation and title filled in word by word)
+
+LLM calls go to the fake provider: --latency-ms before the first word and
+--token-ms per further word. Caches are off.
+
+    python -m benchmarks.bench_time_to_content --latency-ms 400 --token-ms 30
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("MUSIC_INTENT_CACHE_DB", "off")
+os.environ.setdefault("MUSIC_INTENT_CACHE_SIZE", "0")
+
+from src.music_agent.graph import get_compiled_graph, invoke_workflow, stream_workflow
+from src.music_agent.tools.llm_gateway import FakeProvider, set_llm_provider
+
+QUERIES = [
+    "chill study music",
+    "songs like Taylor Swift",
+    "happy pop for a party",
+    "rock but no metal",
+    "focus work music",
+]
+
+
+def blocking(query: str) -> dict:
+    start = time.perf_counter()
+    invoke_workflow(query, use_cache=False)
+    total = time.perf_counter() - start
+    return {"playlist": total, "first_words": total, "explanation": total, "title": total, "total": total}
+
+
+def streamed(query: str) -> dict:
+    start = time.perf_counter()
+    marks = {}
+    for event in stream_workflow(query, use_cache=False):
+        now = time.perf_counter() - start
+        if event.kind == "state" and "critic" in event.nodes:
+            marks["playlist"] = now
+        elif event.kind == "delta" and event.field == "explanation":
+            marks.setdefault("first_words", now)
+        elif event.kind == "delta" and event.field == "title":
+            marks.setdefault("title", now)
+        elif event.kind == "state" and "explainer" in event.nodes:
+            marks["explanation"] = now
+    marks["total"] = time.perf_counter() - start
+    return marks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency-ms", type=float, default=400.0)
+    parser.add_argument("--token-ms", type=float, default=30.0)
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    get_compiled_graph()
+    set_llm_provider(FakeProvider(latency_ms=args.latency_ms, token_ms=args.token_ms))
+    queries = QUERIES * args.repeat
+    columns = ["playlist", "first_words", "explanation", "title", "total"]
+
+    print(f"{'mode':>10}" + "".join(f"{c + ' ms':>16}" for c in columns))
+    for label, run in (("blocking", blocking), ("streamed", streamed)):
+        runs = [run(q) for q in queries]
+        means = [statistics.mean(1000 * r[c] for r in runs) for c in columns]
+        print(f"{label:>10}" + "".join(f"{m:>16.0f}" for m in means))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Cost of per-node tracing on the hot path, and the per-node latency breakdown
+it collects
+
+The same queries run through a graph built with trace=False and one with
+trace=True. LLM calls go to the fake provider; with the default
+--latency-ms 0 the graph is CPU-bound, which is where the instrumentation
+overhead shows most. Caches are off.
+
+    python -m benchmarks.bench_tracing --latency-ms 0 --repeat 20
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("MUSIC_INTENT_CACHE_DB", "off")
+os.environ.setdefault("MUSIC_INTENT_CACHE_SIZE", "0")
+
+from src.music_agent.graph import build_multi_agent_graph
+from src.music_agent.tools.library import load_default_library
+from src.music_agent.tools.llm_gateway import FakeProvider, set_llm_provider
+from src.music_agent.tools.tracing import get_tracer
+
+QUERIES = [
+    "chill study music",
+    "songs like Taylor Swift",
+    "happy pop for a party",
+    "rock but no metal",
+    "focus work music",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--token-ms", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    lib = load_default_library()
+    plain, _ = build_multi_agent_graph(lib, trace=False)
+    traced, _ = build_multi_agent_graph(lib, trace=True)
+    set_llm_provider(FakeProvider(latency_ms=args.latency_ms, token_ms=args.token_ms))
+    queries = QUERIES * args.repeat
+    registry = get_tracer().registry
+
+    # warm both graphs before timing
+    for app in (plain, traced):
+        for query in QUERIES:
+            app.invoke({"query": query})
+    registry.reset()
+
+    print(f"{'graph':>10}{'mean ms':>10}{'p95 ms':>9}")
+    means = {}
+    for label, app in (("untraced", plain), ("traced", traced)):
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            app.invoke({"query": query})
+            latencies.append(1000 * (time.perf_counter() - start))
+        latencies.sort()
+        means[label] = statistics.mean(latencies)
+        print(f"{label:>10}{means[label]:>10.2f}{latencies[int(0.95 * (len(latencies) - 1))]:>9.2f}")
+    spans = len(registry.spans())
+    print(f"overhead: {means['traced'] - means['untraced']:+.2f} ms per run, "
+          f"{1000 * (means['traced'] - means['untraced']) * len(queries) / max(1, spans):+.1f} us per span")
+
+    snapshot = registry.snapshot()
+    print(f"\n{'node':>18}{'runs':>6}{'mean ms':>9}{'p50 ms':>8}{'p95 ms':>8}{'cpu ms':>8}{'llm ms':>8}{'tokens':>12}")
+    for node, agg in snapshot["nodes"].items():
+        print(f"{node:>18}{agg['count']:>6}{agg['wall_ms_mean']:>9.2f}{agg['wall_ms_p50']:>8.2f}{agg['wall_ms_p95']:>8.2f}"
+              f"{agg['cpu_ms_mean']:>8.2f}{agg['llm_ms_mean']:>8.2f}"
+              f"{str(agg['prompt_tokens']) + '/' + str(agg['completion_tokens']):>12}")
+    llm = snapshot["llm"]
+    print(f"LLM: {llm['calls']} calls, {llm['ms_mean']:.1f} ms mean, "
+          f"{llm['prompt_tokens']}/{llm['completion_tokens']} tokens (estimated for the fake provider)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Recall@k and query latency of the vector index backends on synthetic catalogs
+
+    python -m benchmarks.bench_vector_index --sizes 10000 100000 --nprobe 8 16 32
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from src.music_agent.tools.library import MusicLibrary
+from src.music_agent.tools.vector_index import ExactIndex, IVFIndex
+from benchmarks.synthetic import make_songs
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def recall(exact_scores, ann_positions, k):
+    # tie-aware: an ANN hit counts if it scores at least the exact k-th best
+    hits = 0
+    for scores, positions in zip(exact_scores, ann_positions):
+        kth = np.sort(scores)[-k]
+        hits += int(np.sum(scores[positions] >= kth - 1e-12))
+    return hits / (k * len(exact_scores))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32])
+    args = parser.parse_args()
+
+    text_of = MusicLibrary(None)._song_text
+    print(f"{'tracks':>10}{'backend':>14}{'build s':>10}{'ms/query':>10}{'recall@k':>10}")
+    for n in args.sizes:
+        songs = make_songs(n)
+        tfidf = TfidfVectorizer(stop_words="english")
+        matrix = tfidf.fit_transform([text_of(s) for s in songs])
+
+        rng = random.Random(1)
+        # similarity-style queries: the combined text of three random seed tracks
+        queries = [tfidf.transform([" \n".join(text_of(songs[rng.randrange(n)]) for _ in range(3))])
+                   for _ in range(args.queries)]
+
+        exact_scores = [cosine_similarity(q, matrix).ravel() for q in queries]
+        _, argsort_ms = timed(lambda q: np.argsort(-cosine_similarity(q, matrix).ravel())[:args.k], queries)
+        print(f"{n:>10}{'argsort':>14}{'-':>10}{argsort_ms:>10.2f}{1.0:>10.3f}")
+
+        start = time.perf_counter()
+        exact = ExactIndex().build(matrix)
+        build_s = time.perf_counter() - start
+        results, ms = timed(lambda q: exact.query(q, args.k)[0], queries)
+        print(f"{n:>10}{'exact':>14}{build_s:>10.2f}{ms:>10.2f}{recall(exact_scores, results, args.k):>10.3f}")
+
+        start = time.perf_counter()
+        ivf = IVFIndex().build(matrix)
+        build_s = time.perf_counter() - start
+        for nprobe in args.nprobe:
+            ivf.nprobe = nprobe
+            results, ms = timed(lambda q: ivf.query(q, args.k)[0], queries)
+            label = f"ivf/{nprobe}"
+            print(f"{n:>10}{label:>14}{build_s:>10.2f}{ms:>10.2f}{recall(exact_scores, results, args.k):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
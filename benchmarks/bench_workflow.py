@@ -0,0 +1,119 @@
+"""
+End-to-end invoke_workflow latency and throughput with no network
+
+LLM calls go to the fake provider (a fixed delay per call) or are replayed
+from fixtures. With --provider replay and no --fixtures, the fixtures are
+first recorded from the fake provider into a temporary file. Result and
+intent caches are off so every request runs the whole graph. Each
+concurrency level runs the same requests on threads (invoke_workflow) and
+on one event loop (ainvoke_workflow), and checks the playlists match the
+sequential run.
+
+    python -m benchmarks.bench_workflow --latency-ms 300 --requests 24 --concurrency 1 4 8
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+os.environ.setdefault("MUSIC_INTENT_CACHE_DB", "off")
+os.environ.setdefault("MUSIC_INTENT_CACHE_SIZE", "0")
+
+from src.music_agent.graph import ainvoke_workflow, get_compiled_graph, invoke_workflow
+from src.music_agent.tools.llm_gateway import (
+    FakeProvider,
+    FixtureStore,
+    RecordingProvider,
+    ReplayProvider,
+    set_llm_provider,
+)
+
+QUERIES = [
+    "chill study music",
+    "happy pop for a party",
+    "songs like Taylor Swift",
+    "sad indie songs for a rainy night",
+    "focus work music",
+    "rock but no metal",
+    "energetic hip-hop for running",
+    "recommend me some songs",
+]
+
+
+def run_threads(queries, workers: int):
+    def one(query):
+        start = time.perf_counter()
+        result = invoke_workflow(query, use_cache=False)
+        return time.perf_counter() - start, [s.id for s in result["final_playlist"]]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(one, queries))
+
+
+def run_async(queries, workers: int):
+    async def main():
+        limit = asyncio.Semaphore(workers)
+
+        async def one(query):
+            async with limit:
+                start = time.perf_counter()
+                result = await ainvoke_workflow(query, use_cache=False)
+                return time.perf_counter() - start, [s.id for s in result["final_playlist"]]
+
+        return await asyncio.gather(*(one(q) for q in queries))
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--provider", choices=["fake", "replay"], default="fake")
+    parser.add_argument("--fixtures", type=Path, default=None)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--requests", type=int, default=24)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    get_compiled_graph()
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.requests)]
+    fake = FakeProvider(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.provider == "replay":
+            fixtures_path = args.fixtures
+            if fixtures_path is None:
+                fixtures_path = Path(tmp) / "llm_fixtures.jsonl"
+                set_llm_provider(RecordingProvider(FakeProvider(latency_ms=0), FixtureStore(fixtures_path)))
+                for query in QUERIES:
+                    invoke_workflow(query, use_cache=False)
+            fixtures = FixtureStore(fixtures_path)
+            print(f"replaying {len(fixtures)} recorded responses from {fixtures_path}")
+            gateway = set_llm_provider(ReplayProvider(fixtures, latency_ms=args.latency_ms))
+        else:
+            gateway = set_llm_provider(fake)
+
+        reference = {q: ids for q, (_, ids) in zip(queries, run_threads(queries, 1))}
+
+        print(f"{'mode':>8}{'workers':>9}{'req/s':>8}{'mean ms':>10}{'p95 ms':>9}{'same':>6}")
+        for workers in args.concurrency:
+            for mode, run in (("threads", run_threads), ("async", run_async)):
+                start = time.perf_counter()
+                results = run(queries, workers)
+                wall = time.perf_counter() - start
+                latencies = sorted(1000 * t for t, _ in results)
+                p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+                same = all(ids == reference[q] for q, (_, ids) in zip(queries, results))
+                print(f"{mode:>8}{workers:>9}{len(queries) / wall:>8.1f}{statistics.mean(latencies):>10.1f}"
+                      f"{p95:>9.1f}{str(same):>6}")
+
+        stats = gateway.stats()
+        print(f"LLM calls: {stats['calls']} blocking, {stats['async_calls']} async, {stats['errors']} failed")
+
+
+if __name__ == "__main__":
+    main()
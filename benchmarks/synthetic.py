@@ -0,0 +1,45 @@
+"""
+Synthetic catalogs for benchmarks, drawn from the vocabularies of the bundled songs.json
+"""
+import json
+import random
+from pathlib import Path
+
+from src.music_agent.state import Song
+
+SONGS_FILE = Path(__file__).parents[1] / "src" / "music_agent" / "data" / "songs.json"
+
+
+def make_songs(n: int, seed: int = 0) -> list[Song]:
+    with open(SONGS_FILE, "r", encoding="utf-8") as f:
+        base = json.load(f)
+
+    rng = random.Random(seed)
+    genres = sorted({g for s in base for g in s["genres"]})
+    tags = sorted({t for s in base for t in s["tags"]})
+    moods = sorted({s["mood"] for s in base if s.get("mood")})
+    # scale the artist pool with the catalog so artist filters stay selective
+    artists = sorted({s["artist"] for s in base}) + [f"Artist {i}" for i in range(max(0, n // 20))]
+
+    songs = []
+    for i in range(n):
+        template = base[i % len(base)]
+        songs.append(Song.model_construct(
+            id=f"syn{i}",
+            # no per-track suffix: unique tokens would bloat the TF-IDF vocabulary
+            name=template["name"],
+            artist=rng.choice(artists),
+            album=template.get("album"),
+            year=rng.randint(1960, 2024),
+            duration_sec=rng.randint(120, 420),
+            genres=rng.sample(genres, rng.randint(1, 3)),
+            tags=rng.sample(tags, rng.randint(1, 4)),
+            category=template.get("category"),
+            mood=rng.choice(moods),
+            energy=round(rng.random(), 2),
+            danceability=round(rng.random(), 2),
+            valence=round(rng.random(), 2),
+            popularity=rng.randint(1, 100),
+            cover_url=None,
+        ))
+    return songs
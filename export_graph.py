@@ -23,7 +23,8 @@ graph TD
     Init --> Orch[🧑‍✈️ Orchestrator<br/>Parse intent & context]
     Orch --> Memory[🧬 Memory Agent<br/>Load user profile]
     
-    Memory --> Parallel{Parallel Execution}
+    Memory --> Retrieve[🔎 Retriever<br/>Bounded candidate pool]
+    Retrieve --> Parallel{Parallel Execution}
     
     Parallel --> Taste[🎯 Taste DJ<br/>Familiar recommendations]
     Parallel --> Explorer[🧪 Chaos DJ<br/>Novel discoveries]
@@ -39,8 +40,10 @@ graph TD
     Human --> Critic
     
     Critic --> Explain[🌈 Storyteller<br/>Generate explanation]
+    Critic --> Namer[🏷️ Namer<br/>Title & description]
     
     Explain --> Done[Final Playlist]
+    Namer --> Done
     Done --> End([Return to User])
     
     style Orch fill:#4a90e2
@@ -50,6 +53,7 @@ graph TD
     style Safety fill:#ffd700
     style Critic fill:#ff8c42
     style Explain fill:#9b59b6
+    style Namer fill:#9b59b6
 ```
 
 ## Agent Responsibilities
@@ -73,6 +77,12 @@ graph TD
   - Listening history
 - **Updates**: On every feedback action
 
+### 🔎 Retriever
+- **Role**: Candidate generation for large catalogs
+- **Input**: Preferences, session context, liked songs
+- **Output**: Bounded pool of catalog positions (MUSIC_CANDIDATE_POOL, on from MUSIC_RETRIEVAL_MIN_TRACKS tracks)
+- **Sources**: Text search, liked-song similarity, inverted-index filters, popular fill
+
 ### 🎯 Taste DJ (Recommender)
 - **Role**: Safe bets that match taste
 - **Strategy**: 
@@ -112,6 +122,12 @@ graph TD
 - **Output**: Engaging 2-3 sentence summary
 - **Capability**: Per-song "why" answers
 
+### 🏷️ Namer
+- **Role**: Playlist title and one-line description
+- **Input**: Final playlist + query + mood
+- **Output**: playlist_title, playlist_description
+- **Runs**: Beside the Storyteller, so both LLM calls overlap
+
 ### 📊 Feedback Agent
 - **Role**: Learning & adaptation
 - **Triggers**: Like/dislike/skip actions
@@ -129,9 +145,13 @@ AppState {
     intent: recommend | explain | update_prefs
     preferences: {genres, artists, moods, size, novelty_tolerance}
     session_context: {activity, duration, mood}
+    library_id: str  # library handle, songs are never copied into state
+    candidate_pool: [int] | None  # catalog positions the recommenders rerank
     candidate_tracks: [CandidateTrack]  # from multiple agents
     final_playlist: [Song]
     explanations: [str]
+    playlist_title: str | None
+    playlist_description: str | None
     logs: [AgentLog]  # full trace
     requires_human_review: bool
 }
@@ -141,7 +161,7 @@ AppState {
 
 ### ✅ Multi-Agent Coordination
 - Orchestrator routes workflow
-- Parallel execution (Taste + Explorer)
+- Parallel execution (Taste + Explorer, Storyteller + Namer)
 - Agent specialization (taste vs novelty)
 
 ### ✅ Persistent Memory
@@ -157,7 +177,7 @@ AppState {
 ### ✅ Advanced LangGraph Features
 - TypedDict state with Annotated fields
 - Conditional routing (review, error handling)
-- Parallel branches (simulated)
+- Parallel branches (fan-out / fan-in)
 - Stateful checkpointing (memory)
 
 ### ✅ Tracing & Debuggability
@@ -188,11 +208,19 @@ agents_meta = {
         "output": "Long-term taste profile",
         "uses_llm": False
     },
+    "retrieve": {
+        "emoji": "🔎",
+        "name": "Retriever",
+        "role": "Candidate generation",
+        "input": "User preferences + library",
+        "output": "Bounded candidate pool",
+        "uses_llm": False
+    },
     "taste_recommender": {
         "emoji": "🎯",
         "name": "Taste DJ",
         "role": "Familiar recommendations",
-        "input": "User preferences + library",
+        "input": "User preferences + candidate pool",
         "output": "Ranked familiar tracks (~70%)",
         "uses_llm": False
     },
@@ -200,7 +228,7 @@ agents_meta = {
         "emoji": "🧪",
         "name": "Chaos DJ",
         "role": "Novel discoveries",
-        "input": "User profile + library",
+        "input": "User profile + candidate pool",
         "output": "High-novelty tracks (~30%)",
         "uses_llm": False
     },
@@ -228,6 +256,14 @@ agents_meta = {
         "output": "Engaging summary",
         "uses_llm": True
     },
+    "namer": {
+        "emoji": "🏷️",
+        "name": "Namer",
+        "role": "Playlist naming",
+        "input": "Playlist + query + mood",
+        "output": "Title and description",
+        "uses_llm": True
+    },
     "feedback": {
         "emoji": "📊",
         "name": "Feedback Agent",
@@ -247,26 +283,37 @@ workflow_structure = {
         "initialize",
         "orchestrator",
         "memory",
-        "recommenders (parallel: taste + explorer)",
+        "retrieve",
+        "taste_recommender",
+        "explorer",
+        "merge",
         "safety",
         "critic",
         "explainer",
+        "namer",
         "done"
     ],
     "edges": [
         {"from": "initialize", "to": "orchestrator"},
         {"from": "orchestrator", "to": "memory", "condition": "no error"},
-        {"from": "memory", "to": "recommenders"},
-        {"from": "recommenders", "to": "safety"},
+        {"from": "memory", "to": "retrieve"},
+        {"from": "retrieve", "to": "taste_recommender"},
+        {"from": "retrieve", "to": "explorer"},
+        {"from": "taste_recommender", "to": "merge"},
+        {"from": "explorer", "to": "merge"},
+        {"from": "merge", "to": "safety"},
         {"from": "safety", "to": "critic", "condition": "no human review needed"},
         {"from": "safety", "to": "human_review", "condition": "review required"},
         {"from": "human_review", "to": "critic"},
         {"from": "critic", "to": "explainer"},
+        {"from": "critic", "to": "namer"},
         {"from": "explainer", "to": "done"},
+        {"from": "namer", "to": "done"},
         {"from": "done", "to": "END"}
     ],
     "parallel_branches": [
-        ["taste_recommender", "explorer"]
+        ["taste_recommender", "explorer"],
+        ["explainer", "namer"]
     ],
     "conditional_routing": [
         {"node": "orchestrator", "conditions": ["error_check"]},
@@ -3,6 +3,7 @@ from typing import List
 import numpy as np
 
 from src.music_agent.state import AppState, CandidateTrack, Song, AgentLog
+from src.music_agent.tools.ranking import top_k_indices, iter_ranked_indices
 
 
 def multi_objective_score(candidate: CandidateTrack, state: AppState) -> float:
@@ -47,20 +48,23 @@ def multi_objective_score(candidate: CandidateTrack, state: AppState) -> float:
 def critic_agent(state: AppState) -> AppState:
     """Critic Agent: Reranks and curates final playlist"""
     
-    for candidate in state["candidate_tracks"]:
+    candidates = state["candidate_tracks"]
+    for candidate in candidates:
         candidate.score = multi_objective_score(candidate, state)
     
-    state["candidate_tracks"].sort(key=lambda x: x.score, reverse=True)
+    scores = [c.score for c in candidates]
     
     final_songs = []
     seen_artists = set()
     seen_song_ids = set()
     target_size = state["preferences"].size
     
-    for candidate in state["candidate_tracks"]:
+    # walk candidates best-first, only ranking as deep as needed to fill the playlist
+    for i in iter_ranked_indices(scores):
         if len(final_songs) >= target_size:
             break
         
+        candidate = candidates[i]
         if candidate.song.id in seen_song_ids:
             continue
             
@@ -70,7 +74,8 @@ def critic_agent(state: AppState) -> AppState:
             seen_song_ids.add(candidate.song.id)
     
     if len(final_songs) < target_size:
-        for candidate in state["candidate_tracks"]:
+        for i in iter_ranked_indices(scores):
+            candidate = candidates[i]
             if len(final_songs) >= target_size:
                 break
             if candidate.song.id not in seen_song_ids:
@@ -79,8 +84,9 @@ def critic_agent(state: AppState) -> AppState:
     
     state["final_playlist"] = final_songs[:target_size]
     
-    taste_count = sum(1 for c in state["candidate_tracks"][:target_size] if c.source_agent == "taste_recommender")
-    novel_count = sum(1 for c in state["candidate_tracks"][:target_size] if c.source_agent == "explorer")
+    top = [candidates[i] for i in top_k_indices(scores, target_size)]
+    taste_count = sum(1 for c in top if c.source_agent == "taste_recommender")
+    novel_count = sum(1 for c in top if c.source_agent == "explorer")
     
     state["logs"].append(AgentLog(
         agent_name="Critic",
@@ -1,50 +1,29 @@
 from __future__ import annotations
-import os
-from dotenv import load_dotenv
-from langchain_mistralai import ChatMistralAI
 from langchain_core.messages import SystemMessage, HumanMessage
 
 from src.music_agent.state import AppState, AgentLog
+from src.music_agent.tools.llm_gateway import get_llm_gateway, stream_writer
 
-load_dotenv()
 
-
-def _get_llm():
-    api_key = os.getenv("MISTRAL_API_KEY")
-    if not api_key or api_key == "your-mistral-api-key":
-        raise ValueError("MISTRAL_API_KEY not set")
-    model = os.getenv("DEFAULT_MODEL", "mistral:open-mistral-7b").split(":", 1)[1]
-    return ChatMistralAI(api_key=api_key, model=model, temperature=0.7)
-
-
-def explanation_agent(state: AppState) -> AppState:
-    """Explanation Agent: Creates engaging human-friendly explanations"""
+def _explanation_messages(state: AppState) -> list:
+    taste_songs = []
+    novel_songs = []
+    for candidate in state["candidate_tracks"]:
+        if candidate.song in state["final_playlist"]:
+            if candidate.source_agent == "taste_recommender":
+                taste_songs.append(candidate.song)
+            elif candidate.source_agent == "explorer":
+                novel_songs.append(candidate.song)
     
-    if not state["final_playlist"]:
-        state["explanations"].append("No playlist was created.")
-        return state
+    all_artists = list(dict.fromkeys(s.artist for s in state["final_playlist"]))
+    all_genres = list(dict.fromkeys(g for s in state["final_playlist"] for g in s.genres))
     
-    try:
-        taste_songs = []
-        novel_songs = []
-        for candidate in state["candidate_tracks"]:
-            if candidate.song in state["final_playlist"]:
-                if candidate.source_agent == "taste_recommender":
-                    taste_songs.append(candidate.song)
-                elif candidate.source_agent == "explorer":
-                    novel_songs.append(candidate.song)
-        
-        all_artists = list(set([s.artist for s in state["final_playlist"]]))
-        all_genres = list(set([g for s in state["final_playlist"] for g in s.genres]))
-        
-        playlist_details = f"ACTUAL PLAYLIST ({len(state['final_playlist'])} tracks):\n"
-        for i, song in enumerate(state["final_playlist"], 1):
-            source = "familiar" if any(c.song.id == song.id and c.source_agent == "taste_recommender" for c in state["candidate_tracks"]) else "new"
-            playlist_details += f"{i}. {song.name} by {song.artist} [{', '.join(song.genres[:2])}] - {source}\n"
-        
-        llm = _get_llm()
-        
-        prompt = f"""Create a fun explanation for this music playlist based on ACTUAL songs.
+    playlist_details = f"ACTUAL PLAYLIST ({len(state['final_playlist'])} tracks):\n"
+    for i, song in enumerate(state["final_playlist"], 1):
+        source = "familiar" if any(c.song.id == song.id and c.source_agent == "taste_recommender" for c in state["candidate_tracks"]) else "new"
+        playlist_details += f"{i}. {song.name} by {song.artist} [{', '.join(song.genres[:2])}] - {source}\n"
+    
+    prompt = f"""Create a fun explanation for this music playlist based on ACTUAL songs.
 
 User asked: "{state['query']}"
 Activity: {state['session_context'].activity or 'casual listening'}
@@ -62,46 +41,100 @@ Write 2-3 sentences that:
 3. Make it sound exciting but HONEST
 
 Be casual and accurate."""
-        
-        messages = [
-            SystemMessage(content="You are a music curator explaining playlists to friends."),
-            HumanMessage(content=prompt)
-        ]
-        
-        resp = llm.invoke(messages)
-        explanation = resp.content.strip()
-        
-        state["explanations"].append(explanation)
-        
-        state["logs"].append(AgentLog(
-            agent_name="Storyteller",
-            action="explained",
-            details=f"Generated user-friendly explanation ({len(explanation)} chars)"
-        ))
-        
+    
+    return [
+        SystemMessage(content="You are a music curator explaining playlists to friends."),
+        HumanMessage(content=prompt)
+    ]
+
+
+def _record_explanation(state: AppState, content: str):
+    explanation = content.strip()
+    
+    state["explanations"].append(explanation)
+    
+    state["logs"].append(AgentLog(
+        agent_name="Storyteller",
+        action="explained",
+        details=f"Generated user-friendly explanation ({len(explanation)} chars)"
+    ))
+
+
+def _fallback_explanation(state: AppState, e: Exception):
+    artists = list(dict.fromkeys(s.artist for s in state["final_playlist"]))[:5]
+    genres = list(dict.fromkeys(g for s in state["final_playlist"] for g in s.genres))[:5]
+    
+    taste_count = len([c for c in state["candidate_tracks"] if c.song in state["final_playlist"] and c.source_agent == "taste_recommender"])
+    novel_count = len([c for c in state["candidate_tracks"] if c.song in state["final_playlist"] and c.source_agent == "explorer"])
+    
+    explanation = f"Created a {len(state['final_playlist'])}-track playlist "
+    explanation += f"featuring {', '.join(artists[:3])}{'and more' if len(artists) > 3 else ''}. "
+    explanation += f"Mix of {genres[0]} and {genres[1]} with " if len(genres) >= 2 else ""
+    explanation += f"{taste_count} familiar tracks and {novel_count} new discoveries."
+    
+    state["explanations"].append(explanation)
+    
+    state["logs"].append(AgentLog(
+        agent_name="Storyteller",
+        action="fallback_explanation",
+        details=f"Used template explanation: {str(e)}"
+    ))
+
+
+def explanation_agent(state: AppState) -> AppState:
+    """Explanation Agent: Creates engaging human-friendly explanations, streamed as "explanation" deltas"""
+    
+    if not state["final_playlist"]:
+        state["explanations"].append("No playlist was created.")
+        return state
+    
+    try:
+        write = stream_writer()
+        chunks = []
+        for chunk in get_llm_gateway().stream(_explanation_messages(state), temperature=0.7):
+            chunks.append(chunk)
+            write({"field": "explanation", "delta": chunk})
+        _record_explanation(state, "".join(chunks))
+    except Exception as e:
+        _fallback_explanation(state, e)
+    
+    return state
+
+
+async def aexplanation_agent(state: AppState) -> AppState:
+    """Explanation Agent for async graph runs"""
+    
+    if not state["final_playlist"]:
+        state["explanations"].append("No playlist was created.")
+        return state
+    
+    try:
+        write = stream_writer()
+        chunks = []
+        async for chunk in get_llm_gateway().astream(_explanation_messages(state), temperature=0.7):
+            chunks.append(chunk)
+            write({"field": "explanation", "delta": chunk})
+        _record_explanation(state, "".join(chunks))
     except Exception as e:
-        artists = list(set([s.artist for s in state["final_playlist"]]))[:5]
-        genres = list(set([g for s in state["final_playlist"] for g in s.genres]))[:5]
-        
-        taste_count = len([c for c in state["candidate_tracks"] if c.song in state["final_playlist"] and c.source_agent == "taste_recommender"])
-        novel_count = len([c for c in state["candidate_tracks"] if c.song in state["final_playlist"] and c.source_agent == "explorer"])
-        
-        explanation = f"Created a {len(state['final_playlist'])}-track playlist "
-        explanation += f"featuring {', '.join(artists[:3])}{'and more' if len(artists) > 3 else ''}. "
-        explanation += f"Mix of {genres[0]} and {genres[1]} with " if len(genres) >= 2 else ""
-        explanation += f"{taste_count} familiar tracks and {novel_count} new discoveries."
-        
-        state["explanations"].append(explanation)
-        
-        state["logs"].append(AgentLog(
-            agent_name="Storyteller",
-            action="fallback_explanation",
-            details=f"Used template explanation: {str(e)}"
-        ))
+        _fallback_explanation(state, e)
     
     return state
 
 
+def explainer_branch(state: AppState) -> dict:
+    """Explainer as a graph node beside the namer: returns only its state delta"""
+    scratch = {**state, "explanations": [], "logs": []}
+    explanation_agent(scratch)
+    return {"explanations": scratch["explanations"], "logs": scratch["logs"]}
+
+
+async def aexplainer_branch(state: AppState) -> dict:
+    """Async explainer_branch"""
+    scratch = {**state, "explanations": [], "logs": []}
+    await aexplanation_agent(scratch)
+    return {"explanations": scratch["explanations"], "logs": scratch["logs"]}
+
+
 def generate_song_explanation(song, state: AppState) -> str:
     """Generate explanation for why a specific song was chosen"""
     
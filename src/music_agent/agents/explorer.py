@@ -2,7 +2,13 @@ from __future__ import annotations
 from typing import List
 import random
 
+import numpy as np
+
 from src.music_agent.state import AppState, CandidateTrack, Song, AgentLog
+from src.music_agent.tools.features import CatalogFeatures, pool_features
+from src.music_agent.tools.library import resolve_library
+from src.music_agent.tools.retrieval import candidate_pool
+from src.music_agent.tools.ranking import top_k_indices
 
 
 def calculate_novelty(song: Song, user_memory: dict) -> float:
@@ -24,111 +30,199 @@ def calculate_novelty(song: Song, user_memory: dict) -> float:
     return max(0.0, min(1.0, novelty))
 
 
-def explorer_agent(state: AppState) -> AppState:
-    """Explorer Agent: Pushes user out of comfort zone with novel recommendations"""
+def score_song_exploration(song: Song, novelty: float, user_memory: dict, session_context) -> float:
+    """Score how well a novel song fits the session while still stretching the user's taste"""
+    exploration_score = novelty
     
-    from src.music_agent.agents.memory import load_user_memory
+    for genre in song.genres:
+        if any(ug in genre or genre in ug for ug in user_memory.get("preferred_genres", [])):
+            exploration_score += 0.3
+            break
     
-    user_memory = load_user_memory(state["user_id"])
-    excluded_ids = set(user_memory.get("disliked_songs", []))
-    known_artists = set(user_memory.get("preferred_artists", []))
+    if session_context and session_context.activity:
+        activity = session_context.activity.lower()
+        if activity == "studying" or activity == "work":
+            if song.energy and song.energy < 0.5:
+                exploration_score += 1.0
+            elif song.energy and song.energy > 0.7:
+                exploration_score -= 0.5
+                
+        elif activity == "party" or activity == "dancing":
+            if song.energy and song.energy > 0.7:
+                exploration_score += 1.0
+            if song.danceability and song.danceability > 0.6:
+                exploration_score += 0.5
+            elif song.energy and song.energy < 0.4:
+                exploration_score -= 0.5
+                
+        elif activity == "gym" or activity == "workout":
+            if song.energy and song.energy > 0.8:
+                exploration_score += 1.5
+            elif song.energy and song.energy < 0.5:
+                exploration_score -= 1.0
     
-    novel_candidates = []
-    for song in state["library"]:
-        if song.id in excluded_ids:
-            continue
-        
-        if song.artist in known_artists:
-            continue
-        
-        novelty = calculate_novelty(song, user_memory)
-        
-        if novelty > 0.5:
-            exploration_score = novelty
-            
-            for genre in song.genres:
-                if any(ug in genre or genre in ug for ug in user_memory.get("preferred_genres", [])):
-                    exploration_score += 0.3
-                    break
-            
-            if state["session_context"] and state["session_context"].activity:
-                activity = state["session_context"].activity.lower()
-                if activity == "studying" or activity == "work":
-                    if song.energy and song.energy < 0.5:
-                        exploration_score += 1.0
-                    elif song.energy and song.energy > 0.7:
-                        exploration_score -= 0.5
-                        
-                elif activity == "party" or activity == "dancing":
-                    if song.energy and song.energy > 0.7:
-                        exploration_score += 1.0
-                    if song.danceability and song.danceability > 0.6:
-                        exploration_score += 0.5
-                    elif song.energy and song.energy < 0.4:
-                        exploration_score -= 0.5
-                        
-                elif activity == "gym" or activity == "workout":
-                    if song.energy and song.energy > 0.8:
-                        exploration_score += 1.5
-                    elif song.energy and song.energy < 0.5:
-                        exploration_score -= 1.0
-            
-            if state["session_context"] and state["session_context"].mood:
-                mood = state["session_context"].mood.lower()
-                if mood == "calm" and song.energy and song.energy < 0.4:
-                    exploration_score += 0.8
-                elif mood == "energetic" and song.energy and song.energy > 0.7:
-                    exploration_score += 0.8
-                elif mood == "happy" and song.valence and song.valence > 0.6:
-                    exploration_score += 0.5
-                elif mood == "sad" and song.valence and song.valence < 0.4:
-                    exploration_score += 0.5
-            
-            if state["session_context"].activity:
-                activity = state["session_context"].activity.lower()
-                if "gym" in activity or "workout" in activity:
-                    if song.energy and song.energy > 0.7:
-                        exploration_score += 0.5
-                elif "chill" in activity or "relax" in activity:
-                    if song.energy and song.energy < 0.4:
-                        exploration_score += 0.5
+    if session_context and session_context.mood:
+        mood = session_context.mood.lower()
+        if mood == "calm" and song.energy and song.energy < 0.4:
+            exploration_score += 0.8
+        elif mood == "energetic" and song.energy and song.energy > 0.7:
+            exploration_score += 0.8
+        elif mood == "happy" and song.valence and song.valence > 0.6:
+            exploration_score += 0.5
+        elif mood == "sad" and song.valence and song.valence < 0.4:
+            exploration_score += 0.5
+    
+    if session_context.activity:
+        activity = session_context.activity.lower()
+        if "gym" in activity or "workout" in activity:
+            if song.energy and song.energy > 0.7:
+                exploration_score += 0.5
+        elif "chill" in activity or "relax" in activity:
+            if song.energy and song.energy < 0.4:
+                exploration_score += 0.5
+    
+    return exploration_score
+
+
+def genre_affinity(features: CatalogFeatures, preferred_genres: List[str]) -> np.ndarray:
+    """Per-genre flag: catalog genre overlaps a preferred genre by substring, in either direction"""
+    affinity = np.zeros(len(features.genre_vocab), dtype=np.int64)
+    for genre, j in features.genre_vocab.items():
+        if any(ug in genre or genre in ug for ug in preferred_genres):
+            affinity[j] = 1
+    return affinity
+
+
+def batch_novelty(features: CatalogFeatures, user_memory: dict) -> np.ndarray:
+    """calculate_novelty for every song in the catalog"""
+    novelty = np.ones(features.size, dtype=np.float64)
+    
+    novelty[features.artist_in(user_memory.get("preferred_artists", []))] -= 0.5
+    
+    known_genres = user_memory.get("preferred_genres", [])
+    if known_genres:
+        known = np.zeros(len(features.genre_vocab), dtype=np.int64)
+        for genre in set(known_genres):
+            if genre in features.genre_vocab:
+                known[features.genre_vocab[genre]] = 1
+        genre_overlap = features.genres @ known
+        novelty -= (genre_overlap / len(known_genres)) * 0.3
+    
+    popularity = features.popularity
+    novelty[(popularity != 0) & (popularity < 50)] += 0.2
+    
+    return np.maximum(0.0, np.minimum(1.0, novelty))
+
+
+def batch_exploration(features: CatalogFeatures, novelty: np.ndarray, user_memory: dict, session_context) -> np.ndarray:
+    """score_song_exploration for every song in the catalog, with identical float64 results"""
+    energy = features.energy
+    has_energy = energy != 0
+    has_dance = features.danceability != 0
+    has_valence = features.valence != 0
+    
+    exploration = novelty.copy()
+    
+    affinity = genre_affinity(features, user_memory.get("preferred_genres", []))
+    exploration[(features.genres @ affinity) > 0] += 0.3
+    
+    if session_context and session_context.activity:
+        activity = session_context.activity.lower()
+        if activity == "studying" or activity == "work":
+            exploration[has_energy & (energy < 0.5)] += 1.0
+            exploration[has_energy & (energy > 0.7)] -= 0.5
             
-            reason = f"New artist '{song.artist}' with similar energy to your taste"
-            if state["session_context"] and state["session_context"].activity:
-                activity = state["session_context"].activity
-                if activity == "studying":
-                    reason = f"Unknown calm artist '{song.artist}' perfect for studying"
-                elif activity == "party":
-                    reason = f"Energetic new artist '{song.artist}' great for parties"
-                elif activity == "gym":
-                    reason = f"High-energy unknown artist '{song.artist}' for workouts"
+        elif activity == "party" or activity == "dancing":
+            exploration[has_energy & (energy > 0.7)] += 1.0
+            danceable = has_dance & (features.danceability > 0.6)
+            exploration[danceable] += 0.5
+            exploration[~danceable & has_energy & (energy < 0.4)] -= 0.5
             
-            novel_candidates.append(CandidateTrack(
-                song=song,
-                score=exploration_score,
-                source_agent="explorer",
-                reason=reason,
-                novelty_score=novelty,
-                confidence=0.6
-            ))
+        elif activity == "gym" or activity == "workout":
+            exploration[has_energy & (energy > 0.8)] += 1.5
+            exploration[has_energy & (energy < 0.5)] -= 1.0
+    
+    if session_context and session_context.mood:
+        mood = session_context.mood.lower()
+        if mood == "calm":
+            exploration[has_energy & (energy < 0.4)] += 0.8
+        elif mood == "energetic":
+            exploration[has_energy & (energy > 0.7)] += 0.8
+        elif mood == "happy":
+            exploration[has_valence & (features.valence > 0.6)] += 0.5
+        elif mood == "sad":
+            exploration[has_valence & (features.valence < 0.4)] += 0.5
+    
+    if session_context.activity:
+        activity = session_context.activity.lower()
+        if "gym" in activity or "workout" in activity:
+            exploration[has_energy & (energy > 0.7)] += 0.5
+        elif "chill" in activity or "relax" in activity:
+            exploration[has_energy & (energy < 0.4)] += 0.5
+    
+    return exploration
+
+
+def explorer_branch(state: AppState) -> dict:
+    """Chaos DJ as a parallel graph branch: returns only its state delta"""
+    
+    from src.music_agent.agents.memory import user_memory_snapshot
     
-    novel_candidates.sort(key=lambda x: x.score, reverse=True)
+    user_memory = user_memory_snapshot(state)
+    excluded_ids = set(user_memory.get("disliked_songs", []))
+    known_artists = set(user_memory.get("preferred_artists", []))
+    
+    lib = resolve_library(state["library_id"])
+    songs = lib.songs
+    features, positions = pool_features(songs, candidate_pool(lib, state))
+    novelty = batch_novelty(features, user_memory)
+    exploration = batch_exploration(features, novelty, user_memory, state["session_context"])
+    eligible = np.flatnonzero((novelty > 0.5) & ~features.id_in(excluded_ids) & ~features.artist_in(known_artists))
     
     num_novel = int(state["preferences"].size * state["preferences"].novelty_tolerance)
     num_novel = max(1, num_novel)
+    top_idx = eligible[top_k_indices(exploration[eligible], num_novel * 2)]
     
-    top_novel = novel_candidates[:num_novel * 2]
+    top_novel = []
+    for i, song in zip(top_idx, lib.songs_at(positions[top_idx])):
+        
+        reason = f"New artist '{song.artist}' with similar energy to your taste"
+        if state["session_context"] and state["session_context"].activity:
+            activity = state["session_context"].activity
+            if activity == "studying":
+                reason = f"Unknown calm artist '{song.artist}' perfect for studying"
+            elif activity == "party":
+                reason = f"Energetic new artist '{song.artist}' great for parties"
+            elif activity == "gym":
+                reason = f"High-energy unknown artist '{song.artist}' for workouts"
+        
+        top_novel.append(CandidateTrack(
+            song=song,
+            score=float(exploration[i]),
+            source_agent="explorer",
+            reason=reason,
+            novelty_score=float(novelty[i]),
+            confidence=0.6
+        ))
     
     existing_song_ids = {c.song.id for c in state["candidate_tracks"]}
     unique_novel = [c for c in top_novel if c.song.id not in existing_song_ids]
     
-    state["candidate_tracks"].extend(unique_novel)
-    
     activity_context = state["session_context"].activity if state["session_context"] else "general"
-    state["logs"].append(AgentLog(
+    log = AgentLog(
         agent_name="Chaos DJ",
         action="explored",
         details=f"Added {len(unique_novel)} novel tracks for {activity_context} from new artists"
-    ))
+    )
+    
+    return {"candidate_tracks": unique_novel, "logs": [log]}
+
+
+def explorer_agent(state: AppState) -> AppState:
+    """Explorer Agent: Pushes user out of comfort zone with novel recommendations"""
+    
+    update = explorer_branch(state)
+    state["candidate_tracks"].extend(update["candidate_tracks"])
+    state["logs"].extend(update["logs"])
     
     return state
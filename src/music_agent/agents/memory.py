@@ -1,37 +1,31 @@
 from __future__ import annotations
-import json
-from pathlib import Path
 from src.music_agent.state import AppState, UserPreferences, AgentLog
-
-
-USER_PREFS_FILE = Path(__file__).parents[1] / "data" / "user_prefs.json"
+from src.music_agent.tools.memory_store import get_user_memory_store
+from src.music_agent.tools.result_cache import get_result_cache
 
 
 def load_user_memory(user_id: str) -> dict:
     """Load user's long-term memory"""
-    if USER_PREFS_FILE.exists():
-        with open(USER_PREFS_FILE, "r") as f:
-            return json.load(f)
-    return {
-        "liked_songs": [],
-        "disliked_songs": [],
-        "preferred_genres": [],
-        "preferred_moods": [],
-        "preferred_artists": [],
-        "listening_history": []
-    }
+    return get_user_memory_store().get(user_id)
 
 
 def save_user_memory(user_id: str, memory: dict):
     """Save user's long-term memory"""
-    with open(USER_PREFS_FILE, "w") as f:
-        json.dump(memory, f, indent=2)
+    get_user_memory_store().put(user_id, memory)
+
+
+def user_memory_snapshot(state: AppState) -> dict:
+    """Memory loaded once per request by the memory agent, or a fresh load outside the graph"""
+    if state.get("user_memory") is not None:
+        return state["user_memory"]
+    return load_user_memory(state["user_id"])
 
 
 def memory_agent(state: AppState) -> AppState:
     """Memory Agent: Manages user profile and persistent preferences"""
     
     user_memory = load_user_memory(state["user_id"])
+    state["user_memory"] = user_memory
     
     if user_memory["preferred_genres"] and not state["preferences"].genres:
         state["preferences"].genres = user_memory["preferred_genres"][:5]
@@ -82,3 +76,5 @@ def update_user_memory(user_id: str, feedback: dict):
             memory["disliked_songs"].append(song_id)
     
     save_user_memory(user_id, memory)
+    # cached playlists were built from the old profile
+    get_result_cache().invalidate_user(user_id)
@@ -1,21 +1,15 @@
 from __future__ import annotations
+from typing import Dict, List, Optional
 import os
-from dotenv import load_dotenv
-from langchain_mistralai import ChatMistralAI
+import re
+import threading
+import time
 from langchain_core.messages import SystemMessage, HumanMessage
 import json
 
 from src.music_agent.state import AppState, Intent, UserPreferences, SessionContext, AgentLog
-
-load_dotenv()
-
-
-def _get_llm():
-    api_key = os.getenv("MISTRAL_API_KEY")
-    if not api_key or api_key == "your-mistral-api-key":
-        raise ValueError("MISTRAL_API_KEY not set")
-    model = os.getenv("DEFAULT_MODEL", "mistral:open-mistral-7b").split(":", 1)[1]
-    return ChatMistralAI(api_key=api_key, model=model, temperature=0.2)
+from src.music_agent.tools.intent_cache import get_intent_cache, intent_namespace
+from src.music_agent.tools.llm_gateway import get_llm_gateway
 
 
 SYSTEM_PROMPT = """You are the Orchestrator Agent - the brain of a music intelligence system.
@@ -43,47 +37,67 @@ Return ONLY valid JSON:
 }"""
 
 
+# first match wins, in this order, like the original if/elif chains
+ACTIVITY_KEYWORDS = {
+    "studying": ["study", "studying", "homework", "reading"],
+    "party": ["party", "dance", "club", "dancing"],
+    "gym": ["gym", "workout", "exercise", "running"],
+    "sleep": ["sleep", "bedtime", "night", "ambient"],
+    "work": ["work", "focus", "concentration"],
+}
+
+MOOD_KEYWORDS = {
+    "calm": ["calm", "chill", "relaxing", "peaceful", "quiet"],
+    "energetic": ["energetic", "energy", "high-energy", "upbeat", "pump"],
+    "happy": ["happy", "cheerful", "positive", "uplifting"],
+    "sad": ["sad", "melancholy", "emotional", "heartbreak"],
+}
+
+GENRE_KEYWORDS = {
+    "pop": ["pop", "mainstream"],
+    "rock": ["rock", "alternative"],
+    "hip-hop": ["hip-hop", "rap", "hiphop"],
+    "electronic": ["electronic", "edm", "techno", "house", "dance"],
+    "indie": ["indie", "independent"],
+    "jazz": ["jazz"],
+    "classical": ["classical", "orchestra"],
+    "r&b": ["r&b", "rnb", "soul"],
+    "country": ["country"],
+    "folk": ["folk", "acoustic"]
+}
+
+# words that carry no intent beyond what the keyword tables capture
+FILLER_WORDS = {
+    "a", "an", "the", "some", "me", "my", "i", "im", "i'm", "want", "need", "give", "play", "make",
+    "recommend", "find", "for", "to", "and", "with", "of", "while", "during", "in", "at", "on",
+    "music", "songs", "song", "tracks", "track", "tunes", "playlist", "mix", "vibes", "vibe",
+    "please", "something", "good", "great", "best", "nice", "really", "very", "session", "time",
+}
+KEYWORD_TOKENS = {k for table in (ACTIVITY_KEYWORDS, MOOD_KEYWORDS, GENRE_KEYWORDS) for ks in table.values() for k in ks}
+NEGATIONS = {"no", "not", "without", "except", "but", "avoid", "dont", "don't", "never"}
+
+# heuristic parses at or above this confidence skip the LLM; above 1 disables the fast path
+FAST_PATH_CONFIDENCE = float(os.getenv("MUSIC_FAST_PATH_CONFIDENCE", "0.8"))
+# found slots -> weight; two fully explained slots pass the default threshold, one does not
+SLOT_WEIGHTS = {0: 0.0, 1: 0.5, 2: 0.85, 3: 1.0}
+
+
+def _first_match(query_lower: str, table: Dict[str, List[str]]) -> Optional[str]:
+    for value, keywords in table.items():
+        if any(word in query_lower for word in keywords):
+            return value
+    return None
+
+
 def parse_query_heuristically(query: str) -> dict:
     """Fallback heuristic parser when LLM is unavailable"""
     query_lower = query.lower()
     
-    activity = None
-    if any(word in query_lower for word in ["study", "studying", "homework", "reading"]):
-        activity = "studying"
-    elif any(word in query_lower for word in ["party", "dance", "club", "dancing"]):
-        activity = "party"
-    elif any(word in query_lower for word in ["gym", "workout", "exercise", "running"]):
-        activity = "gym"
-    elif any(word in query_lower for word in ["sleep", "bedtime", "night", "ambient"]):
-        activity = "sleep"
-    elif any(word in query_lower for word in ["work", "focus", "concentration"]):
-        activity = "work"
-    
-    mood = None
-    if any(word in query_lower for word in ["calm", "chill", "relaxing", "peaceful", "quiet"]):
-        mood = "calm"
-    elif any(word in query_lower for word in ["energetic", "energy", "high-energy", "upbeat", "pump"]):
-        mood = "energetic"
-    elif any(word in query_lower for word in ["happy", "cheerful", "positive", "uplifting"]):
-        mood = "happy"
-    elif any(word in query_lower for word in ["sad", "melancholy", "emotional", "heartbreak"]):
-        mood = "sad"
+    activity = _first_match(query_lower, ACTIVITY_KEYWORDS)
+    mood = _first_match(query_lower, MOOD_KEYWORDS)
     
     genres = []
-    genre_keywords = {
-        "pop": ["pop", "mainstream"],
-        "rock": ["rock", "alternative"],
-        "hip-hop": ["hip-hop", "rap", "hiphop"],
-        "electronic": ["electronic", "edm", "techno", "house", "dance"],
-        "indie": ["indie", "independent"],
-        "jazz": ["jazz"],
-        "classical": ["classical", "orchestra"],
-        "r&b": ["r&b", "rnb", "soul"],
-        "country": ["country"],
-        "folk": ["folk", "acoustic"]
-    }
-    
-    for genre, keywords in genre_keywords.items():
+    for genre, keywords in GENRE_KEYWORDS.items():
         if any(keyword in query_lower for keyword in keywords):
             genres.append(genre)
     
@@ -107,62 +121,213 @@ def parse_query_heuristically(query: str) -> dict:
     }
 
 
+def heuristic_confidence(query: str, parsed: dict) -> float:
+    """How much of the query the heuristic parse accounts for, from 0 to 1
+    
+    The share of words that are keywords or filler, scaled by how many of
+    activity, mood and genres were found as whole words. Unknown words
+    (artist names, languages) lower it, since only the LLM can use them;
+    negations and numbers (sizes, durations) rule the fast path out, as the
+    heuristic parse would silently drop them.
+    """
+    words = re.findall(r"[a-z0-9&'-]+", query.lower())
+    if not words or NEGATIONS.intersection(words) or any(c.isdigit() for c in query):
+        return 0.0
+    
+    tokens = set(words)
+    explained = sum(1 for w in words if w in FILLER_WORDS or w in KEYWORD_TOKENS)
+    
+    # the parser matches substrings ("pop" in "popular"); only whole-word finds count
+    activity = parsed["session_context"]["activity"]
+    mood = parsed["session_context"]["mood"]
+    genres = parsed["preferences"]["genres"]
+    slots = sum([
+        activity is not None and bool(tokens.intersection(ACTIVITY_KEYWORDS[activity])),
+        mood is not None and bool(tokens.intersection(MOOD_KEYWORDS[mood])),
+        bool(genres) and all(tokens.intersection(GENRE_KEYWORDS[g]) for g in genres),
+    ])
+    return explained / len(words) * SLOT_WEIGHTS[slots]
+
+
+class RouteStats:
+    """Request counts and latency per orchestrator path"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._paths: Dict[str, Dict[str, float]] = {}
+    
+    def record(self, path: str, seconds: float):
+        with self._lock:
+            stats = self._paths.setdefault(path, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+            stats["count"] += 1
+            stats["total_s"] += seconds
+            stats["max_s"] = max(stats["max_s"], seconds)
+    
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                path: {
+                    "count": int(s["count"]),
+                    "mean_ms": 1000 * s["total_s"] / max(1, s["count"]),
+                    "max_ms": 1000 * s["max_s"],
+                }
+                for path, s in self._paths.items()
+            }
+    
+    def reset(self):
+        with self._lock:
+            self._paths.clear()
+
+
+route_stats = RouteStats()
+
+
+def unexplained_words(query: str) -> set[str]:
+    """Words that are neither filler nor keywords: artists, languages and the like"""
+    return {w for w in re.findall(r"[a-z0-9&'-]+", query.lower()) if w not in FILLER_WORDS and w not in KEYWORD_TOKENS}
+
+
+def same_heuristic_slots(a: str, b: str) -> bool:
+    """Whether two queries yield the same heuristic activity, mood and genres and have no other words apart
+    
+    A cached parse carries whatever the LLM read from the words the heuristic
+    does not know ("english", "arijit"), so a paraphrase must share all of them.
+    """
+    if unexplained_words(a) != unexplained_words(b):
+        return False
+    parsed_a, parsed_b = parse_query_heuristically(a), parse_query_heuristically(b)
+    return (parsed_a["session_context"] == parsed_b["session_context"]
+            and parsed_a["preferences"]["genres"] == parsed_b["preferences"]["genres"])
+
+
+def _intent_messages(query: str) -> list:
+    return [
+        SystemMessage(content=SYSTEM_PROMPT),
+        HumanMessage(content=f"User request: {query}")
+    ]
+
+
+def _decode_intent(content: str) -> dict:
+    content = content.strip()
+    if content.startswith("```json"):
+        content = content[7:]
+    if content.startswith("```"):
+        content = content[3:]
+    if content.endswith("```"):
+        content = content[:-3]
+    content = content.strip()
+    
+    return json.loads(content)
+
+
+def _parse_with_llm(query: str) -> dict:
+    resp = get_llm_gateway().invoke(_intent_messages(query), temperature=0.2)
+    return _decode_intent(resp.content)
+
+
+async def _aparse_with_llm(query: str) -> dict:
+    resp = await get_llm_gateway().ainvoke(_intent_messages(query), temperature=0.2)
+    return _decode_intent(resp.content)
+
+
+def _apply_intent(state: AppState, data: dict) -> tuple[dict, dict]:
+    state["intent"] = data.get("intent", "recommend")
+    
+    session_ctx = data.get("session_context", {})
+    state["session_context"] = SessionContext(**session_ctx)
+    
+    prefs_data = data.get("preferences", {})
+    prefs_data.setdefault("query", state["query"])
+    prefs_data.setdefault("size", 10)
+    state["preferences"] = UserPreferences(**prefs_data)
+    return session_ctx, prefs_data
+
+
+def _fast_path(state: AppState, heuristic: dict, start: float) -> bool:
+    confidence = heuristic_confidence(state["query"], heuristic)
+    if confidence < FAST_PATH_CONFIDENCE:
+        return False
+    
+    session_ctx, prefs_data = _apply_intent(state, heuristic)
+    state["logs"].append(AgentLog(
+        agent_name="Orchestrator",
+        action="heuristic_fast_path",
+        details=f"Confidence {confidence:.2f}, skipped LLM: Activity={session_ctx.get('activity', 'None')}, Mood={session_ctx.get('mood', 'None')}, Genres={prefs_data.get('genres', [])}"
+    ))
+    route_stats.record("fast_path", time.perf_counter() - start)
+    return True
+
+
+def _cached_intent(query: str) -> tuple[str, Optional[dict], Optional[str], Optional[float]]:
+    namespace = intent_namespace("orchestrator", SYSTEM_PROMPT, os.getenv("DEFAULT_MODEL", ""),
+                                 get_llm_gateway().provider.name)
+    hit = get_intent_cache().lookup(namespace, query, agree=same_heuristic_slots)
+    if hit is None:
+        return namespace, None, None, None
+    data = hit.data
+    # the parse is reused, the wording of this request is kept for search
+    data.setdefault("preferences", {})["query"] = query
+    return namespace, data, hit.query, hit.similarity
+
+
+def _record_intent(state: AppState, data: dict, namespace: str, cached_query: Optional[str],
+                   similarity: Optional[float], start: float):
+    session_ctx, prefs_data = _apply_intent(state, data)
+    # only parses that validated are worth reusing
+    if cached_query is None:
+        get_intent_cache().store(namespace, state["query"], data)
+    
+    state["logs"].append(AgentLog(
+        agent_name="Orchestrator",
+        action="parsed_intent" if cached_query is None else "cached_intent",
+        details=f"Intent: {state['intent']}, Activity: {session_ctx.get('activity', 'N/A')}, Size: {prefs_data.get('size', 10)}"
+        + ("" if cached_query is None else f" (reused parse of '{cached_query}', similarity {similarity:.2f})")
+    ))
+    route_stats.record("llm" if cached_query is None else "intent_cache", time.perf_counter() - start)
+
+
+def _heuristic_fallback(state: AppState, heuristic: dict, start: float):
+    session_ctx, prefs_data = _apply_intent(state, heuristic)
+    
+    state["logs"].append(AgentLog(
+        agent_name="Orchestrator",
+        action="heuristic_fallback",
+        details=f"LLM unavailable, used heuristics: Activity={session_ctx.get('activity', 'None')}, Mood={session_ctx.get('mood', 'None')}, Genres={prefs_data.get('genres', [])}"
+    ))
+    route_stats.record("fallback", time.perf_counter() - start)
+
+
 def orchestrator_agent(state: AppState) -> AppState:
     """Orchestrator Agent: Interprets user query and sets up the workflow"""
+    start = time.perf_counter()
+    heuristic = parse_query_heuristically(state["query"])
+    if _fast_path(state, heuristic, start):
+        return state
+    
+    try:
+        namespace, data, cached_query, similarity = _cached_intent(state["query"])
+        if data is None:
+            data = _parse_with_llm(state["query"])
+        _record_intent(state, data, namespace, cached_query, similarity, start)
+    except Exception as e:
+        _heuristic_fallback(state, heuristic, start)
+    
+    return state
+
+
+async def aorchestrator_agent(state: AppState) -> AppState:
+    """Orchestrator Agent for async graph runs: the LLM call yields the event loop"""
+    start = time.perf_counter()
+    heuristic = parse_query_heuristically(state["query"])
+    if _fast_path(state, heuristic, start):
+        return state
+    
     try:
-        llm = _get_llm()
-        
-        messages = [
-            SystemMessage(content=SYSTEM_PROMPT),
-            HumanMessage(content=f"User request: {state['query']}")
-        ]
-        
-        resp = llm.invoke(messages)
-        content = resp.content.strip()
-        
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        data = json.loads(content)
-        
-        state["intent"] = data.get("intent", "recommend")
-        
-        session_ctx = data.get("session_context", {})
-        state["session_context"] = SessionContext(**session_ctx)
-        
-        prefs_data = data.get("preferences", {})
-        prefs_data.setdefault("query", state["query"])
-        prefs_data.setdefault("size", 10)
-        state["preferences"] = UserPreferences(**prefs_data)
-        
-        state["logs"].append(AgentLog(
-            agent_name="Orchestrator",
-            action="parsed_intent",
-            details=f"Intent: {state['intent']}, Activity: {session_ctx.get('activity', 'N/A')}, Size: {prefs_data.get('size', 10)}"
-        ))
-        
+        namespace, data, cached_query, similarity = _cached_intent(state["query"])
+        if data is None:
+            data = await _aparse_with_llm(state["query"])
+        _record_intent(state, data, namespace, cached_query, similarity, start)
     except Exception as e:
-        data = parse_query_heuristically(state["query"])
-        
-        state["intent"] = data.get("intent", "recommend")
-        
-        session_ctx = data.get("session_context", {})
-        state["session_context"] = SessionContext(**session_ctx)
-        
-        prefs_data = data.get("preferences", {})
-        prefs_data.setdefault("query", state["query"])
-        prefs_data.setdefault("size", 10)
-        state["preferences"] = UserPreferences(**prefs_data)
-        
-        state["logs"].append(AgentLog(
-            agent_name="Orchestrator",
-            action="heuristic_fallback",
-            details=f"LLM unavailable, used heuristics: Activity={session_ctx.get('activity', 'None')}, Mood={session_ctx.get('mood', 'None')}, Genres={prefs_data.get('genres', [])}"
-        ))
+        _heuristic_fallback(state, heuristic, start)
     
     return state
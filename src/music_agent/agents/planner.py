@@ -2,23 +2,12 @@ from __future__ import annotations
 from typing import Dict
 import json
 import os
-from dotenv import load_dotenv
-from langchain_mistralai import ChatMistralAI
 from langchain_core.messages import SystemMessage, HumanMessage
 
 from src.music_agent.state import Intent, UserPreferences
-
-load_dotenv()
-
-def _get_llm():
-    api_key = os.getenv("MISTRAL_API_KEY")
-    if not api_key or api_key == "your-mistral-api-key":
-        raise ValueError(
-            "MISTRAL_API_KEY not set or invalid. "
-            "Get your key from https://console.mistral.ai/ and set it in .env or Streamlit sidebar."
-        )
-    model = os.getenv("DEFAULT_MODEL", "mistral:open-mistral-7b").split(":", 1)[1]
-    return ChatMistralAI(api_key=api_key, model=model, temperature=0.2)
+from src.music_agent.tools.intent_cache import get_intent_cache, intent_namespace
+from src.music_agent.tools.llm_gateway import get_llm_gateway
+from src.music_agent.agents.orchestrator import same_heuristic_slots
 
 
 SYSTEM = (
@@ -31,28 +20,39 @@ SYSTEM = (
 )
 
 
+def _parse_with_llm(nl_query: str) -> Dict:
+    messages = [
+        SystemMessage(content=SYSTEM),
+        HumanMessage(content=f"User request: {nl_query}\nReturn JSON only.")
+    ]
+    resp = get_llm_gateway().invoke(messages, temperature=0.2)
+    
+    content = resp.content.strip()
+    if content.startswith("```json"):
+        content = content[7:]
+    if content.startswith("```"):
+        content = content[3:]
+    if content.endswith("```"):
+        content = content[:-3]
+    return json.loads(content.strip())
+
+
 def parse_intent(nl_query: str) -> Intent:
     try:
-        llm = _get_llm()
-        messages = [
-            SystemMessage(content=SYSTEM),
-            HumanMessage(content=f"User request: {nl_query}\nReturn JSON only.")
-        ]
-        resp = llm.invoke(messages)
-        
-        try:
-            content = resp.content.strip()
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-            
-            data: Dict = json.loads(content)
-        except json.JSONDecodeError as e:
-            data = {"action": "recommend", "preferences": {"query": nl_query, "size": 10}}
+        cache = get_intent_cache()
+        namespace = intent_namespace("planner", SYSTEM, os.getenv("DEFAULT_MODEL", ""),
+                                     get_llm_gateway().provider.name)
+        hit = cache.lookup(namespace, nl_query, agree=same_heuristic_slots)
+        cacheable = hit is None
+        if hit is not None:
+            data = hit.data
+            data.setdefault("preferences", {})["query"] = nl_query
+        else:
+            try:
+                data = _parse_with_llm(nl_query)
+            except json.JSONDecodeError as e:
+                data = {"action": "recommend", "preferences": {"query": nl_query, "size": 10}}
+                cacheable = False
         
         prefs = data.get("preferences", {})
         prefs.setdefault("genres", [])
@@ -61,7 +61,10 @@ def parse_intent(nl_query: str) -> Intent:
         prefs.setdefault("moods", [])
         prefs.setdefault("size", 10)
         prefs.setdefault("query", nl_query)
-        return Intent(action=data.get("action", "recommend"), preferences=UserPreferences(**prefs))
+        intent = Intent(action=data.get("action", "recommend"), preferences=UserPreferences(**prefs))
+        if cacheable:
+            cache.store(namespace, nl_query, data)
+        return intent
     
     except Exception as e:
         error_msg = str(e)
@@ -80,7 +83,6 @@ def parse_intent(nl_query: str) -> Intent:
 
 def summarize_playlist(title: str, songs: list[dict]) -> str:
     try:
-        llm = _get_llm()
         summary_sys = (
             "You are a music curator. Given a playlist title and songs (name, artist, tags, mood), "
             "write a 2-3 sentence engaging summary."
@@ -90,8 +92,8 @@ def summarize_playlist(title: str, songs: list[dict]) -> str:
             SystemMessage(content=summary_sys),
             HumanMessage(content=f"Title: {title}\nSongs:\n{txt}")
         ]
-        resp = llm.invoke(messages)
+        resp = get_llm_gateway().invoke(messages, temperature=0.2)
         return resp.content.strip()
     except Exception as e:
-        artists = list(set([s['artist'] for s in songs[:5]]))
+        artists = list(dict.fromkeys(s['artist'] for s in songs[:5]))
         return f"A collection of {len(songs)} tracks featuring {', '.join(artists[:3])}{'and more' if len(artists) > 3 else ''}."
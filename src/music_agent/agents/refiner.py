@@ -1,18 +1,25 @@
 from __future__ import annotations
 import json
-from typing import Dict, Any
-from langchain_mistralai import ChatMistralAI
+from typing import Callable, Dict, Any, Optional
 from langchain_core.prompts import PromptTemplate
 
 from src.music_agent.state import AppState, AgentLog
+from src.music_agent.tools.llm_gateway import get_llm_gateway, stream_writer
 
 
-def _get_llm():
-    return ChatMistralAI(
-        model="open-mistral-7b",
-        temperature=0.7,
-        max_tokens=500
-    )
+NAMER_LLM = {"temperature": 0.7, "model": "open-mistral-7b", "max_tokens": 500}
+
+
+def _invoke_llm(prompt: str):
+    return get_llm_gateway().invoke(prompt, **NAMER_LLM)
+
+
+def _stream_llm(prompt: str, on_chunk: Callable[[str], None]) -> str:
+    chunks = []
+    for chunk in get_llm_gateway().stream(prompt, **NAMER_LLM):
+        chunks.append(chunk)
+        on_chunk(chunk)
+    return "".join(chunks)
 
 
 def refiner_agent(state: AppState, user_feedback: str) -> AppState:
@@ -51,8 +58,7 @@ Return structured modifications in JSON."""
     )
     
     try:
-        llm = _get_llm()
-        response = llm.invoke(prompt)
+        response = _invoke_llm(prompt)
         
         analysis = response.content
         
@@ -87,7 +93,7 @@ Return structured modifications in JSON."""
         return state, {}, f"Error analyzing feedback: {str(e)}"
 
 
-def namer_agent(state: AppState) -> tuple[str, str]:
+def _namer_prompt(state: AppState) -> str:
     songs_summary = ", ".join([f"{s.name} by {s.artist}" for s in state["final_playlist"][:5]])
     if len(state["final_playlist"]) > 5:
         songs_summary += f" and {len(state['final_playlist']) - 5} more"
@@ -116,46 +122,88 @@ Examples:
 Your turn!"""
     )
     
-    prompt = prompt_template.format(
+    return prompt_template.format(
         songs=songs_summary,
         query=state["query"],
         mood=mood
     )
+
+
+def _named(content: str) -> tuple[str, str, AgentLog]:
+    lines = [line.strip() for line in content.strip().split('\n') if line.strip()]
+    
+    title = "My Playlist"
+    description = "A curated selection of tracks"
+    
+    for line in lines:
+        if any(word in line.lower() for word in ["title:", "name:", "playlist:"]):
+            title = line.split(":", 1)[-1].strip().strip('"').strip("'")
+        elif any(word in line.lower() for word in ["description:", "desc:"]):
+            description = line.split(":", 1)[-1].strip().strip('"').strip("'")
     
+    if title == "My Playlist" and len(lines) > 0:
+        title = lines[0].strip('"').strip("'")
+    if description == "A curated selection of tracks" and len(lines) > 1:
+        description = lines[1].strip('"').strip("'")
+    
+    return title, description, AgentLog(
+        agent_name="Namer",
+        action="generated",
+        details=f"Title: {title[:30]}..."
+    )
+
+
+def _naming_failed(e: Exception) -> tuple[str, str, AgentLog]:
+    return "My Playlist", "A curated selection of tracks", AgentLog(
+        agent_name="Namer",
+        action="error",
+        details=f"Failed to generate name: {str(e)}"
+    )
+
+
+def _name(state: AppState, on_chunk: Optional[Callable[[str], None]] = None) -> tuple[str, str, AgentLog]:
     try:
-        llm = _get_llm()
-        response = llm.invoke(prompt)
-        
-        content = response.content.strip()
-        
-        lines = [line.strip() for line in content.split('\n') if line.strip()]
-        
-        title = "My Playlist"
-        description = "A curated selection of tracks"
-        
-        for line in lines:
-            if any(word in line.lower() for word in ["title:", "name:", "playlist:"]):
-                title = line.split(":", 1)[-1].strip().strip('"').strip("'")
-            elif any(word in line.lower() for word in ["description:", "desc:"]):
-                description = line.split(":", 1)[-1].strip().strip('"').strip("'")
-        
-        if title == "My Playlist" and len(lines) > 0:
-            title = lines[0].strip('"').strip("'")
-        if description == "A curated selection of tracks" and len(lines) > 1:
-            description = lines[1].strip('"').strip("'")
-        
-        state["logs"].append(AgentLog(
-            agent_name="Namer",
-            action="generated",
-            details=f"Title: {title[:30]}..."
-        ))
-        
-        return title, description
+        prompt = _namer_prompt(state)
+        if on_chunk is None:
+            content = _invoke_llm(prompt).content
+        else:
+            content = _stream_llm(prompt, on_chunk)
+        return _named(content)
+    except Exception as e:
+        return _naming_failed(e)
+
+
+def namer_agent(state: AppState, on_delta: Optional[Callable[[str], None]] = None) -> tuple[str, str]:
+    """Playlist title and description; on_delta receives the completion text so far while it streams"""
+    on_chunk = None
+    if on_delta is not None:
+        text = []
         
+        def on_chunk(chunk: str):
+            text.append(chunk)
+            on_delta("".join(text))
+    
+    title, description, log = _name(state, on_chunk)
+    state["logs"].append(log)
+    return title, description
+
+
+def namer_branch(state: AppState) -> dict:
+    """Namer as a graph node beside the explainer: returns only its state delta, streaming "title" deltas"""
+    write = stream_writer()
+    title, description, log = _name(state, lambda chunk: write({"field": "title", "delta": chunk}))
+    return {"playlist_title": title, "playlist_description": description, "logs": [log]}
+
+
+async def anamer_branch(state: AppState) -> dict:
+    """Async namer_branch"""
+    write = stream_writer()
+    try:
+        chunks = []
+        async for chunk in get_llm_gateway().astream(_namer_prompt(state), **NAMER_LLM):
+            chunks.append(chunk)
+            write({"field": "title", "delta": chunk})
+        title, description, log = _named("".join(chunks))
     except Exception as e:
-        state["logs"].append(AgentLog(
-            agent_name="Namer",
-            action="error",
-            details=f"Failed to generate name: {str(e)}"
-        ))
-        return "My Playlist", "A curated selection of tracks"
+        title, description, log = _naming_failed(e)
+    return {"playlist_title": title, "playlist_description": description, "logs": [log]}
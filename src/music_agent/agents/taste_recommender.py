@@ -3,6 +3,10 @@ from typing import List
 import numpy as np
 
 from src.music_agent.state import AppState, CandidateTrack, Song, AgentLog
+from src.music_agent.tools.features import CatalogFeatures, pool_features
+from src.music_agent.tools.library import resolve_library
+from src.music_agent.tools.retrieval import candidate_pool
+from src.music_agent.tools.ranking import top_k_indices
 
 
 def score_song_taste(song: Song, prefs, user_memory: dict, session_context) -> float:
@@ -75,54 +79,133 @@ def score_song_taste(song: Song, prefs, user_memory: dict, session_context) -> f
     return score
 
 
-def taste_recommender_agent(state: AppState) -> AppState:
-    """Taste-Based Recommender Agent: Safe bets that match user preferences"""
+def score_library_taste(features: CatalogFeatures, prefs, user_memory: dict, session_context) -> np.ndarray:
+    """Batched score_song_taste over a whole catalog
+    
+    Terms are added in the same order as the per-song scorer so the resulting
+    float64 scores are identical, not just close.
+    """
+    energy = features.energy
+    has_energy = energy != 0
+    has_dance = features.danceability != 0
+    has_valence = features.valence != 0
+    has_year = features.year != 0
+    
+    score = np.zeros(features.size, dtype=np.float64)
+    
+    for genre in prefs.genres:
+        score[features.has_genre(genre, lowercase=True)] += 1.5
+    
+    score[features.artist_in(user_memory.get("preferred_artists", []))] += 2.0
     
-    from src.music_agent.agents.memory import load_user_memory
+    if prefs.moods:
+        score[features.mood_in(prefs.moods)] += 1.0
     
-    user_memory = load_user_memory(state["user_id"])
+    if session_context and session_context.activity:
+        activity = session_context.activity.lower()
+        if activity == "studying" or activity == "work":
+            score[has_energy & (energy < 0.5)] += 1.5
+            score[has_energy & (energy > 0.7)] -= 1.0
+            score[features.has_any_tag(["instrumental", "ambient", "acoustic"])] += 1.0
+            
+        elif activity == "party" or activity == "dancing":
+            score[has_energy & (energy > 0.7)] += 1.5
+            danceable = has_dance & (features.danceability > 0.6)
+            score[danceable] += 1.0
+            score[~danceable & has_energy & (energy < 0.4)] -= 1.0
+            
+        elif activity == "gym" or activity == "workout":
+            score[has_energy & (energy > 0.8)] += 2.0
+            score[has_energy & (energy < 0.5)] -= 1.5
+    
+    if session_context and session_context.mood:
+        mood = session_context.mood.lower()
+        if mood == "calm":
+            score[has_energy & (energy < 0.4)] += 1.5
+        elif mood == "energetic":
+            score[has_energy & (energy > 0.7)] += 1.5
+        elif mood == "happy":
+            score[has_valence & (features.valence > 0.6)] += 1.0
+        elif mood == "sad":
+            score[has_valence & (features.valence < 0.4)] += 1.0
+    
+    for tag in prefs.tags:
+        score[features.has_tag(tag)] += 0.8
+    
+    if prefs.min_year:
+        score[has_year & (features.year >= prefs.min_year)] += 0.3
+    if prefs.max_year:
+        score[has_year & (features.year <= prefs.max_year)] += 0.3
+    
+    popular = features.popularity != 0
+    score[popular] += (features.popularity[popular] / 100.0) * 0.5
+    
+    if prefs.moods:
+        moods = [m.lower() for m in prefs.moods]
+        energetic = has_energy & (energy > 0.7) if "energetic" in moods else np.zeros(features.size, dtype=np.bool_)
+        score[energetic] += 0.5
+        if "calm" in moods:
+            score[~energetic & has_energy & (energy < 0.4)] += 0.5
+    
+    return score
+
+
+def taste_recommender_branch(state: AppState) -> dict:
+    """Taste DJ as a parallel graph branch: returns only its state delta"""
+    
+    from src.music_agent.agents.memory import user_memory_snapshot
+    
+    user_memory = user_memory_snapshot(state)
     excluded_ids = set(user_memory.get("disliked_songs", []))
     
-    candidates = []
-    for song in state["library"]:
-        if song.id in excluded_ids:
-            continue
+    lib = resolve_library(state["library_id"])
+    songs = lib.songs
+    features, positions = pool_features(songs, candidate_pool(lib, state))
+    scores = score_library_taste(features, state["preferences"], user_memory, state["session_context"])
+    eligible = np.flatnonzero((scores > 0.5) & ~features.id_in(excluded_ids))
+    top_idx = eligible[top_k_indices(scores[eligible], int(state["preferences"].size * 0.7))]
+    
+    top_candidates = []
+    for i, song in zip(top_idx, lib.songs_at(positions[top_idx])):
+        score = float(scores[i])
         
-        score = score_song_taste(song, state["preferences"], user_memory, state["session_context"])
+        reason = f"Matches your taste in {', '.join(song.genres[:2])}"
+        if state["session_context"] and state["session_context"].activity:
+            activity = state["session_context"].activity
+            if activity == "studying":
+                reason = f"Perfect for {activity} - calm {', '.join(song.genres[:2])}"
+            elif activity == "party":
+                reason = f"Great for {activity} - energetic {', '.join(song.genres[:2])}"
+            else:
+                reason = f"Ideal for {activity} - {', '.join(song.genres[:2])}"
         
-        if score > 0.5:
-            reason = f"Matches your taste in {', '.join(song.genres[:2])}"
-            if state["session_context"] and state["session_context"].activity:
-                activity = state["session_context"].activity
-                if activity == "studying":
-                    reason = f"Perfect for {activity} - calm {', '.join(song.genres[:2])}"
-                elif activity == "party":
-                    reason = f"Great for {activity} - energetic {', '.join(song.genres[:2])}"
-                else:
-                    reason = f"Ideal for {activity} - {', '.join(song.genres[:2])}"
-            
-            candidates.append(CandidateTrack(
-                song=song,
-                score=score,
-                source_agent="taste_recommender",
-                reason=reason,
-                novelty_score=0.1,
-                confidence=0.9
-            ))
-    
-    candidates.sort(key=lambda x: x.score, reverse=True)
-    top_candidates = candidates[:int(state["preferences"].size * 0.7)]
+        top_candidates.append(CandidateTrack(
+            song=song,
+            score=score,
+            source_agent="taste_recommender",
+            reason=reason,
+            novelty_score=0.1,
+            confidence=0.9
+        ))
     
     existing_song_ids = {c.song.id for c in state["candidate_tracks"]}
     unique_candidates = [c for c in top_candidates if c.song.id not in existing_song_ids]
     
-    state["candidate_tracks"].extend(unique_candidates)
-    
     activity_context = state["session_context"].activity if state["session_context"] else "general"
-    state["logs"].append(AgentLog(
+    log = AgentLog(
         agent_name="Taste DJ",
         action="recommended",
         details=f"Added {len(unique_candidates)} tracks for {activity_context} based on your taste profile"
-    ))
+    )
+    
+    return {"candidate_tracks": unique_candidates, "logs": [log]}
+
+
+def taste_recommender_agent(state: AppState) -> AppState:
+    """Taste-Based Recommender Agent: Safe bets that match user preferences"""
+    
+    update = taste_recommender_branch(state)
+    state["candidate_tracks"].extend(update["candidate_tracks"])
+    state["logs"].extend(update["logs"])
     
     return state
@@ -1,39 +1,160 @@
 from __future__ import annotations
-from typing import Literal
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Literal, Optional
+import functools
+import inspect
+import threading
 import uuid
 
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
+from langgraph.types import Overwrite
+from pydantic import BaseModel
 
-from src.music_agent.state import AppState, UserPreferences, SessionContext
-from src.music_agent.tools.library import load_default_library
-from src.music_agent.agents.orchestrator import orchestrator_agent
-from src.music_agent.agents.memory import memory_agent
-from src.music_agent.agents.taste_recommender import taste_recommender_agent
-from src.music_agent.agents.explorer import explorer_agent
+from src.music_agent.state import AppState, UserPreferences, SessionContext, CandidateTrack, AgentLog
+from src.music_agent.tools.library import (
+    MusicLibrary,
+    load_default_library,
+    get_default_library,
+    invalidate_default_library,
+    resolve_library,
+)
+from src.music_agent.tools.result_cache import get_result_cache
+from src.music_agent.tools.retrieval import retrieve_candidates
+from src.music_agent.tools.tracing import traced, tracing_enabled
+from src.music_agent.agents.orchestrator import orchestrator_agent, aorchestrator_agent
+from src.music_agent.agents.memory import memory_agent, user_memory_snapshot, load_user_memory
+from src.music_agent.agents.taste_recommender import taste_recommender_agent, taste_recommender_branch
+from src.music_agent.agents.explorer import explorer_agent, explorer_branch
 from src.music_agent.agents.safety import safety_agent
 from src.music_agent.agents.critic import critic_agent
-from src.music_agent.agents.explainer import explanation_agent
+from src.music_agent.agents.explainer import explanation_agent, aexplanation_agent, explainer_branch, aexplainer_branch
+from src.music_agent.agents.refiner import namer_branch, anamer_branch
 from src.music_agent.agents.feedback import feedback_agent
 
 
-def build_multi_agent_graph():
-    """Build the multi-agent music intelligence graph"""
+# merge order for the recommender branches, matching the old sequential wrapper
+RECOMMENDER_BRANCHES = [
+    ("taste_recommender", "Taste DJ"),
+    ("explorer", "Chaos DJ"),
+]
+
+
+def merge_recommender_candidates(candidates: list[CandidateTrack]) -> list[CandidateTrack]:
+    """Deterministically merge branch outputs: taste picks first, then novel picks not already chosen"""
+    rank = {source: i for i, (source, _) in enumerate(RECOMMENDER_BRANCHES)}
+    ordered = sorted(candidates, key=lambda c: rank.get(c.source_agent, len(rank)))
     
-    lib = load_default_library()
+    merged = []
+    seen_ids = set()
+    for candidate in ordered:
+        if candidate.song.id in seen_ids:
+            continue
+        seen_ids.add(candidate.song.id)
+        merged.append(candidate)
+    return merged
+
+
+# AppState keys with an operator.add reducer: a node's update is appended, not assigned
+REDUCED_KEYS = ("candidate_tracks", "explanations", "logs")
+
+
+def _state_delta(before: dict, after: dict) -> dict:
+    """Turn an agent's whole returned state into a reducer-safe update
+    
+    Lists the agent only appended to contribute just the new items; lists it
+    replaced or reordered overwrite the channel.
+    """
+    delta = dict(after)
+    for key in REDUCED_KEYS:
+        if key not in after:
+            continue
+        old, new = before.get(key) or [], after[key]
+        if len(new) >= len(old) and all(a is b for a, b in zip(old, new)):
+            delta[key] = new[len(old):]
+        else:
+            delta[key] = Overwrite(new)
+    return delta
+
+
+def returns_delta(agent: Callable) -> Callable:
+    """Graph node for an agent that edits and returns the whole state
+    
+    The agent runs on a copy whose reducer lists are its own, so it can
+    append or rewrite them freely, and the node returns only the delta.
+    """
+    def scratch(state):
+        return {**state, **{key: list(state[key]) for key in REDUCED_KEYS if key in state}}
+    
+    if inspect.iscoroutinefunction(agent):
+        @functools.wraps(agent)
+        async def run_async(state):
+            return _state_delta(state, await agent(scratch(state)))
+        return run_async
+    
+    @functools.wraps(agent)
+    def run(state):
+        return _state_delta(state, agent(scratch(state)))
+    return run
+
+
+def build_multi_agent_graph(lib: MusicLibrary | None = None,
+                            parallel_recommenders: bool = True,
+                            checkpointer=None,
+                            name_playlist: bool = True,
+                            trace: bool | None = None,
+                            describe: bool = True):
+    """Build the multi-agent music intelligence graph
+    
+    State carries the library's handle, never its songs, so checkpoints stay
+    small whatever the catalog size. The retrieve node narrows large catalogs
+    to a bounded candidate pool that the recommenders rerank. With
+    parallel_recommenders, Taste DJ and Chaos DJ are separate nodes fanned out
+    from retrieve; LangGraph runs them concurrently on its thread pool and
+    their deltas are combined by the operator.add reducers before merge.
+    Every node returns only its update; the agents that edit the whole
+    state are adapted by returns_delta, so reducer lists never get appended
+    onto themselves.
+    
+    With name_playlist, the namer runs as a sibling of the explainer off
+    critic, so the title and the explanation cost one LLM round trip of
+    wall time instead of two in a row; both return only their deltas.
+    The LLM-backed nodes carry both a blocking and an async implementation:
+    app.invoke uses the first, app.ainvoke awaits the second so a server's
+    event loop is free during model calls. Without describe there is no
+    explainer or namer: critic goes straight to done, for callers that only
+    want tracks (topping up an existing playlist) and make no LLM call for them.
+    
+    With trace (default: on unless MUSIC_TRACING=0), every node records a
+    NodeSpan (wall/CPU time, candidate counts, LLM time and tokens) to the
+    process-wide tracer in tools/tracing.py, keyed by the state's trace_id.
+    """
+    
+    if lib is None:
+        lib = load_default_library()
     
     def initialize(state: AppState) -> AppState:
         if "user_id" not in state:
             state["user_id"] = "default_user"
         if "query" not in state:
             state["query"] = "recommend me some songs"
-        if "library" not in state:
-            state["library"] = lib.songs
+        if "library_id" not in state:
+            state["library_id"] = lib.handle
+        if "candidate_pool" not in state:
+            state["catalog_version"] = None
+            state["candidate_pool"] = None
+        if "user_memory" not in state:
+            state["user_memory"] = None
         if "candidate_tracks" not in state:
             state["candidate_tracks"] = []
         if "final_playlist" not in state:
             state["final_playlist"] = []
         if "explanations" not in state:
             state["explanations"] = []
+        if "playlist_title" not in state:
+            state["playlist_title"] = None
+            state["playlist_description"] = None
+        if "trace_id" not in state:
+            state["trace_id"] = None
         if "logs" not in state:
             state["logs"] = []
         if "error" not in state:
@@ -50,71 +171,268 @@ def build_multi_agent_graph():
             return "done"
         return "memory"
     
-    def parallel_recommenders(state: AppState) -> AppState:
+    def retrieve(state: AppState) -> dict:
+        catalog = resolve_library(state["library_id"])
+        version = catalog.catalog_version
+        pool = retrieve_candidates(
+            catalog, state["preferences"], state["session_context"], user_memory_snapshot(state)
+        )
+        if pool is None:
+            details = f"Scoring all {len(catalog.songs)} tracks"
+        else:
+            details = f"Narrowed {len(catalog.songs)} tracks to {len(pool)} candidates"
+        log = AgentLog(agent_name="Retriever", action="retrieved", details=details)
+        return {
+            "catalog_version": version,
+            "candidate_pool": None if pool is None else pool.tolist(),
+            "logs": [log],
+        }
+    
+    def sequential_recommenders(state: AppState) -> AppState:
         state = taste_recommender_agent(state)
         state = explorer_agent(state)
         return state
     
+    def merge_candidates(state: AppState) -> dict:
+        # replaces both lists so downstream nodes see the ones the sequential path builds
+        log_rank = {name: i for i, (_, name) in enumerate(RECOMMENDER_BRANCHES)}
+        branch_logs = state["logs"][-len(RECOMMENDER_BRANCHES):]
+        logs = state["logs"][:-len(RECOMMENDER_BRANCHES)] + sorted(
+            branch_logs, key=lambda log: log_rank.get(log.agent_name, len(log_rank))
+        )
+        return {
+            "candidate_tracks": Overwrite(merge_recommender_candidates(state["candidate_tracks"])),
+            "logs": Overwrite(logs),
+        }
+    
     def route_to_human_review(state: AppState) -> Literal["human_review", "critic"]:
         if state.get("requires_human_review"):
             return "human_review"
         return "critic"
     
-    def human_review(state: AppState) -> AppState:
-        state["requires_human_review"] = False
-        return state
+    def human_review(state: AppState) -> dict:
+        return {"requires_human_review": False}
     
-    def done(state: AppState) -> AppState:
-        return state
+    def done(state: AppState) -> dict:
+        return {}
     
     workflow = StateGraph(AppState)
+    if trace is None:
+        trace = tracing_enabled()
     
-    workflow.add_node("initialize", initialize)
-    workflow.add_node("orchestrator", orchestrator_agent)
-    workflow.add_node("memory", memory_agent)
-    workflow.add_node("recommenders", parallel_recommenders)
-    workflow.add_node("safety", safety_agent)
-    workflow.add_node("critic", critic_agent)
-    workflow.add_node("explainer", explanation_agent)
-    workflow.add_node("feedback", feedback_agent)
-    workflow.add_node("human_review", human_review)
-    workflow.add_node("done", done)
+    def node(name: str, func, afunc=None):
+        if trace:
+            func = traced(name, func)
+            afunc = traced(name, afunc) if afunc is not None else None
+        if afunc is not None:
+            return RunnableLambda(func, afunc=afunc, name=name)
+        return func
+    
+    workflow.add_node("initialize", node("initialize", returns_delta(initialize)))
+    workflow.add_node("orchestrator", node("orchestrator", returns_delta(orchestrator_agent), returns_delta(aorchestrator_agent)))
+    workflow.add_node("memory", node("memory", returns_delta(memory_agent)))
+    workflow.add_node("retrieve", node("retrieve", retrieve))
+    if parallel_recommenders:
+        workflow.add_node("taste_recommender", node("taste_recommender", taste_recommender_branch))
+        workflow.add_node("explorer", node("explorer", explorer_branch))
+        workflow.add_node("merge", node("merge", merge_candidates))
+    else:
+        workflow.add_node("recommenders", node("recommenders", returns_delta(sequential_recommenders)))
+    workflow.add_node("safety", node("safety", returns_delta(safety_agent)))
+    workflow.add_node("critic", node("critic", returns_delta(critic_agent)))
+    if describe and name_playlist:
+        workflow.add_node("explainer", node("explainer", explainer_branch, aexplainer_branch))
+        workflow.add_node("namer", node("namer", namer_branch, anamer_branch))
+    elif describe:
+        workflow.add_node("explainer", node("explainer", returns_delta(explanation_agent), returns_delta(aexplanation_agent)))
+    workflow.add_node("feedback", node("feedback", returns_delta(feedback_agent)))
+    workflow.add_node("human_review", node("human_review", human_review))
+    workflow.add_node("done", node("done", done))
     
     workflow.set_entry_point("initialize")
     workflow.add_edge("initialize", "orchestrator")
     workflow.add_conditional_edges("orchestrator", route_after_orchestrator)
-    workflow.add_edge("memory", "recommenders")
-    workflow.add_edge("recommenders", "safety")
+    workflow.add_edge("memory", "retrieve")
+    if parallel_recommenders:
+        workflow.add_edge("retrieve", "taste_recommender")
+        workflow.add_edge("retrieve", "explorer")
+        workflow.add_edge(["taste_recommender", "explorer"], "merge")
+        workflow.add_edge("merge", "safety")
+    else:
+        workflow.add_edge("retrieve", "recommenders")
+        workflow.add_edge("recommenders", "safety")
     workflow.add_conditional_edges("safety", route_to_human_review)
     workflow.add_edge("human_review", "critic")
-    workflow.add_edge("critic", "explainer")
-    workflow.add_edge("explainer", "done")
+    if describe and name_playlist:
+        workflow.add_edge("critic", "explainer")
+        workflow.add_edge("critic", "namer")
+        workflow.add_edge(["explainer", "namer"], "done")
+    elif describe:
+        workflow.add_edge("critic", "explainer")
+        workflow.add_edge("explainer", "done")
+    else:
+        workflow.add_edge("critic", "done")
     workflow.add_edge("done", END)
     
-    app = workflow.compile()
+    app = workflow.compile(checkpointer=checkpointer)
     
     return app, lib
 
 
-def invoke_workflow(query: str, user_id: str = "default_user", **kwargs):
-    """Invoke the multi-agent workflow"""
+# describe -> (app, lib)
+_compiled_graphs: Dict[bool, tuple] = {}
+_compiled_graph_lock = threading.Lock()
+
+
+def get_compiled_graph(describe: bool = True):
+    """Return the process-wide compiled graph, rebuilding it if the catalog changed"""
+    lib = get_default_library()
+    with _compiled_graph_lock:
+        compiled = _compiled_graphs.get(describe)
+        if compiled is None or compiled[1] is not lib:
+            compiled = _compiled_graphs[describe] = build_multi_agent_graph(lib, describe=describe)
+        return compiled
+
+
+def invalidate_compiled_graph():
+    """Force the next invocation to reload the catalog and recompile the graph"""
+    with _compiled_graph_lock:
+        _compiled_graphs.clear()
+    invalidate_default_library()
+
+
+def _cached_workflow(query: str, user_id: str, use_cache: bool, overrides: dict, describe: bool = True):
+    app, lib = get_compiled_graph(describe)
     
-    app, lib = build_multi_agent_graph()
+    cache = get_result_cache()
+    key = None
+    if use_cache and cache.enabled:
+        key_overrides = overrides if describe else {**overrides, "describe": False}
+        key = cache.key(query, user_id, key_overrides, load_user_memory(user_id), lib.catalog_key())
+        cached = cache.get(key)
+        if cached is not None:
+            # handles are per process and a disk hit may come from another one
+            cached["library_id"] = lib.handle
+            # nothing ran, so there are no spans to show for this result
+            cached["trace_id"] = None
+            return app, None, key, cached
     
     initial_state = {
         "user_id": user_id,
         "query": query,
-        "library": lib.songs,
+        "library_id": lib.handle,
+        "catalog_version": None,
+        "candidate_pool": None,
+        "user_memory": None,
         "candidate_tracks": [],
         "final_playlist": [],
         "explanations": [],
+        "playlist_title": None,
+        "playlist_description": None,
         "logs": [],
         "error": None,
         "requires_human_review": False,
         "feedback": None,
-        **kwargs
+        "trace_id": uuid.uuid4().hex,
+        **overrides
     }
+    return app, initial_state, key, None
+
+
+def _store_result(key, user_id: str, result):
+    if key is not None and not result.get("error"):
+        get_result_cache().put(key, user_id, result)
+    return result
+
+
+def invoke_workflow(query: str, user_id: str = "default_user", use_cache: bool = True,
+                    describe: bool = True, **kwargs):
+    """Invoke the multi-agent workflow, reusing a cached result for a repeated request
     
-    result = app.invoke(initial_state)
+    The cache key covers the normalized query, user, overrides, the user's
+    current memory and the catalog version; see tools/result_cache.py.
+    describe=False skips the explanation and title (no LLM calls after critic).
+    """
+    app, initial_state, key, cached = _cached_workflow(query, user_id, use_cache, kwargs, describe)
+    if cached is not None:
+        return cached
+    return _store_result(key, user_id, app.invoke(initial_state))
+
+
+async def ainvoke_workflow(query: str, user_id: str = "default_user", use_cache: bool = True,
+                           describe: bool = True, **kwargs):
+    """Async invoke_workflow: LLM calls go through the gateway's pooled async clients"""
+    app, initial_state, key, cached = _cached_workflow(query, user_id, use_cache, kwargs, describe)
+    if cached is not None:
+        return cached
+    return _store_result(key, user_id, await app.ainvoke(initial_state))
+
+
+class WorkflowEvent(BaseModel):
+    """One item of a streamed run
     
-    return result
+    "state": the state after a graph step, with the nodes that ran in it;
+    "delta": a piece of LLM text for a state field ("explanation", "title");
+    "done": the final result, the same dict invoke_workflow returns.
+    """
+    kind: Literal["state", "delta", "done"]
+    nodes: List[str] = []
+    field: Optional[str] = None
+    text: str = ""
+    state: Optional[Dict[str, Any]] = None
+
+
+STREAM_MODES = ["updates", "custom", "values"]
+
+
+def _workflow_event(mode: str, payload, step_nodes: List[str]) -> Optional[WorkflowEvent]:
+    if mode == "updates":
+        step_nodes.extend(payload)
+        return None
+    if mode == "custom":
+        return WorkflowEvent(kind="delta", field=payload.get("field"), text=payload.get("delta", ""))
+    if not step_nodes:
+        # the input echo before the first step
+        return None
+    event = WorkflowEvent(kind="state", nodes=list(step_nodes), state=payload)
+    step_nodes.clear()
+    return event
+
+
+def stream_workflow(query: str, user_id: str = "default_user", use_cache: bool = True, **kwargs) -> Iterator[WorkflowEvent]:
+    """invoke_workflow as a stream: each step's state as it completes, explanation text as it is generated, then the result
+    
+    The playlist is final once a "state" event lists "critic", well before
+    the explainer's LLM call returns. A cached result arrives as a lone "done".
+    """
+    app, initial_state, key, cached = _cached_workflow(query, user_id, use_cache, kwargs)
+    if cached is not None:
+        yield WorkflowEvent(kind="done", state=cached)
+        return
+    
+    result, step_nodes = None, []
+    for mode, payload in app.stream(initial_state, stream_mode=STREAM_MODES):
+        if mode == "values":
+            result = payload
+        event = _workflow_event(mode, payload, step_nodes)
+        if event is not None:
+            yield event
+    yield WorkflowEvent(kind="done", state=_store_result(key, user_id, result))
+
+
+async def astream_workflow(query: str, user_id: str = "default_user", use_cache: bool = True,
+                           **kwargs) -> AsyncIterator[WorkflowEvent]:
+    """Async stream_workflow"""
+    app, initial_state, key, cached = _cached_workflow(query, user_id, use_cache, kwargs)
+    if cached is not None:
+        yield WorkflowEvent(kind="done", state=cached)
+        return
+    
+    result, step_nodes = None, []
+    async for mode, payload in app.astream(initial_state, stream_mode=STREAM_MODES):
+        if mode == "values":
+            result = payload
+        event = _workflow_event(mode, payload, step_nodes)
+        if event is not None:
+            yield event
+    yield WorkflowEvent(kind="done", state=_store_result(key, user_id, result))
@@ -21,8 +21,9 @@ class Song(BaseModel):
     cover_url: Optional[str] = None
     
     def __eq__(self, other):
+        # NotImplemented lets a SongView on the other side compare by id too
         if not isinstance(other, Song):
-            return False
+            return NotImplemented
         return self.id == other.id
     
     def __hash__(self):
@@ -84,11 +85,17 @@ class AppState(TypedDict):
     candidate_tracks: Annotated[List[CandidateTrack], operator.add]
     final_playlist: List[Song]
     explanations: Annotated[List[str], operator.add]
+    playlist_title: Optional[str]
+    playlist_description: Optional[str]
     logs: Annotated[List[AgentLog], operator.add]
-    library: List[Song]
+    library_id: str
+    catalog_version: Optional[int]
+    candidate_pool: Optional[List[int]]
+    user_memory: Optional[dict]
     error: Optional[str]
     requires_human_review: bool
     feedback: Optional[dict]
+    trace_id: Optional[str]
 
 
 class Intent(BaseModel):
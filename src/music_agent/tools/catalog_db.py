@@ -0,0 +1,342 @@
+from __future__ import annotations
+from typing import Callable, List, Dict, Iterator, Optional, Sequence
+from collections import OrderedDict
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from src.music_agent.state import Song
+from src.music_agent.tools.catalog_stream import LoadProgress, iter_song_chunks
+from src.music_agent.tools.library import CatalogSnapshot, MusicLibrary, REFIT_DRIFT
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS songs (
+    pos INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    artist TEXT NOT NULL,
+    year INTEGER,
+    mood TEXT,
+    text TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_songs_artist ON songs(artist);
+CREATE INDEX IF NOT EXISTS idx_songs_year ON songs(year);
+CREATE INDEX IF NOT EXISTS idx_songs_mood ON songs(mood);
+CREATE TABLE IF NOT EXISTS song_genres (
+    genre TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    PRIMARY KEY (genre, pos)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS song_tags (
+    tag TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    PRIMARY KEY (tag, pos)
+) WITHOUT ROWID;
+"""
+
+IMPORT_BATCH_SIZE = 5000
+
+
+def _insert_songs(conn: sqlite3.Connection, songs: List[Song], texts: List[str], start: int):
+    rows, genres, tags = [], [], []
+    for pos, (s, text) in enumerate(zip(songs, texts), start):
+        rows.append((pos, s.id, s.artist, s.year, s.mood, text, s.model_dump_json()))
+        genres.extend((g, pos) for g in s.genres)
+        tags.extend((t, pos) for t in s.tags)
+    conn.executemany("INSERT INTO songs VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.executemany("INSERT OR IGNORE INTO song_genres VALUES (?, ?)", genres)
+    conn.executemany("INSERT OR IGNORE INTO song_tags VALUES (?, ?)", tags)
+
+
+def import_json_catalog(json_path: Path, db_path: Path,
+                        progress: Optional[Callable[[LoadProgress], None]] = None) -> int:
+    """Build (or rebuild) a SQLite catalog from a songs.json array or JSON Lines file"""
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = db_path.with_suffix(db_path.suffix + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    conn = sqlite3.connect(str(tmp_path))
+    count = 0
+    try:
+        conn.executescript(SCHEMA)
+        text_of = MusicLibrary(json_path)._song_text
+        for batch in iter_song_chunks(json_path, chunk_size=IMPORT_BATCH_SIZE, progress=progress):
+            start, count = count, count + len(batch)
+            _insert_songs(conn, batch, [text_of(s) for s in batch], start)
+        conn.commit()
+    finally:
+        conn.close()
+
+    tmp_path.replace(db_path)
+    return count
+
+
+class LazySongList(Sequence):
+    """Read-only list view over the songs table; Song models are hydrated on access"""
+
+    def __init__(self, conn: sqlite3.Connection, lock: threading.Lock, cache_size: int = 10000):
+        self._conn = conn
+        self._lock = lock
+        self._cache: OrderedDict[int, Song] = OrderedDict()
+        self._cache_size = cache_size
+        with self._lock:
+            self._len = conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _remember(self, pos: int, song: Song):
+        self._cache[pos] = song
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def hydrate(self, positions: Sequence[int]) -> List[Song]:
+        positions = [int(p) for p in positions]
+        # built locally: remembering this call's rows may evict earlier ones from the cache
+        found: Dict[int, Song] = {}
+        missing = []
+        for pos in dict.fromkeys(positions):
+            song = self._cache.get(pos)
+            if song is None:
+                missing.append(pos)
+            else:
+                self._cache.move_to_end(pos)
+                found[pos] = song
+        missing.sort()
+        # chunked to stay under SQLite's bound-parameter limit
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT pos, data FROM songs WHERE pos IN ({marks})", chunk
+                ).fetchall()
+            for pos, data in rows:
+                song = found[pos] = Song.model_validate_json(data)
+                self._remember(pos, song)
+        return [found[p] for p in positions]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.hydrate(range(*index.indices(self._len)))
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("song index out of range")
+        return self.hydrate([index])[0]
+
+    def __iter__(self) -> Iterator[Song]:
+        for start in range(0, self._len, IMPORT_BATCH_SIZE):
+            yield from self.hydrate(range(start, min(start + IMPORT_BATCH_SIZE, self._len)))
+
+
+class SQLiteMusicLibrary(MusicLibrary):
+    """MusicLibrary backed by an indexed SQLite catalog
+
+    filter() runs as an indexed query and only the matching songs are
+    hydrated; `songs` is a lazy sequence, so the catalog is never held as
+    Pydantic objects in full unless a caller walks all of it.
+
+    Edits are written to the database (positions stay contiguous, matching
+    the rows of the text matrix) and last until songs.json changes and is
+    re-imported. The database is changed in place rather than published as
+    a snapshot, so reads that map matrix rows to songs hold the edit lock.
+    """
+
+    def __init__(self,
+                 data_path: Path,
+                 db_path: Path | None = None,
+                 vector_index: str | None = None,
+                 text_backend: str | None = None):
+        super().__init__(data_path, vector_index=vector_index, text_backend=text_backend)
+        self.db_path = Path(db_path) if db_path else Path(data_path).with_suffix(".db")
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _needs_import(self) -> bool:
+        if not self.db_path.exists():
+            return True
+        return Path(self.data_path).exists() and Path(self.data_path).stat().st_mtime > self.db_path.stat().st_mtime
+
+    def load(self, progress: Optional[Callable[[LoadProgress], None]] = None) -> int:
+        if self._needs_import():
+            import_json_catalog(self.data_path, self.db_path, progress=progress)
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._lock:
+            corpus = [row[0] for row in self._conn.execute("SELECT text FROM songs ORDER BY pos")]
+        features = self._fit_text_features(corpus)
+        with self._edit_lock:
+            self._publish(songs=LazySongList(self._conn, self._lock), **features)
+        return len(self.songs)
+
+    def _read_lock(self):
+        return self._edit_lock
+
+    def _positions_of(self, ids: List[str], catalog: CatalogSnapshot | None = None) -> List[int]:
+        # the database holds the positions; readers hold the edit lock, so it matches the snapshot
+        positions = []
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT pos FROM songs WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+            positions.extend(row[0] for row in rows)
+        return positions
+
+    def filter_positions(self,
+                         *,
+                         genres: List[str] | None = None,
+                         artists: List[str] | None = None,
+                         tags: List[str] | None = None,
+                         moods: List[str] | None = None,
+                         min_year: int | None = None,
+                         max_year: int | None = None) -> List[int]:
+        clauses, params = [], []
+        if genres:
+            clauses.append(f"pos IN (SELECT pos FROM song_genres WHERE genre IN ({','.join('?' * len(genres))}))")
+            params.extend(genres)
+        if artists:
+            clauses.append(f"artist IN ({','.join('?' * len(artists))})")
+            params.extend(artists)
+        if tags:
+            clauses.append(f"pos IN (SELECT pos FROM song_tags WHERE tag IN ({','.join('?' * len(tags))}))")
+            params.extend(tags)
+        if moods:
+            clauses.append(f"mood IN ({','.join('?' * len(moods))})")
+            params.extend(moods)
+        # missing years behave like the in-memory filter: 0 for min_year, 9999 for max_year
+        if min_year:
+            clauses.append("COALESCE(year, 0) >= ?")
+            params.append(min_year)
+        if max_year:
+            clauses.append("COALESCE(NULLIF(year, 0), 9999) <= ?")
+            params.append(max_year)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT pos FROM songs {where} ORDER BY pos", params).fetchall()
+        return [row[0] for row in rows]
+
+    def filter_ids(self, **filters) -> List[str]:
+        positions = self.filter_positions(**filters)
+        if not positions:
+            return []
+        ids: Dict[int, str] = {}
+        for start in range(0, len(positions), 500):
+            chunk = positions[start:start + 500]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT pos, id FROM songs WHERE pos IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+            ids.update(rows)
+        return [ids[p] for p in positions]
+
+    def filter(self, **filters) -> List[Song]:
+        return self.songs.hydrate(self.filter_positions(**filters))
+
+    def songs_at(self, positions) -> List[Song]:
+        return self.songs.hydrate(positions)
+
+    def catalog_key(self) -> str:
+        # edits from any process bump the database's user_version, not songs.json
+        with self._lock:
+            edits = self._conn.execute("PRAGMA user_version").fetchone()[0] if self._conn else 0
+        return f"{super().catalog_key()}:{edits}"
+
+    def _bump_edits(self):
+        edits = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        self._conn.execute(f"PRAGMA user_version = {edits + 1}")
+
+    def _publish_edit(self, corpus: List[str], matrix):
+        # a fresh lazy list, so no cached Song outlives the positions it was read at
+        self._publish(songs=LazySongList(self._conn, self._lock), corpus=corpus, matrix=matrix,
+                      vector_index=self._reindexed(matrix))
+
+    def add_songs(self, songs) -> int:
+        songs = [s if isinstance(s, Song) else Song(**s) for s in songs]
+        if not songs:
+            return 0
+        texts = [self._song_text(s) for s in songs]
+        with self._edit_lock:
+            duplicates = {s.id for s in self.songs.hydrate(self._positions_of([s.id for s in songs]))}
+            if duplicates or len({s.id for s in songs}) != len(songs):
+                raise ValueError(f"Songs already in the library: {sorted(duplicates) or 'duplicate ids in batch'}")
+            catalog = self._catalog
+            rows = catalog.tfidf.transform(texts)
+            with self._lock, self._conn:
+                _insert_songs(self._conn, songs, texts, len(catalog.songs))
+                self._bump_edits()
+            self._publish_edit(catalog.corpus + texts, sparse.vstack([catalog.matrix, rows], format="csr"))
+            self._after_edit(texts)
+        return len(songs)
+
+    def update_song(self, song):
+        song = song if isinstance(song, Song) else Song(**song)
+        text = self._song_text(song)
+        with self._edit_lock:
+            pos = self._positions_of([song.id])
+            if not pos:
+                raise KeyError(song.id)
+            pos = pos[0]
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM songs WHERE pos = ?", (pos,))
+                self._conn.execute("DELETE FROM song_genres WHERE pos = ?", (pos,))
+                self._conn.execute("DELETE FROM song_tags WHERE pos = ?", (pos,))
+                _insert_songs(self._conn, [song], [text], pos)
+                self._bump_edits()
+            catalog = self._catalog
+            corpus = list(catalog.corpus)
+            corpus[pos] = text
+            matrix = sparse.vstack(
+                [catalog.matrix[:pos], catalog.tfidf.transform([text]), catalog.matrix[pos + 1:]], format="csr"
+            )
+            self._publish_edit(corpus, matrix)
+            self._after_edit([text])
+
+    def remove_songs(self, ids) -> int:
+        with self._edit_lock:
+            removed = sorted(set(self._positions_of(list(set(ids)))))
+            if not removed:
+                return 0
+            mask = np.ones(len(self.songs), dtype=np.bool_)
+            mask[removed] = False
+            keep = np.flatnonzero(mask)
+            # close the gaps in ascending order, so each target position is already free
+            moves = [(int(new), int(old)) for new, old in enumerate(keep) if new != old]
+            with self._lock, self._conn:
+                for table in ("songs", "song_genres", "song_tags"):
+                    self._conn.executemany(f"DELETE FROM {table} WHERE pos = ?", [(p,) for p in removed])
+                    self._conn.executemany(f"UPDATE {table} SET pos = ? WHERE pos = ?", moves)
+                self._bump_edits()
+            catalog = self._catalog
+            self._publish_edit([catalog.corpus[i] for i in keep], catalog.matrix[keep])
+            self._edited_docs += len(removed)
+            if self._edited_docs / max(1, self._fitted_docs) > REFIT_DRIFT:
+                self.refit(background=True)
+        return len(removed)
+
+    def facets(self, field: str) -> Dict[str, int]:
+        queries = {
+            "genres": "SELECT genre, COUNT(*) FROM song_genres GROUP BY genre",
+            "tags": "SELECT tag, COUNT(*) FROM song_tags GROUP BY tag",
+            "moods": "SELECT mood, COUNT(*) FROM songs WHERE mood IS NOT NULL GROUP BY mood",
+            "artists": "SELECT artist, COUNT(*) FROM songs GROUP BY artist",
+        }
+        with self._lock:
+            rows = self._conn.execute(queries[field]).fetchall()
+        return dict(sorted(rows))
+
+
+if __name__ == "__main__":
+    from src.music_agent.tools.library import DEFAULT_DATA_PATH
+
+    count = import_json_catalog(DEFAULT_DATA_PATH, DEFAULT_DATA_PATH.with_suffix(".db"))
+    print(f"Imported {count} songs into {DEFAULT_DATA_PATH.with_suffix('.db')}")
@@ -0,0 +1,155 @@
+from __future__ import annotations
+from typing import Callable, Iterator, List, Optional
+import codecs
+import json
+import time
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from src.music_agent.state import Song
+
+
+LOAD_CHUNK_SIZE = 5000
+READ_BLOCK_SIZE = 1 << 20
+JSONL_SUFFIXES = {".jsonl", ".ndjson"}
+
+
+class LoadProgress(BaseModel):
+    path: str
+    records: int = 0
+    chunks: int = 0
+    bytes_read: int = 0
+    total_bytes: int = 0
+    elapsed_s: float = 0.0
+    done: bool = False
+
+    def fraction(self) -> float:
+        return self.bytes_read / self.total_bytes if self.total_bytes else 1.0
+
+    def records_per_s(self) -> float:
+        return self.records / self.elapsed_s if self.elapsed_s else 0.0
+
+
+class _ByteCounter:
+    def __init__(self, f):
+        self._f = f
+        self.count = 0
+
+    def read(self, size: int) -> bytes:
+        block = self._f.read(size)
+        self.count += len(block)
+        return block
+
+
+def _is_jsonl(path: Path) -> bool:
+    if path.suffix.lower() in JSONL_SUFFIXES:
+        return True
+    with open(path, "rb") as f:
+        head = f.read(4096).lstrip()
+    return head.startswith(b"{")
+
+
+def _iter_jsonl(reader: _ByteCounter) -> Iterator[dict]:
+    pending = b""
+    while True:
+        block = reader.read(READ_BLOCK_SIZE)
+        lines = (pending + block).split(b"\n")
+        pending = lines.pop() if block else b""
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+        if not block:
+            return
+
+
+def _iter_json_array(reader: _ByteCounter) -> Iterator[dict]:
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf, pos, eof = "", 0, False
+    started = False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        block = reader.read(READ_BLOCK_SIZE)
+        eof = not block
+        # drop consumed text so the buffer stays around one block
+        buf = buf[pos:] + utf8.decode(block, final=eof)
+        pos = 0
+        return not eof
+
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(buf):
+            if not fill():
+                break
+            continue
+        if not started:
+            if buf[pos] != "[":
+                raise ValueError("catalog must be a JSON array or JSON Lines")
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            record, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # the record straddles the end of the buffer
+            if not fill():
+                raise
+            continue
+        pos = end
+        yield record
+
+    if not started:
+        return
+    raise ValueError("unterminated JSON array in catalog")
+
+
+def iter_catalog_records(path: Path, on_bytes: Optional[Callable[[int], None]] = None) -> Iterator[dict]:
+    """Yield raw song records from a JSON array or JSON Lines file without loading it whole"""
+    path = Path(path)
+    jsonl = _is_jsonl(path)
+    with open(path, "rb") as f:
+        reader = _ByteCounter(f)
+        records = _iter_jsonl(reader) if jsonl else _iter_json_array(reader)
+        for record in records:
+            if on_bytes is not None:
+                on_bytes(reader.count)
+            yield record
+
+
+def iter_song_chunks(path: Path,
+                     chunk_size: int = LOAD_CHUNK_SIZE,
+                     progress: Optional[Callable[[LoadProgress], None]] = None) -> Iterator[List[Song]]:
+    """Validated Song chunks streamed from a catalog file, reporting progress after each chunk"""
+    path = Path(path)
+    state = LoadProgress(path=str(path), total_bytes=path.stat().st_size)
+    start = time.perf_counter()
+
+    def on_bytes(count: int):
+        state.bytes_read = count
+
+    def report():
+        state.elapsed_s = time.perf_counter() - start
+        if progress is not None:
+            progress(state)
+
+    chunk: List[Song] = []
+    for record in iter_catalog_records(path, on_bytes=on_bytes):
+        chunk.append(Song(**record))
+        if len(chunk) >= chunk_size:
+            state.records += len(chunk)
+            state.chunks += 1
+            yield chunk
+            report()
+            chunk = []
+    if chunk:
+        state.records += len(chunk)
+        state.chunks += 1
+        yield chunk
+    state.bytes_read = state.total_bytes
+    state.done = True
+    report()
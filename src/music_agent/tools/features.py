@@ -0,0 +1,193 @@
+from __future__ import annotations
+from typing import List, Dict, Iterable, Callable, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from src.music_agent.state import Song
+from src.music_agent.tools.song_table import SongTable, ListColumn
+
+
+def _numeric_column(songs: List[Song], field: str) -> np.ndarray:
+    if isinstance(songs, SongTable):
+        return songs.numeric(field)
+    # missing values become 0.0, which the scorers already treat as "falsy / absent"
+    return np.array([getattr(s, field) or 0.0 for s in songs], dtype=np.float64)
+
+
+def _codes(values: Iterable[str | None]) -> tuple[np.ndarray, Dict[str, int]]:
+    vocab: Dict[str, int] = {}
+    codes = []
+    for v in values:
+        if v is None:
+            codes.append(-1)
+            continue
+        codes.append(vocab.setdefault(v, len(vocab)))
+    return np.array(codes, dtype=np.int64), vocab
+
+
+def _multi_hot(songs: List[Song], values: Callable[[Song], Iterable[str]]) -> tuple[sparse.csc_matrix, Dict[str, int]]:
+    vocab: Dict[str, int] = {}
+    rows, cols = [], []
+    for i, s in enumerate(songs):
+        for v in set(values(s)):
+            rows.append(i)
+            cols.append(vocab.setdefault(v, len(vocab)))
+    data = np.ones(len(rows), dtype=np.bool_)
+    matrix = sparse.csc_matrix((data, (rows, cols)), shape=(len(songs), len(vocab)))
+    return matrix, vocab
+
+
+def _table_codes(songs: SongTable, field: str) -> tuple[np.ndarray, Dict[str, int]]:
+    column = songs.categories[field]
+    return column.codes.astype(np.int64), {v: i for i, v in enumerate(column.values)}
+
+
+def _table_multi_hot(column: ListColumn, lowercase: bool = False) -> tuple[sparse.csc_matrix, Dict[str, int]]:
+    vocab: Dict[str, int] = {}
+    remap = np.array(
+        [vocab.setdefault(v.lower() if lowercase else v, len(vocab)) for v in column.values], dtype=np.int64
+    )
+    rows = column.rows()
+    cols = remap[column.codes] if column.codes.size else np.empty(0, dtype=np.int64)
+    data = np.ones(rows.shape[0], dtype=np.bool_)
+    # repeated values in a row collapse to a single True, like the set() in _multi_hot
+    matrix = sparse.csc_matrix((data, (rows, cols)), shape=(len(column.offsets) - 1, len(vocab)))
+    return matrix, vocab
+
+
+class CatalogFeatures:
+    """Columnar NumPy view of a song catalog for batched scoring"""
+
+    def __init__(self, songs: List[Song]):
+        self.size = len(songs)
+        self._csr: Dict[str, sparse.csr_matrix] = {}
+        self._orders: Dict[tuple, np.ndarray] = {}
+        if isinstance(songs, SongTable):
+            self.ids = np.array(songs.strings["id"].to_list(), dtype=object)
+        else:
+            self.ids = np.array([s.id for s in songs], dtype=object)
+
+        self.energy = _numeric_column(songs, "energy")
+        self.danceability = _numeric_column(songs, "danceability")
+        self.valence = _numeric_column(songs, "valence")
+        self.popularity = _numeric_column(songs, "popularity")
+        self.year = _numeric_column(songs, "year")
+
+        if isinstance(songs, SongTable):
+            self.artist_codes, self.artist_vocab = _table_codes(songs, "artist")
+            self.mood_codes, self.mood_vocab = _table_codes(songs, "mood")
+            self.genres, self.genre_vocab = _table_multi_hot(songs.lists["genres"])
+            self.genres_lower, self.genre_lower_vocab = _table_multi_hot(songs.lists["genres"], lowercase=True)
+            self.tags, self.tag_vocab = _table_multi_hot(songs.lists["tags"])
+            return
+
+        self.artist_codes, self.artist_vocab = _codes(s.artist for s in songs)
+        self.mood_codes, self.mood_vocab = _codes(s.mood for s in songs)
+
+        self.genres, self.genre_vocab = _multi_hot(songs, lambda s: s.genres)
+        self.genres_lower, self.genre_lower_vocab = _multi_hot(songs, lambda s: (g.lower() for g in s.genres))
+        self.tags, self.tag_vocab = _multi_hot(songs, lambda s: s.tags)
+
+    def subset(self, positions: np.ndarray) -> CatalogFeatures:
+        """Features of the songs at the given catalog positions, in that order
+
+        Vocabularies are shared with the full catalog; the cost is proportional
+        to len(positions), not to the catalog size.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        sub = object.__new__(CatalogFeatures)
+        sub.size = len(positions)
+        sub._csr = {}
+        sub._orders = {}
+        for name in ("ids", "energy", "danceability", "valence", "popularity", "year", "artist_codes", "mood_codes"):
+            setattr(sub, name, getattr(self, name)[positions])
+        for name in ("genres", "genres_lower", "tags"):
+            # row slicing a CSC matrix scans every column; CSR copies are made once per catalog
+            rows = self._csr.get(name)
+            if rows is None:
+                rows = self._csr[name] = getattr(self, name).tocsr()
+            setattr(sub, name, rows[positions].tocsc())
+        sub.artist_vocab, sub.mood_vocab = self.artist_vocab, self.mood_vocab
+        sub.genre_vocab, sub.genre_lower_vocab, sub.tag_vocab = self.genre_vocab, self.genre_lower_vocab, self.tag_vocab
+        return sub
+
+    def popularity_order(self, below: float | None = None, above: float | None = None) -> np.ndarray:
+        """Positions from most to least popular, ties in catalog order, built once per catalog
+
+        With below/above only the tracks in that energy band are kept: nonzero
+        energy under `below`, or energy over `above`.
+        """
+        key = (below, above)
+        order = self._orders.get(key)
+        if order is None:
+            order = self._orders.get((None, None))
+            if order is None:
+                order = self._orders[(None, None)] = np.argsort(-self.popularity, kind="stable")
+            if below is not None:
+                energy = self.energy[order]
+                order = order[(energy != 0) & (energy < below)]
+            elif above is not None:
+                order = order[self.energy[order] > above]
+            self._orders[key] = order
+        return order
+
+    def _column(self, matrix: sparse.csc_matrix, vocab: Dict[str, int], value: str) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=np.bool_)
+        j = vocab.get(value)
+        if j is not None:
+            mask[matrix.indices[matrix.indptr[j]:matrix.indptr[j + 1]]] = True
+        return mask
+
+    def has_genre(self, genre: str, lowercase: bool = False) -> np.ndarray:
+        if lowercase:
+            return self._column(self.genres_lower, self.genre_lower_vocab, genre.lower())
+        return self._column(self.genres, self.genre_vocab, genre)
+
+    def has_tag(self, tag: str) -> np.ndarray:
+        return self._column(self.tags, self.tag_vocab, tag)
+
+    def has_any_tag(self, tags: Iterable[str]) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=np.bool_)
+        for tag in tags:
+            mask |= self.has_tag(tag)
+        return mask
+
+    def artist_in(self, artists: Iterable[str]) -> np.ndarray:
+        codes = [self.artist_vocab[a] for a in set(artists) if a in self.artist_vocab]
+        return np.isin(self.artist_codes, codes)
+
+    def mood_in(self, moods: Iterable[str]) -> np.ndarray:
+        codes = [self.mood_vocab[m] for m in set(moods) if m in self.mood_vocab]
+        return np.isin(self.mood_codes, codes)
+
+    def id_in(self, ids: Iterable[str]) -> np.ndarray:
+        return np.isin(self.ids, list(ids))
+
+
+_features_cache: Dict[int, tuple[List[Song], CatalogFeatures]] = {}
+_FEATURES_CACHE_SIZE = 4
+
+
+def get_catalog_features(songs: List[Song]) -> CatalogFeatures:
+    """Features for a song list, built once and reused while the same list is in use"""
+    key = id(songs)
+    cached = _features_cache.get(key)
+    # the cache holds a reference to the list, so its id cannot be recycled while cached
+    if cached is not None and cached[0] is songs and cached[1].size == len(songs):
+        return cached[1]
+
+    features = CatalogFeatures(songs)
+    if len(_features_cache) >= _FEATURES_CACHE_SIZE:
+        _features_cache.pop(next(iter(_features_cache)))
+    _features_cache[key] = (songs, features)
+    return features
+
+
+def pool_features(songs: List[Song], pool: Sequence[int] | None = None) -> tuple[CatalogFeatures, np.ndarray]:
+    """Features to score and the catalog position of each scored row; no pool means the whole catalog"""
+    features = get_catalog_features(songs)
+    if pool is None:
+        return features, np.arange(features.size, dtype=np.int64)
+    positions = np.asarray(pool, dtype=np.int64)
+    return features.subset(positions), positions
@@ -0,0 +1,190 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from pydantic import BaseModel
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from src.music_agent.tools.result_cache import fingerprint, normalize_query
+
+
+DATA_DIR = Path(__file__).parents[1] / "data"
+
+
+class IntentHit(BaseModel):
+    data: Dict[str, Any]
+    query: str
+    similarity: float
+
+
+def intent_namespace(name: str, prompt: str, model: str = "", provider: str = "") -> str:
+    """Cache namespace per parser; editing the prompt, model or LLM provider starts a fresh one
+
+    The provider matters because the persisted cache outlives the process: parses
+    from the fake provider must never be served to a live Mistral run.
+    """
+    return f"{name}:{fingerprint([prompt, model, provider])[:8]}"
+
+
+class IntentCache:
+    """Parsed LLM intents keyed by normalized query, with a paraphrase tier
+
+    Exact lookups match the normalized text. Otherwise the query is compared
+    with cached queries of the same namespace by cosine similarity of hashed
+    character 3-4 grams, which catches reworded and misspelt requests ("chill
+    music for studying" vs "chill study music") without any fitted state.
+    Candidates at or above `threshold` must also agree on any numbers in the
+    text and pass the caller's `agree` check, since one changed word ("happy
+    pop" vs "happy rock") keeps most n-grams but changes the intent. Entries
+    persist in SQLite and the least recently used are evicted past max_entries.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None, max_entries: int = 2000, threshold: float = 0.7):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.vectorizer = HashingVectorizer(
+            analyzer="char_wb", ngram_range=(3, 4), n_features=2 ** 18, alternate_sign=False, norm="l2"
+        )
+        # (namespace, normalized query) -> (original query, data as JSON)
+        self._entries: "OrderedDict[tuple[str, str], tuple[str, str]]" = OrderedDict()
+        self._matrices: Dict[str, tuple[List[str], sparse.csr_matrix]] = {}
+        self._lock = threading.RLock()
+        self._stats = {"exact_hits": 0, "similar_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._similarities: List[float] = []
+
+        self._conn = None
+        if db_path is not None:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS intents ("
+                    "namespace TEXT NOT NULL, key TEXT NOT NULL, query TEXT NOT NULL, data TEXT NOT NULL, "
+                    "last_used REAL NOT NULL, PRIMARY KEY (namespace, key))"
+                )
+            rows = self._conn.execute(
+                "SELECT namespace, key, query, data FROM intents ORDER BY last_used DESC LIMIT ?", (max_entries,)
+            ).fetchall()
+            for namespace, key, query, data in reversed(rows):
+                self._entries[(namespace, key)] = (query, data)
+
+    def _matrix(self, namespace: str) -> tuple[List[str], sparse.csr_matrix]:
+        cached = self._matrices.get(namespace)
+        if cached is None:
+            keys = [key for ns, key in self._entries if ns == namespace]
+            matrix = self.vectorizer.transform(keys) if keys else sparse.csr_matrix((0, self.vectorizer.n_features))
+            cached = self._matrices[namespace] = (keys, matrix)
+        return cached
+
+    def _touch(self, namespace: str, key: str):
+        self._entries.move_to_end((namespace, key))
+        if self._conn is not None:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE intents SET last_used = ? WHERE namespace = ? AND key = ?", (time.time(), namespace, key)
+                )
+
+    def lookup(self,
+               namespace: str,
+               query: str,
+               agree: Optional[Callable[[str, str], bool]] = None) -> Optional[IntentHit]:
+        """Cached parse for this query or a close paraphrase; agree(cached_query, query) vetoes paraphrases"""
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None:
+                self._touch(namespace, key)
+                self._stats["exact_hits"] += 1
+                return IntentHit(data=json.loads(entry[1]), query=entry[0], similarity=1.0)
+
+            keys, matrix = self._matrix(namespace)
+            if keys and key:
+                scores = (matrix @ self.vectorizer.transform([key]).T).toarray().ravel()
+                numbers = re.findall(r"\d+", key)
+                for best in np.argsort(-scores, kind="stable"):
+                    if scores[best] < self.threshold:
+                        break
+                    match = keys[best]
+                    if re.findall(r"\d+", match) != numbers or (agree is not None and not agree(match, key)):
+                        continue
+                    self._touch(namespace, match)
+                    self._stats["similar_hits"] += 1
+                    self._similarities.append(float(scores[best]))
+                    query_text, data = self._entries[(namespace, match)]
+                    return IntentHit(data=json.loads(data), query=query_text, similarity=float(scores[best]))
+
+            self._stats["misses"] += 1
+            return None
+
+    def store(self, namespace: str, query: str, data: Dict[str, Any]):
+        key = normalize_query(query)
+        if not key:
+            return
+        payload = json.dumps(data)
+        with self._lock:
+            self._entries[(namespace, key)] = (query, payload)
+            self._entries.move_to_end((namespace, key))
+            self._matrices.pop(namespace, None)
+            self._stats["stores"] += 1
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+                self._matrices.pop(evicted[-1][0], None)
+                self._stats["evictions"] += 1
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO intents (namespace, key, query, data, last_used) VALUES (?, ?, ?, ?, ?)",
+                        (namespace, key, query, payload, time.time())
+                    )
+                    self._conn.executemany("DELETE FROM intents WHERE namespace = ? AND key = ?", evicted)
+
+    def clear(self, namespace: Optional[str] = None):
+        with self._lock:
+            for entry in [e for e in self._entries if namespace is None or e[0] == namespace]:
+                del self._entries[entry]
+            self._matrices.clear()
+            if self._conn is not None:
+                with self._conn:
+                    if namespace is None:
+                        self._conn.execute("DELETE FROM intents")
+                    else:
+                        self._conn.execute("DELETE FROM intents WHERE namespace = ?", (namespace,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._stats["exact_hits"] + self._stats["similar_hits"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "threshold": self.threshold,
+                "hit_rate": hits / max(1, hits + self._stats["misses"]),
+                "mean_similarity": float(np.mean(self._similarities)) if self._similarities else None,
+            }
+
+
+_global_intent_cache = None
+_global_intent_cache_lock = threading.Lock()
+
+
+def get_intent_cache() -> IntentCache:
+    """Process-wide intent cache in data/intent_cache.db (MUSIC_INTENT_CACHE_DB, or "off" to keep it in memory)"""
+    global _global_intent_cache
+    with _global_intent_cache_lock:
+        if _global_intent_cache is None:
+            db_path = os.getenv("MUSIC_INTENT_CACHE_DB", str(DATA_DIR / "intent_cache.db"))
+            _global_intent_cache = IntentCache(
+                db_path=None if db_path.lower() == "off" else Path(db_path),
+                max_entries=int(os.getenv("MUSIC_INTENT_CACHE_SIZE", "2000")),
+                threshold=float(os.getenv("MUSIC_INTENT_CACHE_THRESHOLD", "0.7")),
+            )
+        return _global_intent_cache
@@ -0,0 +1,241 @@
+from __future__ import annotations
+from typing import List, Dict, Iterable, Optional
+
+import numpy as np
+
+from src.music_agent.state import Song
+from src.music_agent.tools.song_table import SongTable, INT_NONE
+
+
+def _postings(values_per_song: Iterable[Iterable[str]]) -> Dict[str, np.ndarray]:
+    lists: Dict[str, List[int]] = {}
+    for pos, values in enumerate(values_per_song):
+        for v in set(values):
+            lists.setdefault(v, []).append(pos)
+    # positions are appended in catalog order, so every posting list is already sorted
+    return {v: np.array(p, dtype=np.int64) for v, p in sorted(lists.items())}
+
+
+def _coded_postings(codes: np.ndarray, rows: np.ndarray, values: List[str]) -> Dict[str, np.ndarray]:
+    keep = codes >= 0
+    # one entry per (value, row) pair, ordered by value then position
+    pairs = np.unique(np.stack([codes[keep].astype(np.int64), rows[keep]], axis=1), axis=0)
+    bounds = np.searchsorted(pairs[:, 0], np.arange(len(values) + 1))
+    lists = {values[c]: pairs[bounds[c]:bounds[c + 1], 1] for c in range(len(values)) if bounds[c + 1] > bounds[c]}
+    return dict(sorted(lists.items()))
+
+
+def _song_values(song: Song) -> Dict[str, set]:
+    return {
+        "genres": set(song.genres),
+        "tags": set(song.tags),
+        "moods": {song.mood} if song.mood is not None else set(),
+        "artists": {song.artist},
+    }
+
+
+def _year_keys(song: Song) -> tuple[int, int]:
+    return song.year or 0, song.year or 9999
+
+
+def _insert_keys(order: np.ndarray, keys_sorted: np.ndarray,
+                 positions: np.ndarray, keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # year_range() sorts what it selects, so ties may land in any order
+    rank = np.argsort(keys, kind="stable")
+    at = np.searchsorted(keys_sorted, keys[rank], side="right")
+    return np.insert(order, at, positions[rank]), np.insert(keys_sorted, at, keys[rank])
+
+
+def _remove_position(order: np.ndarray, keys_sorted: np.ndarray, pos: int) -> tuple[np.ndarray, np.ndarray]:
+    at = np.flatnonzero(order == pos)
+    return np.delete(order, at), np.delete(keys_sorted, at)
+
+
+class CatalogIndex:
+    """Inverted indexes over a song list, keyed by catalog position
+
+    genre/tag/mood/artist map to sorted position arrays; years are kept as
+    two sorted arrays (missing years as 0 for lower bounds and 9999 for upper
+    bounds, matching MusicLibrary.filter) so range queries are two binary searches.
+
+    An index is never changed once built: appended(), replaced() and
+    without() return a new index for an edited catalog, touching only the
+    affected posting lists and sharing the rest.
+    """
+
+    def __init__(self, songs: List[Song]):
+        self.size = len(songs)
+        self.postings: Dict[str, Dict[str, np.ndarray]]
+        if isinstance(songs, SongTable):
+            positions = np.arange(self.size, dtype=np.int64)
+            self.postings = {
+                field: _coded_postings(songs.lists[field].codes, songs.lists[field].rows(), songs.lists[field].values)
+                for field in ("genres", "tags")
+            }
+            for field, column in (("moods", "mood"), ("artists", "artist")):
+                category = songs.categories[column]
+                self.postings[field] = _coded_postings(category.codes, positions, category.values)
+            years = songs.ints["year"].astype(np.int64)
+            missing = (years == INT_NONE) | (years == 0)
+            min_keys = np.where(missing, 0, years)
+            max_keys = np.where(missing, 9999, years)
+        else:
+            self.postings = {
+                "genres": _postings(s.genres for s in songs),
+                "tags": _postings(s.tags for s in songs),
+                "moods": _postings([s.mood] if s.mood is not None else [] for s in songs),
+                "artists": _postings([s.artist] for s in songs),
+            }
+            min_keys = np.array([s.year or 0 for s in songs], dtype=np.int64)
+            max_keys = np.array([s.year or 9999 for s in songs], dtype=np.int64)
+
+        self._min_order = np.argsort(min_keys, kind="stable")
+        self._min_sorted = min_keys[self._min_order]
+        self._max_order = np.argsort(max_keys, kind="stable")
+        self._max_sorted = max_keys[self._max_order]
+
+    def _derive(self, size: int, postings: Dict[str, Dict[str, np.ndarray]],
+                min_order: np.ndarray, min_sorted: np.ndarray,
+                max_order: np.ndarray, max_sorted: np.ndarray) -> CatalogIndex:
+        index = object.__new__(CatalogIndex)
+        index.size, index.postings = size, postings
+        index._min_order, index._min_sorted = min_order, min_sorted
+        index._max_order, index._max_sorted = max_order, max_sorted
+        return index
+
+    def appended(self, songs: List[Song]) -> CatalogIndex:
+        """Index of the catalog with songs added at the end"""
+        positions = np.arange(self.size, self.size + len(songs), dtype=np.int64)
+        added: Dict[str, Dict[str, List[int]]] = {field: {} for field in self.postings}
+        for pos, song in zip(positions.tolist(), songs):
+            for field, values in _song_values(song).items():
+                for v in values:
+                    added[field].setdefault(v, []).append(pos)
+
+        postings = {}
+        for field, index in self.postings.items():
+            index = dict(index)
+            new_values = False
+            for v, p in added[field].items():
+                old = index.get(v)
+                new_values |= old is None
+                # new positions are past every existing one, so the lists stay sorted
+                index[v] = np.array(p, dtype=np.int64) if old is None else np.concatenate([old, p])
+            postings[field] = dict(sorted(index.items())) if new_values else index
+
+        keys = np.array([_year_keys(s) for s in songs], dtype=np.int64).reshape(-1, 2)
+        min_order, min_sorted = _insert_keys(self._min_order, self._min_sorted, positions, keys[:, 0])
+        max_order, max_sorted = _insert_keys(self._max_order, self._max_sorted, positions, keys[:, 1])
+        return self._derive(self.size + len(songs), postings, min_order, min_sorted, max_order, max_sorted)
+
+    def replaced(self, pos: int, old: Song, new: Song) -> CatalogIndex:
+        """Index of the catalog with the song at pos changed from old to new"""
+        before, after = _song_values(old), _song_values(new)
+        postings = {}
+        for field, index in self.postings.items():
+            dropped, gained = before[field] - after[field], after[field] - before[field]
+            if not dropped and not gained:
+                postings[field] = index
+                continue
+            index = dict(index)
+            for v in dropped:
+                p = index[v]
+                p = np.delete(p, np.searchsorted(p, pos))
+                if p.size:
+                    index[v] = p
+                else:
+                    del index[v]
+            for v in gained:
+                p = index.get(v)
+                index[v] = np.array([pos], dtype=np.int64) if p is None else np.insert(p, np.searchsorted(p, pos), pos)
+            postings[field] = dict(sorted(index.items())) if gained else index
+
+        at = np.array([pos], dtype=np.int64)
+        (old_min, old_max), (new_min, new_max) = _year_keys(old), _year_keys(new)
+        min_order, min_sorted = self._min_order, self._min_sorted
+        if old_min != new_min:
+            min_order, min_sorted = _remove_position(min_order, min_sorted, pos)
+            min_order, min_sorted = _insert_keys(min_order, min_sorted, at, np.array([new_min]))
+        max_order, max_sorted = self._max_order, self._max_sorted
+        if old_max != new_max:
+            max_order, max_sorted = _remove_position(max_order, max_sorted, pos)
+            max_order, max_sorted = _insert_keys(max_order, max_sorted, at, np.array([new_max]))
+        return self._derive(self.size, postings, min_order, min_sorted, max_order, max_sorted)
+
+    def without(self, removed: np.ndarray) -> CatalogIndex:
+        """Index of the catalog with the songs at the removed positions dropped and the rest shifted down"""
+        keep = np.ones(self.size, dtype=np.bool_)
+        keep[removed] = False
+        remap = np.cumsum(keep) - 1
+        first = int(np.min(removed))
+
+        postings = {}
+        for field, index in self.postings.items():
+            shifted = {}
+            for v, p in index.items():
+                if p[-1] < first:
+                    shifted[v] = p
+                    continue
+                p = remap[p[keep[p]]]
+                if p.size:
+                    shifted[v] = p
+            postings[field] = shifted
+
+        kept_min, kept_max = keep[self._min_order], keep[self._max_order]
+        return self._derive(
+            self.size - int((~keep).sum()), postings,
+            remap[self._min_order[kept_min]], self._min_sorted[kept_min],
+            remap[self._max_order[kept_max]], self._max_sorted[kept_max],
+        )
+
+    def union(self, field: str, values: Iterable[str]) -> np.ndarray:
+        index = self.postings[field]
+        lists = [index[v] for v in set(values) if v in index]
+        if not lists:
+            return np.empty(0, dtype=np.int64)
+        if len(lists) == 1:
+            return lists[0]
+        return np.unique(np.concatenate(lists))
+
+    def year_range(self, min_year: Optional[int] = None, max_year: Optional[int] = None) -> np.ndarray:
+        positions = None
+        if min_year:
+            start = np.searchsorted(self._min_sorted, min_year, side="left")
+            positions = np.sort(self._min_order[start:])
+        if max_year:
+            end = np.searchsorted(self._max_sorted, max_year, side="right")
+            upper = np.sort(self._max_order[:end])
+            positions = upper if positions is None else np.intersect1d(positions, upper, assume_unique=True)
+        if positions is None:
+            return np.arange(self.size, dtype=np.int64)
+        return positions
+
+    def filter_positions(self,
+                         *,
+                         genres: List[str] | None = None,
+                         artists: List[str] | None = None,
+                         tags: List[str] | None = None,
+                         moods: List[str] | None = None,
+                         min_year: int | None = None,
+                         max_year: int | None = None) -> np.ndarray:
+        """Sorted catalog positions matching every given filter (any-of within a filter)"""
+        result = None
+        for field, values in (("genres", genres), ("artists", artists), ("tags", tags), ("moods", moods)):
+            if not values:
+                continue
+            matches = self.union(field, values)
+            result = matches if result is None else np.intersect1d(result, matches, assume_unique=True)
+            if result.size == 0:
+                return result
+
+        if min_year or max_year:
+            years = self.year_range(min_year, max_year)
+            result = years if result is None else np.intersect1d(result, years, assume_unique=True)
+
+        if result is None:
+            return np.arange(self.size, dtype=np.int64)
+        return result
+
+    def facet_counts(self, field: str) -> Dict[str, int]:
+        """Distinct values of a field with their track counts, sorted by value"""
+        return {v: int(p.shape[0]) for v, p in self.postings[field].items()}
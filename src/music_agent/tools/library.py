@@ -1,32 +1,160 @@
 from __future__ import annotations
-from typing import List, Dict, Any
-import json
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional
+import contextlib
+import copy
+import os
+import threading
+import time
+import uuid
+import weakref
 from pathlib import Path
 
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy import sparse
 
 from src.music_agent.state import Song
+from src.music_agent.tools.catalog_stream import LoadProgress, iter_song_chunks
+from src.music_agent.tools.inverted_index import CatalogIndex
+from src.music_agent.tools.song_table import SongTable
+from src.music_agent.tools.tfidf_store import fit_or_load, text_backend_name, vectorizer_nbytes
+from src.music_agent.tools.vector_index import make_vector_index
+
+
+# share of edited documents (or of unknown tokens in them) that triggers a background refit
+REFIT_DRIFT = float(os.getenv("MUSIC_REFIT_DRIFT", "0.1"))
+
+
+class CatalogSnapshot:
+    """One published version of the catalog: songs, text features and indexes that belong together
+
+    Nothing in a snapshot changes after it is published (the id -> position
+    map is only filled in on first use), so readers take a reference to the
+    current snapshot and need no lock; edits build the next one and swap it in.
+    """
+
+    def __init__(self, songs, index, corpus, tfidf, matrix, vector_index, version: int,
+                 positions: Dict[str, int] | None = None):
+        self.songs = songs
+        self.index = index
+        self.corpus = corpus
+        self.tfidf = tfidf
+        self.matrix = matrix
+        self.vector_index = vector_index
+        self.version = version
+        self._positions = positions
+
+    def replace(self, **changes) -> "CatalogSnapshot":
+        """The next version, with the given parts changed"""
+        fields = dict(songs=self.songs, index=self.index, corpus=self.corpus, tfidf=self.tfidf,
+                      matrix=self.matrix, vector_index=self.vector_index, version=self.version + 1)
+        if "songs" not in changes:
+            fields["positions"] = self._positions
+        fields.update(changes)
+        return CatalogSnapshot(**fields)
+
+    def positions(self) -> Dict[str, int]:
+        if self._positions is None:
+            ids = self.songs.strings["id"].to_list() if isinstance(self.songs, SongTable) else (s.id for s in self.songs)
+            self._positions = {song_id: i for i, song_id in enumerate(ids)}
+        return self._positions
 
 
 class MusicLibrary:
-    def __init__(self, data_path: Path):
+    def __init__(self,
+                 data_path: Path,
+                 vector_index: str | None = None,
+                 song_store: str | None = None,
+                 text_backend: str | None = None):
         self.data_path = data_path
-        self.songs: List[Song] = []
-        self._tfidf = None
-        self._matrix = None
-        self._corpus: List[str] = []
+        self.text_backend = text_backend_name(text_backend)
+        # "models" keeps a Song per track; "table" keeps a columnar SongTable of SongView rows
+        self.song_store = (song_store or os.getenv("MUSIC_SONG_STORE", "models")).lower()
+        self.vector_backend = vector_index
+        self._catalog = CatalogSnapshot([], None, [], None, None, None, version=0)
+        # serializes edits and refits; reads use the published snapshot instead
+        self._edit_lock = threading.RLock()
+        self._fitted_docs = 0
+        self._edited_docs = 0
+        self._edit_tokens = 0
+        self._oov_tokens = 0
+        self._refit_thread: threading.Thread | None = None
+        self._query_count = 0
+        self._query_seconds = 0.0
+        self._query_max_seconds = 0.0
+        # graph state refers to the library by this handle instead of carrying its songs
+        self.handle = register_library(self)
+
+    def load(self, progress: Optional[Callable[[LoadProgress], None]] = None) -> int:
+        """Stream songs.json (or a .jsonl catalog) in validated chunks; progress is called per chunk"""
+        corpus: List[str] = []
+
+        def stream() -> Iterator[Song]:
+            for chunk in iter_song_chunks(self.data_path, progress=progress):
+                corpus.extend(self._song_text(s) for s in chunk)
+                yield from chunk
+
+        songs = SongTable(stream()) if self.song_store == "table" else list(stream())
+        index, features = CatalogIndex(songs), self._fit_text_features(corpus)
+        with self._edit_lock:
+            self._publish(songs=songs, index=index, **features)
+        return len(songs)
+
+    def _fit_text_features(self, corpus: List[str], persist: bool = True) -> Dict[str, Any]:
+        # refits of an edited catalog are not persisted: the artifact would not match songs.json
+        tfidf, matrix = fit_or_load(self.data_path if persist else None, corpus, self.text_backend)
+        vector_index = make_vector_index(self.vector_backend).build(matrix)
+        return dict(corpus=corpus, tfidf=tfidf, matrix=matrix, vector_index=vector_index)
+
+    def _publish(self, **changes):
+        """Swap in the next catalog snapshot; callers hold _edit_lock"""
+        if "tfidf" in changes:
+            self._fitted_docs = len(changes["corpus"])
+            self._edited_docs = self._edit_tokens = self._oov_tokens = 0
+        self._catalog = self._catalog.replace(**changes)
+
+    def _read_lock(self):
+        """Held around reads; published snapshots need none"""
+        return contextlib.nullcontext()
+
+    @property
+    def songs(self) -> List[Song]:
+        return self._catalog.songs
+
+    @property
+    def index(self) -> CatalogIndex | None:
+        return self._catalog.index
 
-    def load(self) -> int:
-        with open(self.data_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        self.songs = [Song(**d) for d in data]
+    @property
+    def vector_index(self):
+        return self._catalog.vector_index
 
-        self._corpus = [self._song_text(s) for s in self.songs]
-        self._tfidf = TfidfVectorizer(stop_words="english")
-        self._matrix = self._tfidf.fit_transform(self._corpus)
-        return len(self.songs)
+    @property
+    def catalog_version(self) -> int:
+        """Bumped whenever an edit or refit publishes new catalog contents"""
+        return self._catalog.version
+
+    def catalog_key(self) -> str:
+        """Identifies the catalog contents across processes: source file stamp plus in-process edits"""
+        path = Path(self.data_path) if self.data_path else None
+        mtime, size = _catalog_stamp(path) if path is not None and path.exists() else (0, 0)
+        return f"{path}:{mtime}:{size}:{self.catalog_version}"
+
+    def _positions_of(self, ids: List[str], catalog: CatalogSnapshot | None = None) -> List[int]:
+        positions = (catalog or self._catalog).positions()
+        return [positions[i] for i in ids if i in positions]
+
+    def songs_by_id(self, ids: List[str]) -> List[Song]:
+        """Catalog songs for the given ids, skipping unknown ones"""
+        with self._read_lock():
+            catalog = self._catalog
+            return [catalog.songs[i] for i in self._positions_of(ids, catalog)]
+
+    def songs_at(self, positions) -> List[Song]:
+        """Song models for catalog positions, safe to keep in state, results and prompts"""
+        songs = self.songs
+        if isinstance(songs, SongTable):
+            return songs.materialize(positions)
+        return [songs[int(i)] for i in positions]
 
     def _song_text(self, s: Song) -> str:
         parts = [
@@ -43,13 +171,24 @@ class MusicLibrary:
     def as_dicts(self, xs: List[Song]) -> List[Dict[str, Any]]:
         return [x.model_dump() for x in xs]
 
-    def search(self, query: str, k: int = 10) -> List[Song]:
+    def _search_positions(self, catalog: CatalogSnapshot, query: str, k: int) -> np.ndarray:
         if not query:
-            return []
-        q_vec = self._tfidf.transform([query])
-        sims = cosine_similarity(q_vec, self._matrix).flatten()
-        top_idx = np.argsort(-sims)[:k]
-        return [self.songs[i] for i in top_idx]
+            return np.empty(0, dtype=np.int64)
+        start = time.perf_counter()
+        q_vec = catalog.tfidf.transform([query])
+        top_idx, _ = catalog.vector_index.query(q_vec, k)
+        self._record_query(time.perf_counter() - start)
+        return top_idx
+
+    def search_positions(self, query: str, k: int = 10) -> np.ndarray:
+        """Catalog positions of the top-k search() hits"""
+        with self._read_lock():
+            return self._search_positions(self._catalog, query, k)
+
+    def search(self, query: str, k: int = 10) -> List[Song]:
+        with self._read_lock():
+            catalog = self._catalog
+            return [catalog.songs[i] for i in self._search_positions(catalog, query, k)]
 
     def filter(self,
                *,
@@ -59,43 +198,310 @@ class MusicLibrary:
                moods: List[str] | None = None,
                min_year: int | None = None,
                max_year: int | None = None) -> List[Song]:
-        def ok(s: Song) -> bool:
-            if genres and not any(g in s.genres for g in genres):
-                return False
-            if artists and s.artist not in artists:
-                return False
-            if tags and not any(t in s.tags for t in tags):
-                return False
-            if moods and (s.mood not in moods):
-                return False
-            if min_year and (s.year or 0) < min_year:
-                return False
-            if max_year and (s.year or 9999) > max_year:
-                return False
-            return True
-
-        return [s for s in self.songs if ok(s)]
+        catalog = self._catalog
+        positions = catalog.index.filter_positions(
+            genres=genres,
+            artists=artists,
+            tags=tags,
+            moods=moods,
+            min_year=min_year,
+            max_year=max_year,
+        )
+        return [catalog.songs[i] for i in positions]
 
-    def similarity(self, seeds: List[Song], k: int = 10) -> List[Song]:
+    def filter_positions(self, **filters) -> np.ndarray:
+        """Sorted catalog positions matching filter(), without materializing songs"""
+        return self._catalog.index.filter_positions(**filters)
+
+    def facets(self, field: str) -> Dict[str, int]:
+        """Distinct genres/tags/moods/artists with track counts, for UI filter lists"""
+        return self._catalog.index.facet_counts(field)
+
+    def filter_ids(self, **filters) -> List[str]:
+        return [s.id for s in self.filter(**filters)]
+
+    def _similarity_positions(self, catalog: CatalogSnapshot, seeds: List[Song], k: int) -> np.ndarray:
         if not seeds:
-            return []
+            return np.empty(0, dtype=np.int64)
+        start = time.perf_counter()
         seed_texts = [self._song_text(s) for s in seeds]
-        seed_vec = self._tfidf.transform([" \n".join(seed_texts)])
-        sims = cosine_similarity(seed_vec, self._matrix).flatten()
-        seed_ids = {s.id for s in seeds}
-        order = np.argsort(-sims)
-        result = []
-        for i in order:
-            if self.songs[i].id in seed_ids:
-                continue
-            result.append(self.songs[i])
-            if len(result) >= k:
-                break
-        return result
+        seed_vec = catalog.tfidf.transform([" \n".join(seed_texts)])
+        seed_positions = self._positions_of(list({s.id for s in seeds}), catalog)
+        top_idx, _ = catalog.vector_index.query(seed_vec, k, exclude=seed_positions)
+        self._record_query(time.perf_counter() - start)
+        return top_idx
+
+    def similarity_positions(self, seeds: List[Song], k: int = 10) -> np.ndarray:
+        """Catalog positions of the top-k similarity() hits, seeds excluded"""
+        with self._read_lock():
+            return self._similarity_positions(self._catalog, seeds, k)
+
+    def similarity(self, seeds: List[Song], k: int = 10) -> List[Song]:
+        with self._read_lock():
+            catalog = self._catalog
+            return [catalog.songs[i] for i in self._similarity_positions(catalog, seeds, k)]
+
+    def search_many(self, queries: List[str], k: int = 10) -> tuple[List[List[str]], List[List[float]]]:
+        """Batched search(): one transform and blocked sparse products; returns ids and cosine scores per query"""
+        ids: List[List[str]] = [[] for _ in queries]
+        scores: List[List[float]] = [[] for _ in queries]
+        rows = [i for i, q in enumerate(queries) if q]
+        if not rows:
+            return ids, scores
+        with self._read_lock():
+            catalog = self._catalog
+            q_vecs = catalog.tfidf.transform([queries[i] for i in rows])
+            for i, (top_idx, top_scores) in zip(rows, catalog.vector_index.query_many(q_vecs, k)):
+                ids[i] = [catalog.songs[j].id for j in top_idx]
+                scores[i] = top_scores.tolist()
+        return ids, scores
+
+    def similarity_many(self, seed_sets: List[List[Song]], k: int = 10) -> tuple[List[List[str]], List[List[float]]]:
+        """Batched similarity(); each seed set is excluded from its own results"""
+        ids: List[List[str]] = [[] for _ in seed_sets]
+        scores: List[List[float]] = [[] for _ in seed_sets]
+        rows = [i for i, seeds in enumerate(seed_sets) if seeds]
+        if not rows:
+            return ids, scores
+        texts = [" \n".join(self._song_text(s) for s in seed_sets[i]) for i in rows]
+        with self._read_lock():
+            catalog = self._catalog
+            seed_vecs = catalog.tfidf.transform(texts)
+            excludes = [self._positions_of(list({s.id for s in seed_sets[i]}), catalog) for i in rows]
+            results = catalog.vector_index.query_many(seed_vecs, k, excludes=excludes)
+            for i, (top_idx, top_scores) in zip(rows, results):
+                ids[i] = [catalog.songs[j].id for j in top_idx]
+                scores[i] = top_scores.tolist()
+        return ids, scores
+
+    def _record_query(self, seconds: float):
+        self._query_count += 1
+        self._query_seconds += seconds
+        self._query_max_seconds = max(self._query_max_seconds, seconds)
+
+    def text_stats(self) -> Dict[str, Any]:
+        """Memory footprint of the text features and search/similarity latency for this backend"""
+        catalog = self._catalog
+        matrix = catalog.matrix
+        matrix_bytes = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+        return {
+            "backend": self.text_backend,
+            "vector_index": catalog.vector_index.name,
+            "n_features": matrix.shape[1],
+            "nnz": int(matrix.nnz),
+            "matrix_bytes": int(matrix_bytes),
+            "vectorizer_bytes": int(vectorizer_nbytes(catalog.tfidf)),
+            "queries": self._query_count,
+            "mean_query_ms": 1000 * self._query_seconds / max(1, self._query_count),
+            "max_query_ms": 1000 * self._query_max_seconds,
+        }
+
+    def _reindexed(self, matrix):
+        # update() rebuilds in place, so it runs on a copy that readers of the old snapshot never see
+        return copy.copy(self._catalog.vector_index).update(matrix)
+
+    def _track_drift(self, texts: List[str]):
+        analyze = self._catalog.tfidf.build_analyzer()
+        # the hashing backend has no vocabulary, so every token is representable
+        vocabulary = getattr(self._catalog.tfidf, "vocabulary_", None)
+        for text in texts:
+            tokens = analyze(text)
+            self._edit_tokens += len(tokens)
+            if vocabulary is not None:
+                self._oov_tokens += sum(1 for t in tokens if t not in vocabulary)
+        self._edited_docs += len(texts)
+
+    def drift(self) -> Dict[str, float]:
+        """How far the fitted vocabulary/IDF lag behind catalog edits since the last fit"""
+        with self._edit_lock:
+            return {
+                "edited_docs": self._edited_docs,
+                "edited_ratio": self._edited_docs / max(1, self._fitted_docs),
+                "oov_ratio": self._oov_tokens / max(1, self._edit_tokens),
+            }
+
+    def _after_edit(self, texts: List[str]):
+        self._track_drift(texts)
+        stats = self.drift()
+        if max(stats["edited_ratio"], stats["oov_ratio"]) > REFIT_DRIFT:
+            self.refit(background=True)
+
+    def add_songs(self, songs: Iterable[Song | dict]) -> int:
+        """Append tracks, vectorized with the current vocabulary; unknown terms count towards drift"""
+        songs = [s if isinstance(s, Song) else Song(**s) for s in songs]
+        if not songs:
+            return 0
+        texts = [self._song_text(s) for s in songs]
+        with self._edit_lock:
+            catalog = self._catalog
+            positions = catalog.positions()
+            duplicates = {s.id for s in songs if s.id in positions}
+            if duplicates or len({s.id for s in songs}) != len(songs):
+                raise ValueError(f"Songs already in the library: {sorted(duplicates) or 'duplicate ids in batch'}")
+            matrix = sparse.vstack([catalog.matrix, catalog.tfidf.transform(texts)], format="csr")
+            if isinstance(catalog.songs, SongTable):
+                new_songs = SongTable.concat([catalog.songs, SongTable(songs)])
+            else:
+                new_songs = catalog.songs + songs
+            positions = dict(positions)
+            positions.update((s.id, len(catalog.songs) + i) for i, s in enumerate(songs))
+            self._publish(
+                songs=new_songs,
+                positions=positions,
+                index=catalog.index.appended(songs),
+                corpus=catalog.corpus + texts,
+                matrix=matrix,
+                vector_index=self._reindexed(matrix),
+            )
+            self._after_edit(texts)
+        return len(songs)
+
+    def update_song(self, song: Song | dict):
+        """Replace the track with the same id in place (same catalog position)"""
+        song = song if isinstance(song, Song) else Song(**song)
+        text = self._song_text(song)
+        with self._edit_lock:
+            catalog = self._catalog
+            pos = self._positions_of([song.id], catalog)
+            if not pos:
+                raise KeyError(song.id)
+            pos = pos[0]
+            if isinstance(catalog.songs, SongTable):
+                n = len(catalog.songs)
+                new_songs = SongTable.concat([
+                    catalog.songs.take(np.arange(pos)), SongTable([song]), catalog.songs.take(np.arange(pos + 1, n)),
+                ])
+            else:
+                new_songs = list(catalog.songs)
+                new_songs[pos] = song
+            corpus = list(catalog.corpus)
+            corpus[pos] = text
+            matrix = sparse.vstack(
+                [catalog.matrix[:pos], catalog.tfidf.transform([text]), catalog.matrix[pos + 1:]], format="csr"
+            )
+            self._publish(
+                songs=new_songs,
+                # same id at the same position
+                positions=catalog.positions(),
+                index=catalog.index.replaced(pos, catalog.songs[pos], song),
+                corpus=corpus,
+                matrix=matrix,
+                vector_index=self._reindexed(matrix),
+            )
+            self._after_edit([text])
+
+    def remove_songs(self, ids: Iterable[str]) -> int:
+        """Drop tracks by id; unknown ids are ignored. Returns how many were removed"""
+        with self._edit_lock:
+            catalog = self._catalog
+            removed = np.array(sorted(set(self._positions_of(list(set(ids)), catalog))), dtype=np.int64)
+            if not removed.size:
+                return 0
+            mask = np.ones(len(catalog.songs), dtype=np.bool_)
+            mask[removed] = False
+            keep = np.flatnonzero(mask)
+            if isinstance(catalog.songs, SongTable):
+                new_songs = catalog.songs.take(keep)
+            else:
+                new_songs = [catalog.songs[i] for i in keep]
+            matrix = catalog.matrix[keep]
+            self._publish(
+                songs=new_songs,
+                index=catalog.index.without(removed),
+                corpus=[catalog.corpus[i] for i in keep],
+                matrix=matrix,
+                vector_index=self._reindexed(matrix),
+            )
+            self._edited_docs += len(removed)
+            if self._edited_docs / max(1, self._fitted_docs) > REFIT_DRIFT:
+                self.refit(background=True)
+        return len(removed)
+
+    def refit(self, background: bool = False):
+        """Refit TF-IDF and rebuild the vector index from the current corpus
+
+        In the background the fit runs on a snapshot and is only swapped in
+        if no edit landed meanwhile; otherwise it starts over on the newer corpus.
+        """
+        if not background:
+            with self._edit_lock:
+                self._publish(**self._fit_text_features(list(self._catalog.corpus), persist=False))
+            return
+        with self._edit_lock:
+            if self._refit_thread is not None and self._refit_thread.is_alive():
+                return
+            self._refit_thread = threading.Thread(target=self._background_refit, daemon=True)
+            self._refit_thread.start()
+
+    def _background_refit(self):
+        while True:
+            catalog = self._catalog
+            features = self._fit_text_features(list(catalog.corpus), persist=False)
+            with self._edit_lock:
+                if self._catalog is catalog:
+                    self._publish(**features)
+                    return
+
+    def wait_for_refit(self, timeout: float | None = None):
+        thread = self._refit_thread
+        if thread is not None:
+            thread.join(timeout)
+
+
+_libraries: "weakref.WeakValueDictionary[str, MusicLibrary]" = weakref.WeakValueDictionary()
+
+
+def register_library(lib: MusicLibrary) -> str:
+    """Handle for a library, resolvable with resolve_library() while the library is alive"""
+    handle = f"library-{uuid.uuid4().hex[:12]}"
+    _libraries[handle] = lib
+    return handle
+
+
+def resolve_library(handle: str) -> MusicLibrary:
+    lib = _libraries.get(handle)
+    if lib is None:
+        raise KeyError(f"Unknown library handle: {handle}")
+    return lib
+
+
+DEFAULT_DATA_PATH = Path(__file__).parents[1] / "data" / "songs.json"
 
 
 def load_default_library() -> MusicLibrary:
-    data_path = Path(__file__).parents[1] / "data" / "songs.json"
-    lib = MusicLibrary(data_path)
+    if os.getenv("MUSIC_CATALOG_BACKEND", "json").lower() == "sqlite":
+        from src.music_agent.tools.catalog_db import SQLiteMusicLibrary
+        lib = SQLiteMusicLibrary(DEFAULT_DATA_PATH)
+    else:
+        lib = MusicLibrary(DEFAULT_DATA_PATH)
     lib.load()
     return lib
+
+
+_default_library = None
+_default_library_stamp = None
+_default_library_lock = threading.Lock()
+
+
+def _catalog_stamp(path: Path) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_default_library() -> MusicLibrary:
+    """Process-wide default library, reloaded only when songs.json changes on disk"""
+    global _default_library, _default_library_stamp
+    with _default_library_lock:
+        stamp = _catalog_stamp(DEFAULT_DATA_PATH)
+        if _default_library is None or stamp != _default_library_stamp:
+            _default_library = load_default_library()
+            _default_library_stamp = stamp
+        return _default_library
+
+
+def invalidate_default_library():
+    """Drop the cached default library so the next access reloads songs.json"""
+    global _default_library, _default_library_stamp
+    with _default_library_lock:
+        _default_library = None
+        _default_library_stamp = None
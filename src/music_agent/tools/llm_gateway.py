@@ -0,0 +1,486 @@
+from __future__ import annotations
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import weakref
+from pathlib import Path
+
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_mistralai import ChatMistralAI
+from langgraph.config import get_stream_writer
+
+from src.music_agent.tools.tracing import estimate_tokens, record_llm_call
+
+load_dotenv()
+
+
+DATA_DIR = Path(__file__).parents[1] / "data"
+DEFAULT_MODEL = "mistral:open-mistral-7b"
+
+
+def default_model() -> str:
+    """Model name from DEFAULT_MODEL ("provider:model")"""
+    return os.getenv("DEFAULT_MODEL", DEFAULT_MODEL).split(":", 1)[-1]
+
+
+def require_api_key() -> str:
+    api_key = os.getenv("MISTRAL_API_KEY")
+    if not api_key or api_key == "your-mistral-api-key":
+        raise ValueError(
+            "MISTRAL_API_KEY not set or invalid. "
+            "Get your key from https://console.mistral.ai/ and set it in .env or Streamlit sidebar."
+        )
+    return api_key
+
+
+def _message_pairs(messages) -> List[List[str]]:
+    if isinstance(messages, str):
+        return [["human", messages]]
+    return [[m.type, m.content] if isinstance(m, BaseMessage) else [str(m[0]), str(m[1])] for m in messages]
+
+
+def prompt_key(messages, temperature: float, model: Optional[str], max_tokens: Optional[int]) -> str:
+    """Digest of everything that determines a completion, used to name fixtures"""
+    text = json.dumps({
+        "messages": _message_pairs(messages),
+        "model": model or default_model(),
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }, sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:24]
+
+
+def stream_writer():
+    """LangGraph custom-stream writer for LLM text deltas, a no-op outside a graph run"""
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda chunk: None
+
+
+class LLMFixtureMissing(KeyError):
+    """Replay found no recorded response for a prompt"""
+
+
+class MistralProvider:
+    """Live Mistral chat clients, reused across requests and sessions
+
+    Each ChatMistralAI owns an httpx connection pool, so building one per call
+    paid for new SSL contexts and a fresh TLS handshake every time. Clients
+    are kept per (API key, model, temperature, max_tokens). The blocking path
+    shares one client between threads, which httpx allows. httpx async
+    clients are bound to the event loop that first used them, so the async
+    path keeps a separate set per running loop, released with the loop.
+    """
+
+    name = "mistral"
+
+    def __init__(self):
+        self._clients: Dict[tuple, ChatMistralAI] = {}
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, ChatMistralAI]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._stats = {"clients": 0, "async_clients": 0}
+
+    def _key(self, temperature: float, model: Optional[str], max_tokens: Optional[int]) -> tuple:
+        return (require_api_key(), model or default_model(), temperature, max_tokens)
+
+    def _build(self, key: tuple) -> ChatMistralAI:
+        api_key, model, temperature, max_tokens = key
+        kwargs: Dict[str, Any] = {"api_key": api_key, "model": model, "temperature": temperature}
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        return ChatMistralAI(**kwargs)
+
+    def client(self, temperature: float = 0.2, model: Optional[str] = None, max_tokens: Optional[int] = None) -> ChatMistralAI:
+        """Pooled client for blocking calls"""
+        key = self._key(temperature, model, max_tokens)
+        with self._lock:
+            llm = self._clients.get(key)
+            if llm is None:
+                llm = self._clients[key] = self._build(key)
+                self._stats["clients"] += 1
+            return llm
+
+    def async_client(self, temperature: float = 0.2, model: Optional[str] = None, max_tokens: Optional[int] = None) -> ChatMistralAI:
+        """Pooled client for the running event loop"""
+        key = self._key(temperature, model, max_tokens)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            llm = clients.get(key)
+            if llm is None:
+                llm = clients[key] = self._build(key)
+                self._stats["async_clients"] += 1
+            return llm
+
+    def invoke(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]):
+        return self.client(temperature, model, max_tokens).invoke(messages)
+
+    async def ainvoke(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]):
+        return await self.async_client(temperature, model, max_tokens).ainvoke(messages)
+
+    def stream(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]) -> Iterator[AIMessageChunk]:
+        yield from self.client(temperature, model, max_tokens).stream(messages)
+
+    async def astream(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]) -> AsyncIterator[AIMessageChunk]:
+        async for chunk in self.async_client(temperature, model, max_tokens).astream(messages):
+            yield chunk
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+            self._async_clients.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "pooled": len(self._clients), "event_loops": len(self._async_clients)}
+
+
+def stand_in_reply(messages) -> str:
+    """Deterministic canned completion: "{}" when the prompt asks for JSON, else a titled line"""
+    pairs = _message_pairs(messages)
+    if any("JSON" in content for _, content in pairs):
+        return "{}"
+    digest = hashlib.sha256(json.dumps(pairs).encode("utf-8")).hexdigest()[:6]
+    return f"Title: Stand-in Mix {digest}\nDescription: Offline response {digest} from the fake LLM provider."
+
+
+def split_chunks(content: str) -> List[str]:
+    """Word-sized pieces, the way a completion arrives when streamed"""
+    return re.findall(r"\s*\S+\s*", content) or [content]
+
+
+def _paced(content: str, first_s: float, token_s: float) -> Iterator[AIMessageChunk]:
+    for i, chunk in enumerate(split_chunks(content)):
+        time.sleep(first_s if i == 0 else token_s)
+        yield AIMessageChunk(content=chunk)
+
+
+async def _apaced(content: str, first_s: float, token_s: float) -> AsyncIterator[AIMessageChunk]:
+    for i, chunk in enumerate(split_chunks(content)):
+        await asyncio.sleep(first_s if i == 0 else token_s)
+        yield AIMessageChunk(content=chunk)
+
+
+def _total_delay(content: str, first_s: float, token_s: float) -> float:
+    return first_s + token_s * (len(split_chunks(content)) - 1)
+
+
+class FakeProvider:
+    """Offline stand-in that answers after a configurable delay
+
+    The first word arrives after latency_ms plus up to jitter_ms derived from
+    the prompt digest, so repeated runs see the same latencies; each further
+    word takes token_ms. A blocking call waits for the whole reply. Sleeping
+    (not spinning) matches a network wait: other threads and coroutines keep
+    running.
+    """
+
+    name = "fake"
+
+    def __init__(self,
+                 latency_ms: float = 300.0,
+                 jitter_ms: float = 0.0,
+                 reply: Callable[[Any], str] = stand_in_reply,
+                 token_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.reply = reply
+        self.token_ms = token_ms
+
+    def delay(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]) -> float:
+        jitter = 0.0
+        if self.jitter_ms > 0:
+            jitter = int(prompt_key(messages, temperature, model, max_tokens)[:8], 16) / 0xFFFFFFFF * self.jitter_ms
+        return (self.latency_ms + jitter) / 1000
+
+    def invoke(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]):
+        content = self.reply(messages)
+        time.sleep(_total_delay(content, self.delay(messages, temperature, model, max_tokens), self.token_ms / 1000))
+        return AIMessage(content=content)
+
+    async def ainvoke(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]):
+        content = self.reply(messages)
+        await asyncio.sleep(_total_delay(content, self.delay(messages, temperature, model, max_tokens), self.token_ms / 1000))
+        return AIMessage(content=content)
+
+    def stream(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]) -> Iterator[AIMessageChunk]:
+        first_s = self.delay(messages, temperature, model, max_tokens)
+        yield from _paced(self.reply(messages), first_s, self.token_ms / 1000)
+
+    async def astream(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]) -> AsyncIterator[AIMessageChunk]:
+        first_s = self.delay(messages, temperature, model, max_tokens)
+        async for chunk in _apaced(self.reply(messages), first_s, self.token_ms / 1000):
+            yield chunk
+
+
+class FixtureStore:
+    """Recorded completions as JSON lines: key, model, a prompt preview and the content"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, str] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry["content"]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._entries.get(key)
+
+    def put(self, key: str, content: str, model: Optional[str], messages):
+        with self._lock:
+            if self._entries.get(key) == content:
+                return
+            self._entries[key] = content
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            preview = _message_pairs(messages)[-1][1][:120]
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "model": model or default_model(), "prompt": preview, "content": content}) + "\n")
+
+
+class ReplayProvider:
+    """Serves recorded completions; a prompt that was never recorded raises LLMFixtureMissing
+
+    Agents treat that like any other LLM failure and take their heuristic or
+    template fallback, so a partial fixture set still runs end to end.
+    """
+
+    name = "replay"
+
+    def __init__(self, fixtures: FixtureStore, latency_ms: float = 0.0, token_ms: float = 0.0):
+        self.fixtures = fixtures
+        self.latency_ms = latency_ms
+        self.token_ms = token_ms
+
+    def _content(self, messages, temperature, model, max_tokens) -> str:
+        content = self.fixtures.get(prompt_key(messages, temperature, model, max_tokens))
+        if content is None:
+            raise LLMFixtureMissing(f"No recorded LLM response for this prompt in {self.fixtures.path}")
+        return content
+
+    def invoke(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]):
+        content = self._content(messages, temperature, model, max_tokens)
+        time.sleep(_total_delay(content, self.latency_ms / 1000, self.token_ms / 1000))
+        return AIMessage(content=content)
+
+    async def ainvoke(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]):
+        content = self._content(messages, temperature, model, max_tokens)
+        await asyncio.sleep(_total_delay(content, self.latency_ms / 1000, self.token_ms / 1000))
+        return AIMessage(content=content)
+
+    def stream(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]) -> Iterator[AIMessageChunk]:
+        content = self._content(messages, temperature, model, max_tokens)
+        yield from _paced(content, self.latency_ms / 1000, self.token_ms / 1000)
+
+    async def astream(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]) -> AsyncIterator[AIMessageChunk]:
+        content = self._content(messages, temperature, model, max_tokens)
+        async for chunk in _apaced(content, self.latency_ms / 1000, self.token_ms / 1000):
+            yield chunk
+
+
+class RecordingProvider:
+    """Passes calls to another provider and saves each completion as a fixture"""
+
+    name = "record"
+
+    def __init__(self, inner, fixtures: FixtureStore):
+        self.inner = inner
+        self.fixtures = fixtures
+
+    def invoke(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]):
+        resp = self.inner.invoke(messages, temperature, model, max_tokens)
+        self.fixtures.put(prompt_key(messages, temperature, model, max_tokens), resp.content, model, messages)
+        return resp
+
+    async def ainvoke(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]):
+        resp = await self.inner.ainvoke(messages, temperature, model, max_tokens)
+        self.fixtures.put(prompt_key(messages, temperature, model, max_tokens), resp.content, model, messages)
+        return resp
+
+    def stream(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]) -> Iterator[AIMessageChunk]:
+        chunks = []
+        for chunk in self.inner.stream(messages, temperature, model, max_tokens):
+            chunks.append(str(chunk.content))
+            yield chunk
+        self.fixtures.put(prompt_key(messages, temperature, model, max_tokens), "".join(chunks), model, messages)
+
+    async def astream(self, messages, temperature: float, model: Optional[str], max_tokens: Optional[int]) -> AsyncIterator[AIMessageChunk]:
+        chunks = []
+        async for chunk in self.inner.astream(messages, temperature, model, max_tokens):
+            chunks.append(str(chunk.content))
+            yield chunk
+        self.fixtures.put(prompt_key(messages, temperature, model, max_tokens), "".join(chunks), model, messages)
+
+
+LLM_PROVIDERS = ("mistral", "fake", "replay", "record")
+
+
+def make_provider(name: str | None = None):
+    """Provider from MUSIC_LLM_PROVIDER: mistral (default), fake, replay or record
+
+    fake sleeps MUSIC_LLM_LATENCY_MS (+ up to MUSIC_LLM_JITTER_MS) before the
+    first word and MUSIC_LLM_TOKEN_MS per further word; replay and record use
+    the fixtures in MUSIC_LLM_FIXTURES (data/llm_fixtures.jsonl); record wraps
+    the live provider, or the fake one with MUSIC_LLM_RECORD_FROM=fake.
+    """
+    name = (name or os.getenv("MUSIC_LLM_PROVIDER", "mistral")).lower()
+    if name not in LLM_PROVIDERS:
+        raise ValueError(f"Unknown LLM provider: {name}")
+    if name == "mistral":
+        return MistralProvider()
+    if name == "fake":
+        return FakeProvider(
+            latency_ms=float(os.getenv("MUSIC_LLM_LATENCY_MS", "300")),
+            jitter_ms=float(os.getenv("MUSIC_LLM_JITTER_MS", "0")),
+            token_ms=float(os.getenv("MUSIC_LLM_TOKEN_MS", "0")),
+        )
+    fixtures = FixtureStore(Path(os.getenv("MUSIC_LLM_FIXTURES", str(DATA_DIR / "llm_fixtures.jsonl"))))
+    if name == "replay":
+        return ReplayProvider(
+            fixtures,
+            latency_ms=float(os.getenv("MUSIC_LLM_LATENCY_MS", "0")),
+            token_ms=float(os.getenv("MUSIC_LLM_TOKEN_MS", "0")),
+        )
+    return RecordingProvider(make_provider(os.getenv("MUSIC_LLM_RECORD_FROM", "mistral")), fixtures)
+
+
+class _CallMeter:
+    """Latency and token usage of one gateway call, charged to the running graph node"""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.start = time.perf_counter()
+        self.usage = None
+        self.text = []
+
+    def add(self, chunk) -> str:
+        if getattr(chunk, "usage_metadata", None):
+            self.usage = chunk.usage_metadata
+        text = str(chunk.content) if chunk.content else ""
+        self.text.append(text)
+        return text
+
+    def done(self, error: bool = False):
+        ms = (time.perf_counter() - self.start) * 1000
+        if self.usage:
+            record_llm_call(ms, self.usage.get("input_tokens", 0), self.usage.get("output_tokens", 0), False, error)
+        else:
+            prompt = " ".join(content for _, content in _message_pairs(self.messages))
+            record_llm_call(ms, estimate_tokens(prompt), estimate_tokens("".join(self.text)), True, error)
+
+
+class LLMGateway:
+    """Single entry point for agent LLM calls, in front of a swappable provider
+
+    Every call is timed and its token usage (reported by the provider, or
+    estimated) is charged to the graph node making it; see tools/tracing.py.
+    """
+
+    def __init__(self, provider=None):
+        self.provider = provider if provider is not None else make_provider()
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "async_calls": 0, "errors": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def invoke(self, messages, temperature: float = 0.2, model: Optional[str] = None, max_tokens: Optional[int] = None):
+        self._count("calls")
+        meter = _CallMeter(messages)
+        try:
+            resp = self.provider.invoke(messages, temperature, model, max_tokens)
+        except Exception:
+            self._count("errors")
+            meter.done(error=True)
+            raise
+        meter.add(resp)
+        meter.done()
+        return resp
+
+    async def ainvoke(self, messages, temperature: float = 0.2, model: Optional[str] = None, max_tokens: Optional[int] = None):
+        self._count("async_calls")
+        meter = _CallMeter(messages)
+        try:
+            resp = await self.provider.ainvoke(messages, temperature, model, max_tokens)
+        except Exception:
+            self._count("errors")
+            meter.done(error=True)
+            raise
+        meter.add(resp)
+        meter.done()
+        return resp
+
+    def stream(self, messages, temperature: float = 0.2, model: Optional[str] = None,
+               max_tokens: Optional[int] = None) -> Iterator[str]:
+        """Completion text in pieces as the provider produces them"""
+        self._count("calls")
+        meter = _CallMeter(messages)
+        try:
+            for chunk in self.provider.stream(messages, temperature, model, max_tokens):
+                text = meter.add(chunk)
+                if text:
+                    yield text
+        except Exception:
+            self._count("errors")
+            meter.done(error=True)
+            raise
+        meter.done()
+
+    async def astream(self, messages, temperature: float = 0.2, model: Optional[str] = None,
+                      max_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        self._count("async_calls")
+        meter = _CallMeter(messages)
+        try:
+            async for chunk in self.provider.astream(messages, temperature, model, max_tokens):
+                text = meter.add(chunk)
+                if text:
+                    yield text
+        except Exception:
+            self._count("errors")
+            meter.done(error=True)
+            raise
+        meter.done()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {**self._stats, "provider": self.provider.name}
+        if hasattr(self.provider, "stats"):
+            stats.update(self.provider.stats())
+        return stats
+
+
+_global_gateway = None
+_global_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Process-wide gateway shared by all agents"""
+    global _global_gateway
+    with _global_gateway_lock:
+        if _global_gateway is None:
+            _global_gateway = LLMGateway()
+        return _global_gateway
+
+
+def set_llm_provider(provider) -> LLMGateway:
+    """Swap the provider behind the shared gateway, e.g. a FakeProvider in a benchmark"""
+    global _global_gateway
+    with _global_gateway_lock:
+        _global_gateway = LLMGateway(provider)
+        return _global_gateway
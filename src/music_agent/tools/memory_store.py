@@ -0,0 +1,195 @@
+from __future__ import annotations
+from typing import Dict, Optional
+import atexit
+import copy
+import json
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+
+DATA_DIR = Path(__file__).parents[1] / "data"
+USER_PREFS_FILE = DATA_DIR / "user_prefs.json"
+DEFAULT_USER_ID = "default_user"
+
+
+def empty_memory() -> dict:
+    return {
+        "liked_songs": [],
+        "disliked_songs": [],
+        "preferred_genres": [],
+        "preferred_moods": [],
+        "preferred_artists": [],
+        "listening_history": []
+    }
+
+
+class JsonDirBackend:
+    """One JSON file per user; the default user keeps the original user_prefs.json"""
+
+    def __init__(self, directory: Path = DATA_DIR / "users", default_user_file: Path = USER_PREFS_FILE):
+        self.directory = Path(directory)
+        self.default_user_file = Path(default_user_file)
+
+    def _path(self, user_id: str) -> Path:
+        if user_id == DEFAULT_USER_ID:
+            return self.default_user_file
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", user_id)
+        return self.directory / f"{safe_id}.json"
+
+    def load(self, user_id: str) -> Optional[dict]:
+        path = self._path(user_id)
+        if not path.exists():
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def save_many(self, memories: Dict[str, dict]):
+        for user_id, memory in memories.items():
+            path = self._path(user_id)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(memory, f, indent=2)
+            os.replace(tmp_path, path)
+
+
+class SQLiteBackend:
+    """All user profiles in a single SQLite table, one JSON document per user"""
+
+    def __init__(self, db_path: Path = DATA_DIR / "user_memory.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS user_memory ("
+                "user_id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+            )
+
+    def load(self, user_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM user_memory WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_many(self, memories: Dict[str, dict]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO user_memory (user_id, data) VALUES (?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data",
+                [(user_id, json.dumps(memory)) for user_id, memory in memories.items()]
+            )
+
+
+class UserMemoryStore:
+    """Per-user memory cache in front of a backend, with write-behind flushing
+
+    Reads are served from the cache after the first load. Writes update the
+    cache immediately and are flushed to the backend in batches, either after
+    flush_interval seconds or once max_pending users are dirty. A
+    flush_interval of 0 writes through on every put. The backend write runs
+    outside the cache lock, so readers never wait on disk or SQLite I/O.
+    """
+
+    def __init__(self, backend, flush_interval: float = 2.0, max_pending: int = 32):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._cache: Dict[str, dict] = {}
+        self._versions: Dict[str, int] = {}
+        self._dirty: set[str] = set()
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+        # one flush at a time, so an older batch never lands after a newer one
+        self._write_lock = threading.Lock()
+
+    def _load(self, user_id: str) -> dict:
+        if user_id not in self._cache:
+            memory = self.backend.load(user_id)
+            self._cache[user_id] = memory if memory is not None else empty_memory()
+            self._versions.setdefault(user_id, 0)
+        return self._cache[user_id]
+
+    def get(self, user_id: str) -> dict:
+        """Snapshot of the user's memory; mutating it does not touch the cache"""
+        with self._lock:
+            return copy.deepcopy(self._load(user_id))
+
+    def version(self, user_id: str) -> int:
+        """Counter bumped on every put, usable as a cache key for derived results"""
+        with self._lock:
+            self._load(user_id)
+            return self._versions[user_id]
+
+    def put(self, user_id: str, memory: dict):
+        with self._lock:
+            self._cache[user_id] = copy.deepcopy(memory)
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._dirty.add(user_id)
+
+            flush_now = self.flush_interval <= 0 or len(self._dirty) >= self.max_pending
+            if not flush_now and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            self.flush()
+
+    def flush(self):
+        """Write all dirty profiles to the backend in one batch"""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                # cached profiles are replaced on put, never mutated, so these can be written unlocked
+                pending = {user_id: self._cache[user_id] for user_id in self._dirty}
+                self._dirty.clear()
+            try:
+                self.backend.save_many(pending)
+            except Exception:
+                with self._lock:
+                    self._dirty.update(pending)
+                raise
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """Drop cached profiles (after flushing) so the next read hits the backend"""
+        self.flush()
+        with self._lock:
+            # a put that landed after the flush stays cached until it is written
+            if user_id is None:
+                for cached in list(self._cache):
+                    if cached not in self._dirty:
+                        del self._cache[cached]
+            elif user_id not in self._dirty:
+                self._cache.pop(user_id, None)
+
+
+def _backend_from_env():
+    backend = os.getenv("USER_MEMORY_BACKEND", "json").lower()
+    if backend == "sqlite":
+        return SQLiteBackend(Path(os.getenv("USER_MEMORY_DB", str(DATA_DIR / "user_memory.db"))))
+    return JsonDirBackend()
+
+
+_global_store = None
+_global_store_lock = threading.Lock()
+
+
+def get_user_memory_store() -> UserMemoryStore:
+    global _global_store
+    with _global_store_lock:
+        if _global_store is None:
+            _global_store = UserMemoryStore(
+                _backend_from_env(),
+                flush_interval=float(os.getenv("USER_MEMORY_FLUSH_SECONDS", "2.0"))
+            )
+            atexit.register(_global_store.flush)
+        return _global_store
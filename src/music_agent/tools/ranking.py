@@ -0,0 +1,64 @@
+from __future__ import annotations
+from typing import Iterator, Sequence
+import heapq
+
+import numpy as np
+
+
+def top_k_indices(scores: Sequence[float] | np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first
+
+    Ties keep their original order, so the result equals
+    sorted(range(n), key=lambda i: scores[i], reverse=True)[:k]
+    without sorting the whole array.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    n = scores.shape[0]
+    k = max(0, min(k, n))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    if k == n:
+        return np.argsort(-scores, kind="stable")
+
+    threshold = np.partition(scores, n - k)[n - k]
+    above = np.flatnonzero(scores > threshold)
+    # fill the remaining slots with the earliest ties at the threshold
+    ties = np.flatnonzero(scores == threshold)[:k - above.shape[0]]
+    selected = np.sort(np.concatenate([above, ties]))
+    return selected[np.argsort(-scores[selected], kind="stable")]
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Row-wise top_k_indices for a 2-D score block, as an (m, k) array
+
+    One argpartition over the whole block; only rows whose k-th score is
+    tied beyond the available slots fall back to top_k_indices, so ties
+    still resolve to the earliest indices.
+    """
+    m, n = scores.shape
+    k = max(0, min(k, n))
+    if k == 0 or m == 0:
+        return np.empty((m, k), dtype=np.int64)
+
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    selected = np.take_along_axis(scores, part, axis=1)
+    threshold = selected.min(axis=1, keepdims=True)
+    # rows with more ties at the threshold than free slots need a stable selection
+    ambiguous = np.flatnonzero((scores >= threshold).sum(axis=1) > k)
+
+    order = np.lexsort((part, -selected), axis=1)
+    top = np.take_along_axis(part, order, axis=1)
+    for r in ambiguous:
+        top[r] = top_k_indices(scores[r], k)
+    return top
+
+
+def iter_ranked_indices(scores: Sequence[float]) -> Iterator[int]:
+    """Lazily yield indices from best to worst score, ties in original order
+
+    Heap-based, so consumers that stop early only pay for what they take.
+    """
+    heap = [(-score, i) for i, score in enumerate(scores)]
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[1]
@@ -4,6 +4,7 @@ import numpy as np
 
 from src.music_agent.state import Song, UserPreferences
 from src.music_agent.tools.library import MusicLibrary
+from src.music_agent.tools.ranking import top_k_indices
 
 
 def score_song(s: Song, prefs: UserPreferences) -> float:
@@ -42,6 +43,5 @@ def recommend_by_prefs(lib: MusicLibrary, prefs: UserPreferences, k: int) -> Lis
     if not candidates:
         candidates = lib.songs
 
-    scored = [(s, score_song(s, prefs)) for s in candidates]
-    scored.sort(key=lambda x: x[1], reverse=True)
-    return [s for s, _ in scored[:k]]
+    scores = [score_song(s, prefs) for s in candidates]
+    return [candidates[i] for i in top_k_indices(scores, k)]
@@ -0,0 +1,195 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import copy
+import hashlib
+import json
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from pydantic import BaseModel
+
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the request"""
+    return re.sub(r"\s+", " ", query or "").strip().rstrip(".!?").strip().lower()
+
+
+def _jsonable(value: Any):
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return repr(value)
+
+
+def fingerprint(value: Any) -> str:
+    """Stable digest of a JSON-like value (dict keys sorted, Pydantic models dumped)"""
+    text = json.dumps(value, sort_keys=True, default=_jsonable)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class DiskTier:
+    """Pickled results in a SQLite table, shared by processes on the same host"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, user_id TEXT NOT NULL, created REAL NOT NULL, data BLOB NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_user ON results (user_id)")
+
+    def get(self, key: str) -> Optional[tuple[float, bytes]]:
+        with self._lock:
+            return self._conn.execute("SELECT created, data FROM results WHERE key = ?", (key,)).fetchone()
+
+    def put(self, key: str, user_id: str, created: float, data: bytes):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, user_id, created, data) VALUES (?, ?, ?, ?)",
+                (key, user_id, created, data)
+            )
+
+    def delete(self, key: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+
+    def delete_user(self, user_id: Optional[str] = None) -> int:
+        with self._lock, self._conn:
+            if user_id is None:
+                return self._conn.execute("DELETE FROM results").rowcount
+            return self._conn.execute("DELETE FROM results WHERE user_id = ?", (user_id,)).rowcount
+
+    def expire(self, before: float):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM results WHERE created < ?", (before,))
+
+
+class ResultCache:
+    """LRU + TTL cache of workflow results, with an optional on-disk tier
+
+    Keys combine the normalized query, user id, override kwargs, a digest of
+    the user's memory and the catalog version, so a changed profile or
+    catalog never serves an old playlist. Results are deep-copied in and out:
+    callers are free to mutate what they get back.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 600.0, disk: Optional[DiskTier] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk = disk
+        self._entries: "OrderedDict[str, tuple[float, str, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0, "invalidated": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def key(self, query: str, user_id: str, overrides: Dict[str, Any], memory: dict, catalog: str) -> str:
+        return fingerprint({
+            "query": normalize_query(query),
+            "user_id": user_id,
+            "overrides": overrides,
+            "memory": fingerprint(memory),
+            "catalog": catalog,
+        })
+
+    def _fresh(self, created: float) -> bool:
+        return self.ttl <= 0 or time.time() - created < self.ttl
+
+    def get(self, key: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._fresh(entry[0]):
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return copy.deepcopy(entry[2])
+                del self._entries[key]
+                self._stats["expired"] += 1
+
+        if self.disk is not None:
+            row = self.disk.get(key)
+            if row is not None and self._fresh(row[0]):
+                result = pickle.loads(row[1])
+                with self._lock:
+                    self._stats["disk_hits"] += 1
+                    self._remember(key, row[0], result.get("user_id", ""), result)
+                return copy.deepcopy(result)
+            if row is not None:
+                self.disk.delete(key)
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def _remember(self, key: str, created: float, user_id: str, result: dict):
+        self._entries[key] = (created, user_id, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def put(self, key: str, user_id: str, result: dict):
+        if not self.enabled:
+            return
+        created = time.time()
+        stored = copy.deepcopy(result)
+        with self._lock:
+            self._remember(key, created, user_id, stored)
+            self._stats["stores"] += 1
+        if self.disk is not None:
+            self.disk.put(key, user_id, created, pickle.dumps(stored, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def invalidate_user(self, user_id: Optional[str] = None) -> int:
+        """Drop one user's results (or all of them), in memory and on disk"""
+        with self._lock:
+            keys = [k for k, entry in self._entries.items() if user_id is None or entry[1] == user_id]
+            for k in keys:
+                del self._entries[k]
+            removed = len(keys)
+        if self.disk is not None:
+            removed += self.disk.delete_user(user_id)
+        with self._lock:
+            self._stats["invalidated"] += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "hit_rate": (self._stats["hits"] + self._stats["disk_hits"]) / max(1, lookups),
+            }
+
+
+_global_cache = None
+_global_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Process-wide cache; MUSIC_RESULT_CACHE_SIZE=0 disables it, MUSIC_RESULT_CACHE_DB adds the disk tier"""
+    global _global_cache
+    with _global_cache_lock:
+        if _global_cache is None:
+            db_path = os.getenv("MUSIC_RESULT_CACHE_DB")
+            _global_cache = ResultCache(
+                max_entries=int(os.getenv("MUSIC_RESULT_CACHE_SIZE", "256")),
+                ttl=float(os.getenv("MUSIC_RESULT_CACHE_TTL", "600")),
+                disk=DiskTier(Path(db_path)) if db_path else None,
+            )
+        return _global_cache
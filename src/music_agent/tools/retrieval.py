@@ -0,0 +1,146 @@
+from __future__ import annotations
+from typing import List
+import os
+
+import numpy as np
+
+from src.music_agent.state import AppState, UserPreferences, SessionContext
+from src.music_agent.tools.features import CatalogFeatures, get_catalog_features
+from src.music_agent.tools.library import MusicLibrary
+from src.music_agent.tools.ranking import top_k_indices
+
+
+# upper bound on the tracks the recommenders score per request; 0 always scores the whole catalog
+CANDIDATE_POOL = int(os.getenv("MUSIC_CANDIDATE_POOL", "2000"))
+# smaller catalogs are scored in full, which the vectorized scorers do faster than retrieval
+RETRIEVAL_MIN_TRACKS = int(os.getenv("MUSIC_RETRIEVAL_MIN_TRACKS", "100000"))
+# most recent liked songs used as similarity seeds
+SEED_LIMIT = 20
+
+
+def _first_unique(parts: List[np.ndarray], limit: int) -> np.ndarray:
+    merged = np.concatenate([np.asarray(p, dtype=np.int64) for p in parts])
+    _, first = np.unique(merged, return_index=True)
+    # earlier parts have priority, so keep each position where it first appears
+    return merged[np.sort(first)[:limit]]
+
+
+def energy_band(session_context: SessionContext | None) -> tuple[float | None, float | None]:
+    """(below, above) bounds of the energy band the recommenders reward for this activity and mood
+
+    A track fits with nonzero energy under `below` or energy over `above`;
+    None leaves that side of the band empty.
+    """
+    below = above = None
+    if session_context is None:
+        return below, above
+    activity = (session_context.activity or "").lower()
+    if activity in ("studying", "work"):
+        below = 0.5
+    elif activity in ("party", "dancing"):
+        above = 0.7
+    elif activity in ("gym", "workout"):
+        above = 0.8
+    mood = (session_context.mood or "").lower()
+    if mood == "calm":
+        below = max(below or 0.0, 0.4)
+    elif mood == "energetic":
+        above = min(above or 1.0, 0.7)
+    return below, above
+
+
+def context_energy(session_context: SessionContext | None, energy: np.ndarray) -> np.ndarray:
+    """Tracks in the energy band the recommenders reward for this activity and mood"""
+    below, above = energy_band(session_context)
+    fits = np.zeros(energy.shape[0], dtype=np.bool_)
+    if below is not None:
+        fits |= (energy != 0) & (energy < below)
+    if above is not None:
+        fits |= energy > above
+    return fits
+
+
+def popular_in_band(features: CatalogFeatures,
+                    session_context: SessionContext | None,
+                    k: int) -> np.ndarray:
+    """The k most popular tracks in the session's energy band, then the most popular others
+
+    Reads the orderings cached on the catalog features, so the cost is
+    proportional to k rather than to the catalog size.
+    """
+    below, above = energy_band(session_context)
+    bands = [features.popularity_order(below=below)[:k] if below is not None else None,
+             features.popularity_order(above=above)[:k] if above is not None else None]
+    bands = [b for b in bands if b is not None]
+    if not bands:
+        return features.popularity_order()[:k]
+    band = np.concatenate(bands)
+    if len(bands) > 1:
+        # the low and high bands are disjoint; merge them by popularity, ties in catalog order
+        band = band[np.lexsort((band, -features.popularity[band]))][:k]
+    if band.shape[0] >= k:
+        return band
+    # fewer than k tracks fit, so the first k + len(band) popular tracks hold enough others
+    popular = features.popularity_order()[:k + band.shape[0]]
+    others = popular[~context_energy(session_context, features.energy[popular])]
+    return np.concatenate([band, others[:k - band.shape[0]]])
+
+
+def retrieve_candidates(lib: MusicLibrary,
+                        prefs: UserPreferences,
+                        session_context: SessionContext | None,
+                        user_memory: dict,
+                        pool_size: int | None = None,
+                        min_tracks: int | None = None) -> np.ndarray | None:
+    """Bounded candidate pool for the recommenders, as sorted catalog positions
+
+    Sources in priority order: text search on the query, similarity to the
+    liked songs, inverted-index matches on any preferred genre/artist/tag/mood
+    (more matching fields first, then the session's energy band, then
+    popularity), then popular tracks in the energy band to fill the pool.
+    Returns None when the catalog has fewer than min_tracks songs or fits
+    in the pool, or when the catalog was edited while the pool was being
+    built.
+    """
+    pool_size = CANDIDATE_POOL if pool_size is None else pool_size
+    min_tracks = RETRIEVAL_MIN_TRACKS if min_tracks is None else min_tracks
+    songs = lib.songs
+    if pool_size <= 0 or len(songs) <= pool_size or len(songs) < min_tracks:
+        return None
+
+    features = get_catalog_features(songs)
+    share = pool_size // 4
+    parts = [lib.search_positions(prefs.query, share)]
+
+    liked = user_memory.get("liked_songs", [])[-SEED_LIMIT:]
+    if liked:
+        parts.append(lib.similarity_positions(lib.songs_by_id(liked), share))
+
+    # genres match case-insensitively, like the taste scorer
+    wanted = {g.lower() for g in prefs.genres}
+    filters = {
+        "genres": [g for g in features.genre_vocab if g.lower() in wanted],
+        "artists": list(dict.fromkeys(prefs.artists + user_memory.get("preferred_artists", []))),
+        "tags": prefs.tags,
+        "moods": prefs.moods,
+    }
+    matches = [np.asarray(lib.filter_positions(**{field: values}), dtype=np.int64)
+               for field, values in filters.items() if values]
+    if matches:
+        positions, hits = np.unique(np.concatenate(matches), return_counts=True)
+        fits = context_energy(session_context, features.energy[positions])
+        prior = hits + fits + features.popularity[positions] / 1000.0
+        parts.append(positions[top_k_indices(prior, pool_size)])
+
+    parts.append(popular_in_band(features, session_context, pool_size))
+    pool = np.sort(_first_unique(parts, pool_size))
+    if songs is not lib.songs:
+        return None
+    return pool
+
+
+def candidate_pool(lib: MusicLibrary, state: AppState) -> List[int] | None:
+    """The retrieved pool for this request, or None if the catalog changed since retrieval"""
+    if state.get("catalog_version") != lib.catalog_version:
+        return None
+    return state.get("candidate_pool")
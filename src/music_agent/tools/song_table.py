@@ -0,0 +1,400 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+import sys
+from array import array
+
+import numpy as np
+
+from src.music_agent.state import Song
+
+
+INT_NONE = np.iinfo(np.int32).min
+NAN = float("nan")
+
+STRING_FIELDS = ("id", "name", "cover_url")
+CATEGORY_FIELDS = ("artist", "album", "category", "mood")
+LIST_FIELDS = ("genres", "tags")
+FLOAT_FIELDS = ("energy", "danceability", "valence")
+INT_FIELDS = ("year", "duration_sec", "popularity")
+
+
+def _gather_ranges(offsets: np.ndarray, positions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Flat indices of the [offsets[p], offsets[p + 1]) ranges of each position, plus new offsets"""
+    starts = offsets[positions]
+    lengths = offsets[positions + 1] - starts
+    new_offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    flat = np.arange(new_offsets[-1], dtype=np.int64) + np.repeat(starts - new_offsets[:-1], lengths)
+    return flat, new_offsets
+
+
+def _merge_values(columns) -> tuple[List[str], List[np.ndarray]]:
+    """Union of interned value lists, with a code remap array per column"""
+    lookup: Dict[str, int] = {}
+    values: List[str] = []
+    remaps = []
+    for column in columns:
+        remap = np.empty(len(column.values), dtype=np.int32)
+        for i, v in enumerate(column.values):
+            code = lookup.get(v)
+            if code is None:
+                code = lookup[v] = len(values)
+                values.append(v)
+            remap[i] = code
+        remaps.append(remap)
+    return values, remaps
+
+
+class StringColumn:
+    """Unique-per-row strings packed into one UTF-8 buffer with offsets"""
+
+    def __init__(self, values: Optional[Iterable[Optional[str]]] = None):
+        self._buffer = bytearray()
+        self._lengths = array("q")
+        self._missing = array("b")
+        if values is not None:
+            self.extend(values)
+            self.finish()
+
+    def extend(self, values: Iterable[Optional[str]]):
+        for v in values:
+            if v is None:
+                self._missing.append(1)
+                self._lengths.append(0)
+                continue
+            b = v.encode("utf-8")
+            self._buffer += b
+            self._lengths.append(len(b))
+            self._missing.append(0)
+
+    def finish(self):
+        self.buffer = bytes(self._buffer)
+        self.offsets = np.zeros(len(self._lengths) + 1, dtype=np.int64)
+        np.cumsum(np.frombuffer(self._lengths, dtype=np.int64), out=self.offsets[1:])
+        self.missing = np.frombuffer(self._missing, dtype=np.int8).astype(np.bool_)
+        del self._buffer, self._lengths, self._missing
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        if self.missing[i]:
+            return None
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]].decode("utf-8")
+
+    def take(self, positions: np.ndarray) -> "StringColumn":
+        flat, offsets = _gather_ranges(self.offsets, positions)
+        column = StringColumn.__new__(StringColumn)
+        column.buffer = np.frombuffer(self.buffer, dtype=np.uint8)[flat].tobytes()
+        column.offsets = offsets
+        column.missing = self.missing[positions]
+        return column
+
+    @staticmethod
+    def concat(columns: List["StringColumn"]) -> "StringColumn":
+        column = StringColumn.__new__(StringColumn)
+        column.buffer = b"".join(c.buffer for c in columns)
+        shifts = np.cumsum([0] + [c.offsets[-1] for c in columns[:-1]])
+        column.offsets = np.concatenate([[0]] + [c.offsets[1:] + shift for c, shift in zip(columns, shifts)])
+        column.missing = np.concatenate([c.missing for c in columns])
+        return column
+
+    def to_list(self) -> List[Optional[str]]:
+        buffer, offsets = self.buffer, self.offsets.tolist()
+        return [
+            None if missing else buffer[offsets[i]:offsets[i + 1]].decode("utf-8")
+            for i, missing in enumerate(self.missing.tolist())
+        ]
+
+    def nbytes(self) -> int:
+        return len(self.buffer) + self.offsets.nbytes + self.missing.nbytes
+
+
+class CategoryColumn:
+    """Low-cardinality strings stored as int32 codes into an interned value list (-1 for None)"""
+
+    def __init__(self, values: Optional[Iterable[Optional[str]]] = None):
+        self._lookup: Dict[str, int] = {}
+        self._codes = array("i")
+        self.values: List[str] = []
+        if values is not None:
+            self.extend(values)
+            self.finish()
+
+    def extend(self, values: Iterable[Optional[str]]):
+        lookup, codes = self._lookup, self._codes
+        for v in values:
+            if v is None:
+                codes.append(-1)
+                continue
+            code = lookup.get(v)
+            if code is None:
+                code = lookup[v] = len(self.values)
+                self.values.append(sys.intern(v))
+            codes.append(code)
+
+    def finish(self):
+        self.codes = np.frombuffer(self._codes, dtype=np.int32).copy()
+        del self._lookup, self._codes
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        code = self.codes[i]
+        return None if code < 0 else self.values[code]
+
+    def take(self, positions: np.ndarray) -> "CategoryColumn":
+        column = CategoryColumn.__new__(CategoryColumn)
+        column.values = self.values
+        column.codes = self.codes[positions]
+        return column
+
+    @staticmethod
+    def concat(columns: List["CategoryColumn"]) -> "CategoryColumn":
+        column = CategoryColumn.__new__(CategoryColumn)
+        column.values, remaps = _merge_values(columns)
+        column.codes = np.concatenate([
+            np.where(c.codes >= 0, remap[np.maximum(c.codes, 0)] if remap.size else -1, -1).astype(np.int32)
+            for c, remap in zip(columns, remaps)
+        ])
+        return column
+
+    def nbytes(self) -> int:
+        return self.codes.nbytes + sum(sys.getsizeof(v) for v in self.values)
+
+
+class ListColumn:
+    """Variable-length string lists as flat interned codes plus row offsets"""
+
+    def __init__(self, values: Optional[Iterable[Iterable[str]]] = None):
+        self._lookup: Dict[str, int] = {}
+        self._codes = array("i")
+        self._lengths = array("q")
+        self.values: List[str] = []
+        if values is not None:
+            self.extend(values)
+            self.finish()
+
+    def extend(self, values: Iterable[Iterable[str]]):
+        lookup, codes = self._lookup, self._codes
+        for row in values:
+            n = 0
+            for v in row or ():
+                code = lookup.get(v)
+                if code is None:
+                    code = lookup[v] = len(self.values)
+                    self.values.append(sys.intern(v))
+                codes.append(code)
+                n += 1
+            self._lengths.append(n)
+
+    def finish(self):
+        self.codes = np.frombuffer(self._codes, dtype=np.int32).copy()
+        self.offsets = np.zeros(len(self._lengths) + 1, dtype=np.int64)
+        np.cumsum(np.frombuffer(self._lengths, dtype=np.int64), out=self.offsets[1:])
+        del self._lookup, self._codes, self._lengths
+
+    def __getitem__(self, i: int) -> List[str]:
+        return [self.values[c] for c in self.codes[self.offsets[i]:self.offsets[i + 1]]]
+
+    def take(self, positions: np.ndarray) -> "ListColumn":
+        flat, offsets = _gather_ranges(self.offsets, positions)
+        column = ListColumn.__new__(ListColumn)
+        column.values = self.values
+        column.codes = self.codes[flat]
+        column.offsets = offsets
+        return column
+
+    @staticmethod
+    def concat(columns: List["ListColumn"]) -> "ListColumn":
+        column = ListColumn.__new__(ListColumn)
+        column.values, remaps = _merge_values(columns)
+        column.codes = np.concatenate([remap[c.codes] for c, remap in zip(columns, remaps)]).astype(np.int32)
+        shifts = np.cumsum([0] + [c.offsets[-1] for c in columns[:-1]])
+        column.offsets = np.concatenate([[0]] + [c.offsets[1:] + shift for c, shift in zip(columns, shifts)])
+        return column
+
+    def rows(self) -> np.ndarray:
+        """Row position of every entry in codes"""
+        return np.repeat(np.arange(len(self.offsets) - 1, dtype=np.int64), np.diff(self.offsets))
+
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.offsets.nbytes + sum(sys.getsizeof(v) for v in self.values)
+
+
+class _RecordAdapter:
+    """dict-style get() over a Song or SongView"""
+
+    __slots__ = ("_record",)
+
+    def __init__(self, record):
+        self._record = record
+
+    def get(self, name: str) -> Any:
+        return getattr(self._record, name)
+
+
+class SongView:
+    """Read-only, Song-compatible handle on one SongTable row
+
+    Attributes are decoded from the table on access; to_song() builds a
+    real Song when a Pydantic model is needed. Views keep the whole table
+    alive (and pickle it along), so anything leaving the catalog, such as
+    graph state, cached results and prompts, should hold Songs instead.
+    """
+
+    __slots__ = ("_table", "_pos")
+
+    def __init__(self, table: "SongTable", pos: int):
+        self._table = table
+        self._pos = pos
+
+    def __getattr__(self, name: str) -> Any:
+        if name in Song.model_fields:
+            return self._table.value(name, self._pos)
+        raise AttributeError(name)
+
+    def model_dump(self) -> Dict[str, Any]:
+        return {name: self._table.value(name, self._pos) for name in Song.model_fields}
+
+    def to_song(self) -> Song:
+        return Song.model_construct(**self.model_dump())
+
+    def __eq__(self, other):
+        if not isinstance(other, (SongView, Song)):
+            return NotImplemented
+        return self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"SongView(id={self.id!r}, name={self.name!r}, artist={self.artist!r})"
+
+
+class SongTable(Sequence):
+    """Columnar catalog store; rows are exposed as SongView
+
+    Strings are packed or interned, numeric fields live in NumPy arrays
+    (NaN / INT_NONE for missing values), so a track costs a few hundred
+    bytes instead of a full Pydantic model.
+    """
+
+    def __init__(self, records: Iterable[Song | SongView | dict] = (), chunk_size: int = 10000):
+        self.strings = {f: StringColumn() for f in STRING_FIELDS}
+        self.categories = {f: CategoryColumn() for f in CATEGORY_FIELDS}
+        self.lists = {f: ListColumn() for f in LIST_FIELDS}
+        floats = {f: array("d") for f in FLOAT_FIELDS}
+        ints = {f: array("i") for f in INT_FIELDS}
+        self._size = 0
+
+        # columns are fed a chunk at a time so only chunk_size records are ever held as objects
+        chunk: List[Any] = []
+        records = iter(records)
+        while True:
+            chunk.clear()
+            for record in records:
+                chunk.append(record if isinstance(record, dict) else _RecordAdapter(record))
+                if len(chunk) >= chunk_size:
+                    break
+            if not chunk:
+                break
+            self._size += len(chunk)
+            for f, column in self.strings.items():
+                column.extend(r.get(f) for r in chunk)
+            for f, column in self.categories.items():
+                column.extend(r.get(f) for r in chunk)
+            for f, column in self.lists.items():
+                column.extend(r.get(f) for r in chunk)
+            for f, values in floats.items():
+                values.extend(NAN if v is None else v for v in (r.get(f) for r in chunk))
+            for f, values in ints.items():
+                values.extend(INT_NONE if v is None else v for v in (r.get(f) for r in chunk))
+
+        for column in (*self.strings.values(), *self.categories.values(), *self.lists.values()):
+            column.finish()
+        self.floats = {f: np.frombuffer(v, dtype=np.float64).copy() for f, v in floats.items()}
+        self.ints = {f: np.frombuffer(v, dtype=np.int32).copy() for f, v in ints.items()}
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict], validate: bool = True) -> "SongTable":
+        """Build from raw JSON records, validating each through Song unless validate=False"""
+        if validate:
+            records = (Song(**d) for d in records)
+        return cls(records)
+
+    @classmethod
+    def _from_columns(cls, size: int, strings, categories, lists, floats, ints) -> "SongTable":
+        table = cls.__new__(cls)
+        table._size = size
+        table.strings, table.categories, table.lists = strings, categories, lists
+        table.floats, table.ints = floats, ints
+        return table
+
+    def take(self, positions: Sequence[int]) -> "SongTable":
+        """New table holding the given rows, gathered column by column"""
+        positions = np.asarray(positions, dtype=np.int64)
+        return self._from_columns(
+            len(positions),
+            {f: c.take(positions) for f, c in self.strings.items()},
+            {f: c.take(positions) for f, c in self.categories.items()},
+            {f: c.take(positions) for f, c in self.lists.items()},
+            {f: a[positions] for f, a in self.floats.items()},
+            {f: a[positions] for f, a in self.ints.items()},
+        )
+
+    @classmethod
+    def concat(cls, tables: List["SongTable"]) -> "SongTable":
+        if len(tables) == 1:
+            return tables[0]
+        return cls._from_columns(
+            sum(len(t) for t in tables),
+            {f: StringColumn.concat([t.strings[f] for t in tables]) for f in STRING_FIELDS},
+            {f: CategoryColumn.concat([t.categories[f] for t in tables]) for f in CATEGORY_FIELDS},
+            {f: ListColumn.concat([t.lists[f] for t in tables]) for f in LIST_FIELDS},
+            {f: np.concatenate([t.floats[f] for t in tables]) for f in FLOAT_FIELDS},
+            {f: np.concatenate([t.ints[f] for t in tables]) for f in INT_FIELDS},
+        )
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [SongView(self, i) for i in range(*index.indices(self._size))]
+        index = int(index)
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("song index out of range")
+        return SongView(self, index)
+
+    def __iter__(self) -> Iterator[SongView]:
+        for i in range(self._size):
+            yield SongView(self, i)
+
+    def value(self, field: str, pos: int) -> Any:
+        if field in self.strings:
+            return self.strings[field][pos]
+        if field in self.categories:
+            return self.categories[field][pos]
+        if field in self.lists:
+            return self.lists[field][pos]
+        if field in self.floats:
+            v = self.floats[field][pos]
+            return None if np.isnan(v) else float(v)
+        v = self.ints[field][pos]
+        return None if v == INT_NONE else int(v)
+
+    def numeric(self, field: str) -> np.ndarray:
+        """float64 column with missing values as 0.0"""
+        if field in self.floats:
+            return np.nan_to_num(self.floats[field], nan=0.0)
+        column = self.ints[field].astype(np.float64)
+        column[self.ints[field] == INT_NONE] = 0.0
+        return column
+
+    def materialize(self, positions: Sequence[int]) -> List[Song]:
+        return [SongView(self, int(i)).to_song() for i in positions]
+
+    def nbytes(self) -> int:
+        total = sum(c.nbytes() for c in self.strings.values())
+        total += sum(c.nbytes() for c in self.categories.values())
+        total += sum(c.nbytes() for c in self.lists.values())
+        total += sum(a.nbytes for a in self.floats.values()) + sum(a.nbytes for a in self.ints.values())
+        return total
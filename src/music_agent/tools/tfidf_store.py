@@ -0,0 +1,173 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+
+
+# bump when the vectorizer settings or the on-disk layout change
+ARTIFACT_VERSION = 1
+ARRAYS = ("idf", "data", "indices", "indptr")
+HASHING_FEATURES = 2 ** 18
+
+
+class HashingTfidfVectorizer:
+    """Hashed word counts with IDF weights learnt from the catalog
+
+    There is no vocabulary to grow, store or ship between processes; only
+    the n_features IDF weights are fitted.
+    """
+
+    def __init__(self, n_features: int = HASHING_FEATURES):
+        self.n_features = n_features
+        self.hasher = HashingVectorizer(
+            stop_words="english", alternate_sign=False, norm=None, n_features=n_features
+        )
+        self.transformer = TfidfTransformer()
+
+    @property
+    def idf_(self) -> np.ndarray:
+        return self.transformer.idf_
+
+    @idf_.setter
+    def idf_(self, value: np.ndarray):
+        self.transformer.idf_ = value
+
+    def build_analyzer(self):
+        return self.hasher.build_analyzer()
+
+    def fit_transform(self, corpus: List[str]) -> sparse.csr_matrix:
+        return self.transformer.fit_transform(self.hasher.transform(corpus))
+
+    def transform(self, texts: List[str]) -> sparse.csr_matrix:
+        return self.transformer.transform(self.hasher.transform(texts))
+
+
+TEXT_BACKENDS = {
+    # word TF-IDF with a fitted vocabulary (the original behaviour)
+    "tfidf": lambda: TfidfVectorizer(stop_words="english"),
+    # bounded memory: hashed words, IDF only
+    "hashing": lambda: HashingTfidfVectorizer(),
+    # character n-grams within word boundaries, tolerant of typos in artists and titles
+    "char": lambda: TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 4), min_df=2),
+}
+
+
+def text_backend_name(backend: str | None = None) -> str:
+    backend = (backend or os.getenv("MUSIC_TEXT_BACKEND", "tfidf")).lower()
+    if backend not in TEXT_BACKENDS:
+        raise ValueError(f"Unknown text backend: {backend}")
+    return backend
+
+
+def make_vectorizer(backend: str | None = None):
+    return TEXT_BACKENDS[text_backend_name(backend)]()
+
+
+def vectorizer_nbytes(vectorizer) -> int:
+    """Approximate resident size of the fitted vocabulary and IDF weights"""
+    total = np.asarray(vectorizer.idf_).nbytes
+    vocabulary = getattr(vectorizer, "vocabulary_", None)
+    if vocabulary:
+        total += sys.getsizeof(vocabulary) + sum(sys.getsizeof(t) + 28 for t in vocabulary)
+    return total
+
+
+def corpus_hash(corpus: List[str], backend: str = "tfidf") -> str:
+    h = hashlib.sha256(f"{backend}-v{ARTIFACT_VERSION}".encode())
+    for text in corpus:
+        h.update(text.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+
+def artifact_dir(data_path: Path, digest: str, backend: str = "tfidf") -> Path:
+    data_path = Path(data_path)
+    return data_path.parent / f"{data_path.stem}.{backend}-{digest}"
+
+
+def save_artifacts(directory: Path, vectorizer, matrix: sparse.csr_matrix, backend: str = "tfidf"):
+    """Write vocabulary, IDF weights and CSR arrays; the directory appears atomically"""
+    directory = Path(directory)
+    tmp_dir = directory.with_name(f"{directory.name}.tmp{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    matrix = sparse.csr_matrix(matrix)
+    arrays = {"idf": vectorizer.idf_, "data": matrix.data, "indices": matrix.indices, "indptr": matrix.indptr}
+    for name in ARRAYS:
+        np.save(tmp_dir / f"{name}.npy", arrays[name])
+    with open(tmp_dir / "meta.json", "w", encoding="utf-8") as f:
+        meta: Dict[str, Any] = {"version": ARTIFACT_VERSION, "backend": backend, "shape": list(matrix.shape)}
+        if hasattr(vectorizer, "vocabulary_"):
+            meta["vocabulary"] = {term: int(i) for term, i in vectorizer.vocabulary_.items()}
+        json.dump(meta, f)
+
+    try:
+        tmp_dir.rename(directory)
+    except OSError:
+        # another process published the same artifact first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def load_artifacts(directory: Path) -> Optional[Tuple[Any, sparse.csr_matrix]]:
+    """Vectorizer and memory-mapped matrix, or None if the artifact is missing or stale"""
+    directory = Path(directory)
+    try:
+        with open(directory / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != ARTIFACT_VERSION or meta.get("backend", "tfidf") not in TEXT_BACKENDS:
+            return None
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode="r") for name in ARRAYS}
+    except (OSError, ValueError):
+        return None
+
+    vectorizer = make_vectorizer(meta.get("backend", "tfidf"))
+    if "vocabulary" in meta:
+        vectorizer.vocabulary_ = meta["vocabulary"]
+    vectorizer.idf_ = np.asarray(arrays["idf"])
+    matrix = sparse.csr_matrix(
+        (arrays["data"], arrays["indices"], arrays["indptr"]), shape=tuple(meta["shape"])
+    )
+    return vectorizer, matrix
+
+
+def prune_artifacts(data_path: Path, keep: Path, backend: str = "tfidf"):
+    """Remove this backend's artifacts for older catalog contents"""
+    data_path = Path(data_path)
+    for path in data_path.parent.glob(f"{data_path.stem}.{backend}-*"):
+        if path != Path(keep) and ".tmp" not in path.name and path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def fit_or_load(data_path: Optional[Path], corpus: List[str], backend: str | None = None) -> Tuple[Any, sparse.csr_matrix]:
+    """Fitted text features for a corpus, reusing the on-disk artifact when the corpus is unchanged
+
+    Without a data_path, or with TFIDF_ARTIFACTS=0, it always refits in memory.
+    """
+    backend = text_backend_name(backend)
+    if os.getenv("TFIDF_ARTIFACTS", "1") == "0" or data_path is None:
+        vectorizer = make_vectorizer(backend)
+        return vectorizer, vectorizer.fit_transform(corpus)
+
+    directory = artifact_dir(data_path, corpus_hash(corpus, backend), backend)
+    loaded = load_artifacts(directory)
+    if loaded is not None:
+        return loaded
+
+    vectorizer = make_vectorizer(backend)
+    matrix = vectorizer.fit_transform(corpus)
+    try:
+        save_artifacts(directory, vectorizer, matrix, backend)
+        prune_artifacts(data_path, directory, backend)
+    except OSError:
+        # read-only deployments still work, they just refit every time
+        pass
+    return vectorizer, matrix
@@ -0,0 +1,262 @@
+from __future__ import annotations
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+import functools
+import inspect
+import os
+import threading
+import time
+
+import numpy as np
+from langgraph.types import Overwrite
+from pydantic import BaseModel
+
+
+class NodeSpan(BaseModel):
+    """Timing of one graph node run
+
+    cpu_ms is the running thread's CPU time: exact for blocking nodes, which
+    own a worker thread, but it includes other coroutines' work for async
+    nodes that awaited in between. candidates_out is the candidate list the
+    node leaves behind: its input plus what its update appends, or what it
+    replaces the list with.
+    """
+    trace_id: Optional[str] = None
+    node: str
+    start: float
+    wall_ms: float = 0.0
+    cpu_ms: float = 0.0
+    candidates_in: int = 0
+    candidates_out: int = 0
+    playlist_out: Optional[int] = None
+    llm_calls: int = 0
+    llm_ms: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tokens_estimated: bool = False
+    error: Optional[str] = None
+
+
+_active_span: ContextVar[Optional[NodeSpan]] = ContextVar("music_agent_active_span", default=None)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters each) when the provider reports none"""
+    return (len(text) + 3) // 4
+
+
+class MetricsRegistry:
+    """Per-node aggregates plus the most recent spans, kept in process
+
+    Percentiles come from the last `window` runs of each node; the span list
+    is bounded by max_spans so a long-lived server does not grow it.
+    """
+
+    def __init__(self, max_spans: int = 2000, window: int = 500):
+        self.window = window
+        self._spans: Deque[NodeSpan] = deque(maxlen=max_spans)
+        self._nodes: Dict[str, Dict[str, Any]] = {}
+        self._llm = {"calls": 0, "errors": 0, "ms": 0.0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._lock = threading.Lock()
+
+    def record(self, span: NodeSpan):
+        with self._lock:
+            self._spans.append(span)
+            node = self._nodes.get(span.node)
+            if node is None:
+                node = self._nodes[span.node] = {
+                    "count": 0, "errors": 0, "wall_ms": 0.0, "cpu_ms": 0.0, "llm_ms": 0.0,
+                    "prompt_tokens": 0, "completion_tokens": 0, "recent": deque(maxlen=self.window),
+                }
+            node["count"] += 1
+            node["errors"] += span.error is not None
+            node["wall_ms"] += span.wall_ms
+            node["cpu_ms"] += span.cpu_ms
+            node["llm_ms"] += span.llm_ms
+            node["prompt_tokens"] += span.prompt_tokens
+            node["completion_tokens"] += span.completion_tokens
+            node["recent"].append(span.wall_ms)
+
+    def record_llm(self, ms: float, prompt_tokens: int, completion_tokens: int, error: bool):
+        with self._lock:
+            self._llm["calls"] += 1
+            self._llm["errors"] += error
+            self._llm["ms"] += ms
+            self._llm["prompt_tokens"] += prompt_tokens
+            self._llm["completion_tokens"] += completion_tokens
+
+    def spans(self, trace_id: Optional[str] = None) -> List[NodeSpan]:
+        """Recent spans, oldest first; only one run's with a trace_id"""
+        with self._lock:
+            return [s for s in self._spans if trace_id is None or s.trace_id == trace_id]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            nodes = {}
+            for name, node in self._nodes.items():
+                recent = np.asarray(node["recent"])
+                nodes[name] = {
+                    "count": node["count"],
+                    "errors": node["errors"],
+                    "wall_ms_mean": node["wall_ms"] / node["count"],
+                    "wall_ms_p50": float(np.percentile(recent, 50)),
+                    "wall_ms_p95": float(np.percentile(recent, 95)),
+                    "cpu_ms_mean": node["cpu_ms"] / node["count"],
+                    "llm_ms_mean": node["llm_ms"] / node["count"],
+                    "prompt_tokens": node["prompt_tokens"],
+                    "completion_tokens": node["completion_tokens"],
+                }
+            llm = dict(self._llm)
+            llm["ms_mean"] = llm.pop("ms") / max(1, llm["calls"])
+            return {"nodes": nodes, "llm": llm}
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._nodes.clear()
+            self._llm = {"calls": 0, "errors": 0, "ms": 0.0, "prompt_tokens": 0, "completion_tokens": 0}
+
+
+class TraceWriter:
+    """Appends each span as one JSON line"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def write(self, span: NodeSpan):
+        line = span.model_dump_json() + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def _otel_tracer():
+    """OpenTelemetry tracer when MUSIC_OTEL=1 and opentelemetry-api is installed, else None"""
+    if os.getenv("MUSIC_OTEL", "0") != "1":
+        return None
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+    return trace.get_tracer("music_agent")
+
+
+class NodeTracer:
+    """Sends finished node spans to the registry, the JSONL trace and OpenTelemetry"""
+
+    def __init__(self, registry: MetricsRegistry, writer: Optional[TraceWriter] = None, otel=None):
+        self.registry = registry
+        self.writer = writer
+        self.otel = otel
+
+    def emit(self, span: NodeSpan):
+        self.registry.record(span)
+        if self.writer is not None:
+            self.writer.write(span)
+        if self.otel is not None:
+            start_ns = int(span.start * 1e9)
+            otel_span = self.otel.start_span(
+                f"music_agent.{span.node}",
+                start_time=start_ns,
+                attributes={f"music_agent.{k}": v for k, v in span.model_dump().items() if v is not None and k != "start"},
+            )
+            otel_span.end(end_time=start_ns + int(span.wall_ms * 1e6))
+
+
+_global_tracer = None
+_global_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> NodeTracer:
+    """Process-wide tracer; MUSIC_TRACE_FILE adds the JSONL trace, MUSIC_OTEL=1 the OpenTelemetry spans"""
+    global _global_tracer
+    with _global_tracer_lock:
+        if _global_tracer is None:
+            trace_file = os.getenv("MUSIC_TRACE_FILE")
+            _global_tracer = NodeTracer(
+                MetricsRegistry(max_spans=int(os.getenv("MUSIC_TRACE_SPANS", "2000"))),
+                writer=TraceWriter(Path(trace_file)) if trace_file else None,
+                otel=_otel_tracer(),
+            )
+        return _global_tracer
+
+
+def tracing_enabled() -> bool:
+    return os.getenv("MUSIC_TRACING", "1") != "0"
+
+
+def record_llm_call(ms: float, prompt_tokens: int, completion_tokens: int, estimated: bool, error: bool = False):
+    """Charge one LLM call to the node that made it (if any) and to the LLM totals"""
+    span = _active_span.get()
+    if span is not None:
+        span.llm_calls += 1
+        span.llm_ms += ms
+        span.prompt_tokens += prompt_tokens
+        span.completion_tokens += completion_tokens
+        span.tokens_estimated = span.tokens_estimated or estimated
+    get_tracer().registry.record_llm(ms, prompt_tokens, completion_tokens, error)
+
+
+def _candidates_after(candidates_in: int, update) -> int:
+    # node updates go through the operator.add reducer unless they overwrite the channel
+    if isinstance(update, Overwrite):
+        return len(update.value or [])
+    return candidates_in + len(update or [])
+
+
+def _open(node: str, state) -> tuple:
+    candidates = len(state.get("candidate_tracks") or [])
+    span = NodeSpan(
+        trace_id=state.get("trace_id"),
+        node=node,
+        start=time.time(),
+        candidates_in=candidates,
+        candidates_out=candidates,
+    )
+    return span, _active_span.set(span), time.perf_counter(), time.thread_time()
+
+
+def _close(opened: tuple, result, error: Optional[BaseException]):
+    span, token, wall_start, cpu_start = opened
+    span.wall_ms = (time.perf_counter() - wall_start) * 1000
+    span.cpu_ms = (time.thread_time() - cpu_start) * 1000
+    _active_span.reset(token)
+    if isinstance(result, dict):
+        if "candidate_tracks" in result:
+            span.candidates_out = _candidates_after(span.candidates_in, result["candidate_tracks"])
+        if "final_playlist" in result:
+            span.playlist_out = len(result["final_playlist"] or [])
+    if error is not None:
+        span.error = f"{type(error).__name__}: {error}"
+    get_tracer().emit(span)
+
+
+def traced(node: str, fn: Callable) -> Callable:
+    """Wrap a graph node (blocking or async) so each run emits a NodeSpan"""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def run_async(state):
+            opened = _open(node, state)
+            try:
+                result = await fn(state)
+            except BaseException as e:
+                _close(opened, None, e)
+                raise
+            _close(opened, result, None)
+            return result
+        return run_async
+
+    @functools.wraps(fn)
+    def run(state):
+        opened = _open(node, state)
+        try:
+            result = fn(state)
+        except BaseException as e:
+            _close(opened, None, e)
+            raise
+        _close(opened, result, None)
+        return result
+    return run
@@ -0,0 +1,196 @@
+from __future__ import annotations
+from typing import Iterable, List, Sequence, Tuple
+import os
+
+import numpy as np
+from scipy import sparse
+
+from src.music_agent.tools.ranking import top_k_indices, top_k_rows
+
+
+# dense score entries materialized at once by query_many (128 MB of float64)
+SCORE_BLOCK_ELEMENTS = 1 << 24
+
+
+def _row_normalize(matrix) -> sparse.csr_matrix:
+    matrix = sparse.csr_matrix(matrix, dtype=np.float64)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    # TF-IDF rows are already unit length; keep (possibly memory-mapped) arrays shared
+    if np.allclose(norms, 1.0):
+        return matrix
+    return sparse.csr_matrix(sparse.diags(1.0 / norms) @ matrix)
+
+
+class ExactIndex:
+    """Brute-force cosine similarity over the full sparse matrix, with top-k selection"""
+
+    name = "exact"
+
+    def build(self, matrix) -> "ExactIndex":
+        self.matrix = _row_normalize(matrix)
+        return self
+
+    def update(self, matrix) -> "ExactIndex":
+        """Re-index after catalog edits that kept the vocabulary"""
+        return ExactIndex.build(self, matrix)
+
+    def _scores(self, query) -> np.ndarray:
+        # a dense query vector makes this one pass over the matrix, without a sparse product
+        return self.matrix @ _row_normalize(query).toarray().ravel()
+
+    def query(self, query, k: int, exclude: Iterable[int] = ()) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k positions and cosine scores for a single (1 x vocab) query vector"""
+        scores = self._scores(query)
+        excluded = np.fromiter(exclude, dtype=np.int64)
+        if excluded.size:
+            scores[excluded] = -np.inf
+            k = min(k, scores.shape[0] - np.unique(excluded).size)
+        top = top_k_indices(scores, k)
+        return top, scores[top]
+
+    def query_many(self,
+                   queries,
+                   k: int,
+                   excludes: Sequence[Iterable[int]] | None = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """query() for every row of an (m x vocab) matrix, scored in blocks with one sparse product each"""
+        queries = _row_normalize(queries)
+        n = self.matrix.shape[0]
+        block = max(1, SCORE_BLOCK_ELEMENTS // max(1, n))
+        results = []
+        for start in range(0, queries.shape[0], block):
+            scores = (self.matrix @ queries[start:start + block].T).toarray().T
+            limits = []
+            for r in range(scores.shape[0]):
+                excluded = np.fromiter(excludes[start + r], dtype=np.int64) if excludes is not None else ()
+                if len(excluded):
+                    scores[r, excluded] = -np.inf
+                    limits.append(min(k, n - np.unique(excluded).size))
+                else:
+                    limits.append(k)
+            top = top_k_rows(scores, k)
+            for r, limit in enumerate(limits):
+                positions = top[r, :limit]
+                results.append((positions, scores[r, positions]))
+        return results
+
+
+class IVFIndex(ExactIndex):
+    """Inverted-file ANN index in pure NumPy
+
+    Rows are randomly projected to a small dense space and clustered with
+    spherical k-means; a query probes the nprobe closest clusters and the
+    candidates are rescored exactly against the sparse matrix.
+    """
+
+    name = "ivf"
+
+    def __init__(self, n_lists: int | None = None, nprobe: int = 16, dim: int = 256,
+                 iterations: int = 15, seed: int = 0, batch_size: int = 65536):
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.dim = dim
+        self.iterations = iterations
+        self.seed = seed
+        self.batch_size = batch_size
+
+    def _project(self, matrix) -> np.ndarray:
+        dense = np.asarray(matrix[:, self.active] @ self.projection, dtype=np.float32)
+        norms = np.linalg.norm(dense, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return dense / norms
+
+    def _assign(self, vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        labels = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], self.batch_size):
+            block = vectors[start:start + self.batch_size]
+            labels[start:start + self.batch_size] = np.argmax(block @ centroids.T, axis=1)
+        return labels
+
+    def build(self, matrix) -> "IVFIndex":
+        super().build(matrix)
+        n_rows = self.matrix.shape[0]
+        rng = np.random.default_rng(self.seed)
+
+        # only columns that occur in the catalog get a projection row, so wide hashed
+        # feature spaces do not cost n_features x dim floats
+        self.active = np.unique(self.matrix.indices)
+        self.projection = rng.standard_normal((self.active.shape[0], self.dim)).astype(np.float32)
+        vectors = self._project(self.matrix)
+
+        n_lists = self.n_lists or max(1, int(np.sqrt(n_rows)))
+        n_lists = min(n_lists, max(1, n_rows))
+        centroids = vectors[rng.choice(n_rows, size=n_lists, replace=False)].copy()
+        for _ in range(self.iterations):
+            labels = self._assign(vectors, centroids)
+            members = sparse.csr_matrix(
+                (np.ones(n_rows, dtype=np.float32), (labels, np.arange(n_rows))), shape=(n_lists, n_rows)
+            )
+            sums = np.asarray(members @ vectors)
+            empty = np.bincount(labels, minlength=n_lists) == 0
+            # reseed empty clusters with random rows so every list stays usable
+            sums[empty] = vectors[rng.choice(n_rows, size=int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+
+        labels = self._assign(vectors, centroids)
+        self.centroids = centroids
+        self.list_order = np.argsort(labels, kind="stable")
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_lists))])
+        return self
+
+    def update(self, matrix) -> "IVFIndex":
+        """Reassign rows to the existing centroids; the projection stays valid while the vocabulary does"""
+        ExactIndex.build(self, matrix)
+        labels = self._assign(self._project(self.matrix), self.centroids)
+        self.list_order = np.argsort(labels, kind="stable")
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=self.centroids.shape[0]))])
+        return self
+
+    def query(self, query, k: int, exclude: Iterable[int] = ()) -> Tuple[np.ndarray, np.ndarray]:
+        query = _row_normalize(query)
+        excluded = set(int(i) for i in exclude)
+        probe_order = np.argsort(-(self._project(query)[0] @ self.centroids.T), kind="stable")
+
+        # widen the probe until there are enough candidates left after exclusions
+        nprobe = min(self.nprobe, probe_order.shape[0])
+        while True:
+            lists = probe_order[:nprobe]
+            candidates = np.sort(np.concatenate(
+                [self.list_order[self.list_offsets[j]:self.list_offsets[j + 1]] for j in lists]
+            ))
+            if excluded:
+                candidates = candidates[~np.isin(candidates, list(excluded))]
+            if candidates.shape[0] >= k or nprobe >= probe_order.shape[0]:
+                break
+            nprobe = min(nprobe * 2, probe_order.shape[0])
+
+        scores = np.asarray((self.matrix[candidates] @ query.T).todense()).ravel()
+        top = top_k_indices(scores, k)
+        return candidates[top], scores[top]
+
+    def query_many(self,
+                   queries,
+                   k: int,
+                   excludes: Sequence[Iterable[int]] | None = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        # probing is per query, so there is nothing to share beyond the batched transform
+        queries = sparse.csr_matrix(queries)
+        return [
+            self.query(queries[r], k, exclude=excludes[r] if excludes is not None else ())
+            for r in range(queries.shape[0])
+        ]
+
+
+VECTOR_INDEXES = {
+    "exact": ExactIndex,
+    "ivf": IVFIndex,
+}
+
+
+def make_vector_index(backend: str | None = None, **kwargs):
+    """Vector index by name; defaults to MUSIC_VECTOR_INDEX or exact"""
+    backend = (backend or os.getenv("MUSIC_VECTOR_INDEX", "exact")).lower()
+    if backend not in VECTOR_INDEXES:
+        raise ValueError(f"Unknown vector index backend: {backend}")
+    return VECTOR_INDEXES[backend](**kwargs)
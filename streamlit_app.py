@@ -1,15 +1,18 @@
 import os
 import json
 import random
+import time
 from pathlib import Path
 import streamlit as st
 import pandas as pd
 from dotenv import load_dotenv
 
 from src.music_agent.state import UserPreferences, SessionContext
-from src.music_agent.graph import invoke_workflow, build_multi_agent_graph
-from src.music_agent.tools.library import load_default_library
+from src.music_agent.graph import invoke_workflow, stream_workflow, build_multi_agent_graph
+from src.music_agent.tools.library import get_default_library
+from src.music_agent.tools.tracing import get_tracer
 from src.music_agent.agents.memory import update_user_memory
+from src.music_agent.tools.memory_store import get_user_memory_store
 from src.music_agent.agents.refiner import refiner_agent, namer_agent
 
 load_dotenv()
@@ -36,6 +39,19 @@ def save_playlist_to_file(playlist_data):
     with open(playlists_file, "w") as f:
         json.dump(playlists, f, indent=2)
 
+def song_card_html(song):
+    cover = song.cover_url if hasattr(song, 'cover_url') and song.cover_url else "https://images.unsplash.com/photo-1470225620780-dba8ba36b745?w=400&h=400&fit=crop"
+    return f"""
+                <div class="song-card song-card-clickable">
+                    <img src="{cover}" class="album-cover" alt="{song.album}">
+                    <div class="song-info">
+                        <div class="song-title">{song.name}</div>
+                        <div class="song-artist">{song.artist}</div>
+                        <div class="song-meta">{song.album} • {song.year} • {', '.join(song.genres)}</div>
+                    </div>
+                </div>
+                """
+
 if "saved_playlists" not in st.session_state:
     st.session_state.saved_playlists = load_saved_playlists()
 
@@ -321,24 +337,14 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Load library and user preferences
-lib = load_default_library()
-prefs_file = Path("src/music_agent/data/user_prefs.json")
+lib = get_default_library()
+memory_store = get_user_memory_store()
 
 def load_user_prefs():
-    if prefs_file.exists():
-        with open(prefs_file, "r") as f:
-            return json.load(f)
-    return {
-        "liked_songs": [],
-        "disliked_songs": [],
-        "preferred_genres": [],
-        "preferred_moods": [],
-        "preferred_artists": []
-    }
+    return memory_store.get("default_user")
 
 def save_user_prefs(prefs):
-    with open(prefs_file, "w") as f:
-        json.dump(prefs, f, indent=2)
+    memory_store.put("default_user", prefs)
 
 if "user_prefs" not in st.session_state:
     st.session_state.user_prefs = load_user_prefs()
@@ -379,26 +385,33 @@ with tab1:
     with col2:
         size = st.select_slider("Songs", options=list(range(5, 31, 5)), value=10)
     
+    genres_facets = lib.facets("genres")
+    moods_facets = lib.facets("moods")
+    tags_facets = lib.facets("tags")
+    
     col1, col2, col3 = st.columns(3)
     
     with col1:
         genres = st.multiselect(
             "Filter by Genre",
-            sorted({g for s in lib.songs for g in s.genres}),
+            list(genres_facets),
+            format_func=lambda v: f"{v} ({genres_facets[v]})",
             placeholder="Any Genre"
         )
     
     with col2:
         moods = st.multiselect(
             "Filter by Mood",
-            sorted({s.mood for s in lib.songs if s.mood}),
+            list(moods_facets),
+            format_func=lambda v: f"{v} ({moods_facets[v]})",
             placeholder="Any Mood"
         )
     
     with col3:
         tags = st.multiselect(
             "Filter by Tags",
-            sorted({t for s in lib.songs for t in s.tags}),
+            list(tags_facets),
+            format_func=lambda v: f"{v} ({tags_facets[v]})",
             placeholder="Any Tags"
         )
     
@@ -408,31 +421,72 @@ with tab1:
         if not mistral_key or mistral_key == "your-mistral-api-key":
             st.error("Configure MISTRAL_API_KEY to use AI features")
         else:
-            with st.spinner("Multi-agent system generating playlist..."):
-                try:
-                    result = invoke_workflow(
-                        query=nl_query or "recommend me some songs",
-                        user_id="default_user"
-                    )
+            # the playlist shows once the critic is done; explanation and title fill in as they stream
+            status = st.empty()
+            explanation_slot = st.empty()
+            title_slot = st.empty()
+            preview = st.container()
+            status.caption("Multi-agent system generating playlist...")
+            try:
+                start = time.perf_counter()
+                timings = {}
+                explanation = ""
+                title_text = ""
+                result = None
+                for event in stream_workflow(
+                    query=nl_query or "recommend me some songs",
+                    user_id="default_user"
+                ):
+                    if event.kind == "state" and "critic" in event.nodes:
+                        timings["playlist"] = time.perf_counter() - start
+                        status.caption(f"Playlist ready in {timings['playlist']:.1f}s, writing the story...")
+                        with preview:
+                            for song in event.state["final_playlist"]:
+                                st.markdown(song_card_html(song), unsafe_allow_html=True)
+                    elif event.kind == "delta" and event.field == "explanation":
+                        timings.setdefault("first_words", time.perf_counter() - start)
+                        explanation += event.text
+                        explanation_slot.success(explanation)
+                    elif event.kind == "delta" and event.field == "title":
+                        title_text += event.text
+                        title_slot.markdown(f"### {title_text}")
+                    elif event.kind == "done":
+                        result = event.state
+                # cached results arrive whole
+                timings.setdefault("playlist", time.perf_counter() - start)
+                
+                if result.get("error"):
+                    st.error(f"Error: {result['error']}")
+                else:
+                    st.session_state.last_result = result
+                    st.session_state.active_refinement = True
                     
-                    if result.get("error"):
-                        st.error(f"Error: {result['error']}")
-                    else:
-                        st.session_state.last_result = result
-                        st.session_state.active_refinement = True
-                        
-                        playlist_title, playlist_desc = namer_agent(result)
-                        st.session_state.playlist_title = playlist_title
-                        st.session_state.playlist_desc = playlist_desc
-                        st.rerun()
-                        
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+                    # named in the graph, concurrently with the explanation
+                    timings["total"] = time.perf_counter() - start
+                    st.session_state.playlist_title = result.get("playlist_title") or "My Playlist"
+                    st.session_state.playlist_desc = result.get("playlist_description") or ""
+                    st.session_state.stream_timings = timings
+                    st.rerun()
+                    
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
     
     if st.session_state.get("last_result"):
         result = st.session_state.last_result
         
         with st.expander("Agent Activity Log", expanded=False):
+            spans = get_tracer().registry.spans(result["trace_id"]) if result.get("trace_id") else []
+            if spans:
+                st.dataframe(pd.DataFrame([{
+                    "Agent": span.node,
+                    "Wall ms": round(span.wall_ms, 1),
+                    "CPU ms": round(span.cpu_ms, 1),
+                    "LLM ms": round(span.llm_ms, 1),
+                    "Tokens in/out": f"{span.prompt_tokens}/{span.completion_tokens}" + ("~" if span.tokens_estimated else ""),
+                    "Candidates in → out": f"{span.candidates_in} → {span.candidates_out}",
+                } for span in spans]), hide_index=True, use_container_width=True)
+            else:
+                st.caption("No per-agent timings for this result (served from cache or loaded).")
             for log in result["logs"]:
                 st.markdown(f"**{log.agent_name}**: {log.details}")
         
@@ -445,6 +499,14 @@ with tab1:
         st.markdown(f"### {playlist_title}")
         st.caption(playlist_desc)
         
+        timings = st.session_state.get("stream_timings")
+        if timings:
+            st.caption(
+                f"Playlist shown after {timings['playlist']:.1f}s"
+                + (f" · explanation started at {timings['first_words']:.1f}s" if "first_words" in timings else "")
+                + f" · complete at {timings['total']:.1f}s"
+            )
+        
         col_save1, col_save2, col_save3 = st.columns([1, 2, 1])
         with col_save2:
             if st.button("Save This Playlist", use_container_width=True, key="save_current_playlist"):
@@ -469,19 +531,8 @@ with tab1:
         st.markdown("<br>", unsafe_allow_html=True)
         
         for idx, song in enumerate(result["final_playlist"]):
-            cover = song.cover_url if hasattr(song, 'cover_url') and song.cover_url else "https://images.unsplash.com/photo-1470225620780-dba8ba36b745?w=400&h=400&fit=crop"
-            
             with st.container():
-                st.markdown(f"""
-                <div class="song-card song-card-clickable">
-                    <img src="{cover}" class="album-cover" alt="{song.album}">
-                    <div class="song-info">
-                        <div class="song-title">{song.name}</div>
-                        <div class="song-artist">{song.artist}</div>
-                        <div class="song-meta">{song.album} • {song.year} • {', '.join(song.genres)}</div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(song_card_html(song), unsafe_allow_html=True)
             
             if st.session_state.get(f"show_modal_{song.id}", False):
                 with st.container():
@@ -547,6 +598,7 @@ with tab2:
                     }
                     
                     st.session_state.last_result = mock_result
+                    st.session_state.stream_timings = None
                     st.session_state.playlist_title = pl_data["title"]
                     st.session_state.playlist_desc = pl_data.get("description", "")
                     st.session_state.active_refinement = True
@@ -634,9 +686,11 @@ with tab2:
                     if new_size > current_size:
                         songs_needed = new_size - current_size
                         
+                        # tracks only: the combined playlist is named once below
                         temp_result = invoke_workflow(
                             query=result["query"],
                             user_id="default_user",
+                            describe=False,
                             preferences={
                                 "genres": result["preferences"].genres,
                                 "size": songs_needed + 5,
@@ -651,6 +705,7 @@ with tab2:
                         
                         result["final_playlist"] = combined_playlist
                         st.session_state.last_result = result
+                        st.session_state.stream_timings = None
                         st.session_state.new_songs = {s.id for s in new_candidates}
                         st.session_state.target_size = new_size
                         
@@ -660,6 +715,7 @@ with tab2:
                     else:
                         result["final_playlist"] = result["final_playlist"][:new_size]
                         st.session_state.last_result = result
+                        st.session_state.stream_timings = None
                         st.session_state.new_songs = set()
                         st.session_state.target_size = new_size
                         
@@ -715,11 +771,11 @@ with tab2:
                         new_songs = {s.id for s in refined_result["final_playlist"] if s.id not in original_ids}
                         
                         st.session_state.last_result = refined_result
+                        st.session_state.stream_timings = None
                         st.session_state.new_songs = new_songs
                         
-                        new_title, new_desc = namer_agent(refined_result)
-                        st.session_state.playlist_title = new_title
-                        st.session_state.playlist_desc = new_desc
+                        st.session_state.playlist_title = refined_result.get("playlist_title") or "My Playlist"
+                        st.session_state.playlist_desc = refined_result.get("playlist_description") or ""
                         
                         response = f"✓ Adjusted! {analysis[:150]}"
                         st.session_state.conversation_history.append({"role": "assistant", "content": response})
@@ -0,0 +1,110 @@
+import json
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.music_agent.tools.catalog_db import LazySongList, SQLiteMusicLibrary, import_json_catalog
+from src.music_agent.tools.inverted_index import CatalogIndex
+from src.music_agent.tools.library import MusicLibrary
+
+SONGS_JSON = Path(__file__).resolve().parents[1] / "src" / "music_agent" / "data" / "songs.json"
+
+
+@pytest.fixture
+def conn(tmp_path):
+    db_path = tmp_path / "songs.db"
+    import_json_catalog(SONGS_JSON, db_path)
+    conn = sqlite3.connect(str(db_path), check_same_thread=False)
+    yield conn
+    conn.close()
+
+
+def test_hydrate_more_rows_than_cache(conn):
+    songs = LazySongList(conn, threading.Lock(), cache_size=100)
+    hydrated = songs.hydrate(range(300))
+    assert len(hydrated) == 300
+    assert hydrated[0].id == LazySongList(conn, threading.Lock()).hydrate([0])[0].id
+
+
+def test_hydrate_after_eviction(conn):
+    songs = LazySongList(conn, threading.Lock(), cache_size=100)
+    songs.hydrate(range(100))
+    first, far = songs.hydrate([0, 200])
+    assert first.id == songs.hydrate([0])[0].id
+    assert far.id == songs[200].id
+
+
+def test_cache_hits_are_kept_as_recently_used(conn):
+    songs = LazySongList(conn, threading.Lock(), cache_size=2)
+    songs.hydrate([0, 1])
+    songs.hydrate([0])
+    songs.hydrate([2])
+    assert 0 in songs._cache and 1 not in songs._cache
+
+
+def test_edits_match_the_in_memory_library(tmp_path):
+    data_path = tmp_path / "songs.json"
+    shutil.copy(SONGS_JSON, data_path)
+    songs = json.loads(data_path.read_text())
+    extra = [{**songs[i], "id": f"new-{i}"} for i in range(3)]
+    renamed = {**songs[5], "name": "Renamed Track", "genres": ["jazz"]}
+    gone = [songs[0]["id"], songs[10]["id"], "new-1", "unknown"]
+
+    libraries = [MusicLibrary(data_path), SQLiteMusicLibrary(data_path, tmp_path / "songs.db")]
+    for lib in libraries:
+        lib.load()
+        assert lib.add_songs(extra) == 3
+        lib.update_song(renamed)
+        assert lib.remove_songs(gone) == 3
+        lib.wait_for_refit()
+    memory, db = libraries
+
+    assert [s.id for s in db.songs] == [s.id for s in memory.songs]
+    assert db.filter_ids(genres=["jazz"]) == memory.filter_ids(genres=["jazz"])
+    assert [s.id for s in db.search("Renamed Track", 5)] == [s.id for s in memory.search("Renamed Track", 5)]
+    with pytest.raises(ValueError):
+        db.add_songs([songs[1]])
+
+    reopened = SQLiteMusicLibrary(data_path, tmp_path / "songs.db")
+    reopened.load()
+    assert [s.id for s in reopened.songs] == [s.id for s in memory.songs]
+
+
+@pytest.mark.parametrize("store", ["models", "table"])
+def test_edited_index_matches_a_rebuild(store):
+    songs = json.loads(SONGS_JSON.read_text())
+    lib = MusicLibrary(SONGS_JSON, song_store=store)
+    lib.load()
+    lib.add_songs([{**songs[i], "id": f"new-{i}", "genres": ["zydeco"], "year": None} for i in range(3)])
+    lib.update_song({**songs[5], "genres": ["jazz", "polka"], "mood": None, "year": 1901})
+    lib.remove_songs([songs[0]["id"], songs[10]["id"], "new-1"])
+
+    rebuilt = CatalogIndex(lib.songs)
+    assert lib.index.size == rebuilt.size
+    for field, postings in rebuilt.postings.items():
+        assert list(lib.index.postings[field]) == list(postings)
+        assert all(np.array_equal(lib.index.postings[field][v], p) for v, p in postings.items())
+    for years in ({"min_year": 1901}, {"max_year": 1990}, {"min_year": 1980, "max_year": 2000}):
+        assert np.array_equal(lib.index.year_range(**years), rebuilt.year_range(**years))
+
+
+def test_reads_do_not_wait_for_edits():
+    lib = MusicLibrary(SONGS_JSON)
+    lib.load()
+    results = []
+
+    def read():
+        results.append(len(lib.search("rock", 3)))
+        results.append(lib.filter_positions(genres=["rock"]).size)
+        results.append(len(lib.songs_by_id([lib.songs[0].id])))
+
+    with lib._edit_lock:
+        reader = threading.Thread(target=read)
+        reader.start()
+        reader.join(5)
+        assert not reader.is_alive()
+    assert all(results) and len(results) == 3
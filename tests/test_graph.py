@@ -0,0 +1,34 @@
+import os
+from collections import Counter
+
+import pytest
+
+os.environ.setdefault("MUSIC_INTENT_CACHE_DB", "off")
+
+from src.music_agent.graph import build_multi_agent_graph
+from src.music_agent.tools.library import get_default_library
+
+
+@pytest.mark.parametrize("parallel_recommenders", [True, False])
+@pytest.mark.parametrize("name_playlist", [True, False])
+def test_reducer_lists_are_not_duplicated(parallel_recommenders, name_playlist):
+    app, _ = build_multi_agent_graph(
+        get_default_library(), parallel_recommenders=parallel_recommenders, name_playlist=name_playlist
+    )
+    result = app.invoke({"query": "happy pop for a party"})
+
+    candidate_ids = [c.song.id for c in result["candidate_tracks"]]
+    assert len(result["candidate_tracks"]) == len(set(candidate_ids))
+    agents = Counter(log.agent_name for log in result["logs"])
+    assert set(agents.values()) == {1}
+    assert len(result["logs"]) == (9 if name_playlist else 8)
+    assert len(result["explanations"]) == 1
+
+
+def test_undescribed_graph_stops_at_the_critic():
+    app, _ = build_multi_agent_graph(get_default_library(), describe=False)
+    result = app.invoke({"query": "happy pop for a party"})
+
+    assert not {"explainer", "namer"} & set(app.get_graph().nodes)
+    assert len(result["final_playlist"]) == 10
+    assert result["explanations"] == [] and result["playlist_title"] is None
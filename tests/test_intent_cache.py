@@ -0,0 +1,38 @@
+import pytest
+
+from src.music_agent.agents.orchestrator import SYSTEM_PROMPT, same_heuristic_slots
+from src.music_agent.tools.intent_cache import IntentCache, intent_namespace
+
+
+def test_parses_from_another_provider_are_not_served(tmp_path):
+    db_path = tmp_path / "intent_cache.db"
+    fake = intent_namespace("orchestrator", SYSTEM_PROMPT, "", "fake")
+    live = intent_namespace("orchestrator", SYSTEM_PROMPT, "", "mistral")
+    query = "songs like Taylor Swift for my drive"
+
+    IntentCache(db_path).store(fake, query, {"action": "recommend", "preferences": {"artists": []}})
+
+    reopened = IntentCache(db_path)
+    assert reopened.lookup(fake, query) is not None
+    assert reopened.lookup(live, query) is None
+
+
+def lookup_after_storing(tmp_path, stored: str, query: str):
+    namespace = intent_namespace("orchestrator", SYSTEM_PROMPT, "", "mistral")
+    cache = IntentCache(tmp_path / "intent_cache.db")
+    cache.store(namespace, stored, {"action": "recommend", "preferences": {"query": stored}})
+    return cache.lookup(namespace, query, agree=same_heuristic_slots)
+
+
+@pytest.mark.parametrize("stored, query", [
+    ("upbeat english pop for a party", "upbeat spanish pop for a party"),
+    ("chill songs by arijit singh for studying", "chill songs by atif aslam for studying"),
+    ("happy pop for a party", "happy rock for a party"),
+])
+def test_paraphrases_that_change_the_request_miss(tmp_path, stored, query):
+    assert lookup_after_storing(tmp_path, stored, query) is None
+
+
+def test_rewording_with_known_words_hits(tmp_path):
+    hit = lookup_after_storing(tmp_path, "chill study music", "chill music for studying")
+    assert hit is not None and hit.query == "chill study music"
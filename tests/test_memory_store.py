@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+from src.music_agent.tools.memory_store import UserMemoryStore
+
+
+class SlowBackend:
+    def __init__(self):
+        self.saved = {}
+        self.writing = threading.Event()
+        self.release = threading.Event()
+        self.fail = False
+
+    def load(self, user_id):
+        return self.saved.get(user_id)
+
+    def save_many(self, memories):
+        self.writing.set()
+        self.release.wait(5)
+        if self.fail:
+            raise OSError("disk full")
+        self.saved.update(memories)
+
+
+def test_reads_do_not_wait_for_a_flush():
+    backend = SlowBackend()
+    store = UserMemoryStore(backend, flush_interval=60)
+    store.put("a", {"liked": ["s1"]})
+    flusher = threading.Thread(target=store.flush)
+    flusher.start()
+    assert backend.writing.wait(5)
+
+    reader = threading.Thread(target=lambda: (store.get("a"), store.put("b", {"liked": []})))
+    reader.start()
+    reader.join(1)
+    blocked = reader.is_alive()
+    backend.release.set()
+    flusher.join()
+    reader.join()
+
+    assert not blocked
+    assert backend.saved == {"a": {"liked": ["s1"]}}
+    store.flush()
+    assert backend.saved["b"] == {"liked": []}
+
+
+def test_failed_flush_keeps_profiles_pending():
+    backend = SlowBackend()
+    backend.release.set()
+    backend.fail = True
+    store = UserMemoryStore(backend, flush_interval=60)
+    store.put("a", {"liked": ["s1"]})
+    with pytest.raises(OSError):
+        store.flush()
+
+    backend.fail = False
+    store.flush()
+    assert backend.saved == {"a": {"liked": ["s1"]}}
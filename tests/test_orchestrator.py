@@ -0,0 +1,22 @@
+import pytest
+
+from src.music_agent.agents.orchestrator import FAST_PATH_CONFIDENCE, heuristic_confidence, parse_query_heuristically
+
+
+def confidence(query: str) -> float:
+    return heuristic_confidence(query, parse_query_heuristically(query))
+
+
+@pytest.mark.parametrize("query", [
+    "20 happy pop songs for a party",
+    "calm jazz for reading, 5 tracks",
+    "happy popular songs for a party",
+    "rock but no metal",
+])
+def test_queries_the_heuristic_cannot_parse_go_to_the_llm(query):
+    assert confidence(query) < FAST_PATH_CONFIDENCE
+
+
+@pytest.mark.parametrize("query", ["happy pop for a party", "chill study music"])
+def test_keyword_queries_take_the_fast_path(query):
+    assert confidence(query) >= FAST_PATH_CONFIDENCE
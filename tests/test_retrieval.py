@@ -0,0 +1,27 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from src.music_agent.state import Song, SessionContext
+from src.music_agent.tools.features import CatalogFeatures
+from src.music_agent.tools.ranking import top_k_indices
+from src.music_agent.tools.retrieval import context_energy, popular_in_band
+
+SONGS_JSON = Path(__file__).resolve().parents[1] / "src" / "music_agent" / "data" / "songs.json"
+
+
+def test_popular_in_band_matches_full_ranking():
+    features = CatalogFeatures([Song(**s) for s in json.loads(SONGS_JSON.read_text())])
+    contexts = [
+        None,
+        SessionContext(activity="studying"),
+        SessionContext(activity="studying", mood="calm"),
+        SessionContext(activity="gym", mood="energetic"),
+        SessionContext(activity="work", mood="energetic"),
+    ]
+    for context in contexts:
+        fits = context_energy(context, features.energy)
+        for k in (1, 20, int(fits.sum()), features.size):
+            expected = top_k_indices(fits * 1000.0 + features.popularity, k)
+            assert np.array_equal(popular_in_band(features, context, k), expected)
@@ -0,0 +1,29 @@
+import json
+import pickle
+from pathlib import Path
+
+from src.music_agent.state import Song
+from src.music_agent.tools.library import MusicLibrary
+from src.music_agent.tools.song_table import SongTable
+
+SONGS_JSON = Path(__file__).resolve().parents[1] / "src" / "music_agent" / "data" / "songs.json"
+
+
+def test_view_and_song_compare_equal_either_way():
+    songs = [Song(**s) for s in json.loads(SONGS_JSON.read_text())[:3]]
+    view = SongTable(songs)[1]
+
+    assert view == songs[1] and songs[1] == view
+    assert view != songs[0] and songs[0] != view
+    assert view in songs and songs[1] in [view]
+    assert len({view, songs[1]}) == 1
+
+
+def test_table_store_hands_out_songs():
+    lib = MusicLibrary(SONGS_JSON, song_store="table")
+    lib.load()
+    picked = lib.songs_at([0, 7])
+
+    assert all(type(s) is Song for s in picked)
+    assert [s.id for s in picked] == [lib.songs[0].id, lib.songs[7].id]
+    assert len(pickle.dumps(picked)) < len(pickle.dumps(lib.songs[0]))